@@ -1,8 +1,15 @@
 import json
 import os
 import re
+import threading
 from typing import Dict, List, Optional
 
+from compendium.mention_scanner import MentionScanner
+
+# Compendium file path -> ((mtime, size), data, MentionScanner or None), shared by all managers
+_compendium_cache = {}
+_compendium_cache_lock = threading.Lock()
+
 class CompendiumManager:
     """Manages compendium data loading, retrieval, and reference parsing for a project."""
 
@@ -53,6 +60,57 @@ class CompendiumManager:
                 print(f"Error loading compendium data from {filename}: {e}")
         return {"categories": []}
 
+    def _cached(self):
+        """
+        The compendium data and its cache entry, reloaded only when the file
+        changed (the data is shared and must not be modified).
+        """
+        filename = self.get_filepath()
+        try:
+            stat = os.stat(filename)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        with _compendium_cache_lock:
+            cached = _compendium_cache.get(filename)
+            if cached is None or cached[0] != signature:
+                cached = _compendium_cache[filename] = [signature, self.load_data(), None]
+            return cached
+
+    def get_scanner(self) -> MentionScanner:
+        """
+        The mention scanner of the compendium: every entry name and alias (an
+        optional "aliases" list in an entry), rebuilt only when the file changes.
+        """
+        cached = self._cached()
+        with _compendium_cache_lock:
+            if cached[2] is None:
+                terms = []
+                for cat in cached[1].get("categories", []):
+                    category = cat.get("name", "")
+                    entries = cat.get("entries", [])
+                    if isinstance(entries, dict):  # legacy format: entry name -> content
+                        entries = [{"name": name} for name in entries]
+                    for entry in entries:
+                        if not isinstance(entry, dict) or not entry.get("name"):
+                            continue
+                        key = (category, entry["name"])
+                        terms.append((entry["name"], key))
+                        terms.extend((alias, key) for alias in entry.get("aliases", []) if isinstance(alias, str))
+                cached[2] = MentionScanner(terms)
+            return cached[2]
+
+    def find_mentions(self, text: str) -> list:
+        """
+        Find the compendium entries mentioned in a text (by name or alias, whole
+        words, case-insensitive).
+
+        Returns:
+            list: Mention(start, end, key) tuples ordered by start, where key is
+                  (category name, entry name).
+        """
+        return self.get_scanner().scan(text)
+
     def get_text(self, category: str, entry: str) -> str:
         """
         Retrieve the text content for a given category and entry.
@@ -64,8 +122,7 @@ class CompendiumManager:
         Returns:
             str: The content of the entry, or a placeholder if not found.
         """
-        data = self.load_data()
-        categories = data.get("categories", [])
+        categories = self._cached()[1].get("categories", [])
         for cat in categories:
             if cat.get("name") == category:
                 for e in cat.get("entries", []):
@@ -75,31 +132,20 @@ class CompendiumManager:
 
     def parse_references(self, message: str) -> List[str]:
         """
-        Parse compendium references from a message by matching entry names.
+        Parse compendium references from a message by matching entry names and aliases.
 
         Args:
             message (str): The text to search for references.
 
         Returns:
-            list: A list of entry names found in the message.
+            list: A list of entry names found in the message, in order of first mention.
         """
-        filename = self.get_filepath()
         refs = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, "r", encoding="utf-8") as f:
-                    compendium = json.load(f)
-                names = []
-                cats = compendium.get("categories", [])
-                if isinstance(cats, dict):
-                    names = list(cats.keys())
-                elif isinstance(cats, list):
-                    for cat in cats:
-                        for entry in cat.get("entries", []):
-                            names.append(entry.get("name", ""))
-                for name in names:
-                    if name and re.search(r'\b' + re.escape(name) + r'\b', message, re.IGNORECASE):
-                        refs.append(name)
-            except Exception as e:
-                print(f"Error parsing compendium references from {filename}: {e}")
+        try:
+            for mention in self.find_mentions(message):
+                name = mention.key[1]
+                if name not in refs:
+                    refs.append(name)
+        except Exception as e:
+            print(f"Error parsing compendium references from {self.get_filepath()}: {e}")
         return refs
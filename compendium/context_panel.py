@@ -1,7 +1,9 @@
-from PyQt5.QtWidgets import QWidget, QHBoxLayout, QSplitter, QTreeWidget, QTreeWidgetItem, QTextEdit
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QSplitter, QTreeWidget, QTreeWidgetItem, QCheckBox
 from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot
 from compendium.compendium_manager import CompendiumManager
 from compendium.enhanced_compendium import EnhancedCompendiumWindow
+from settings.settings_manager import WWSettingsManager
+from util.html_text import html_to_text
 
 class ContextPanel(QWidget):
     # Optional signal if ContextPanel itself updates the compendium in the future
@@ -14,10 +16,13 @@ class ContextPanel(QWidget):
     Selections persist until manually changed.
     """
 
-    def __init__(self, project_structure, project_name, parent=None):
+    def __init__(self, project_structure, project_name, parent=None, mention_option=False):
         super().__init__(parent)
         self.project_structure = project_structure  # reference to the project structure
         self.project_name = project_name
+        # Offer to add the compendium entries mentioned in the message (see get_selected_context_text)
+        self.mention_option = mention_option
+        self.mentions_checkbox = None
         self.controller = parent
         self.compendium_manager = CompendiumManager(project_name)
         self.uuid_map = {}  # Map UUIDs to QTreeWidgetItems
@@ -49,7 +54,20 @@ class ContextPanel(QWidget):
         self.compendium_tree.setHeaderHidden(True)
         self.build_compendium_tree()
         self.compendium_tree.itemChanged.connect(self.propagate_check_state)
-        splitter.addWidget(self.compendium_tree)
+        if self.mention_option:
+            compendium_widget = QWidget()
+            compendium_layout = QVBoxLayout(compendium_widget)
+            compendium_layout.setContentsMargins(0, 0, 0, 0)
+            compendium_layout.addWidget(self.compendium_tree)
+            self.mentions_checkbox = QCheckBox(_("Also include entries mentioned in the message"))
+            self.mentions_checkbox.setToolTip(_("Adds the compendium entries named in your message (by name or alias) to the context, even if they are not checked."))
+            self.mentions_checkbox.setChecked(WWSettingsManager.get_setting("general", "context_include_mentions", False))
+            self.mentions_checkbox.toggled.connect(
+                lambda checked: WWSettingsManager.set_setting("general", "context_include_mentions", checked))
+            compendium_layout.addWidget(self.mentions_checkbox)
+            splitter.addWidget(compendium_widget)
+        else:
+            splitter.addWidget(self.compendium_tree)
 
         # Optionally, set initial splitter ratios (here both panels share space equally)
         splitter.setStretchFactor(0, 1)
@@ -237,26 +255,42 @@ class ContextPanel(QWidget):
         # Recursively update further up
         self.update_parent_check_state(parent)
 
-    def get_selected_context_text(self):
-        """Collect selected text from both panels, formatted with headers."""
+    def get_selected_context_text(self, referenced_text=None):
+        """
+        Collect selected text from both panels, formatted with headers.
+        If referenced_text is given and the mentions checkbox is checked, the
+        compendium entries it mentions (by name or alias) are included as
+        well, after the checked ones.
+        """
         texts = []
-        temp_editor = QTextEdit()
 
         # Gather from Project panel
         root = self.project_tree.invisibleRootItem()
         for i in range(root.childCount()):
-            self._traverse_project_item(root.child(i), texts, temp_editor)
+            self._traverse_project_item(root.child(i), texts)
 
         # Gather from Compendium panel
+        included = set()
         for i in range(self.compendium_tree.topLevelItemCount()):
             cat_item = self.compendium_tree.topLevelItem(i)
             category = cat_item.text(0)
             for j in range(cat_item.childCount()):
                 entry_item = cat_item.child(j)
                 if entry_item.checkState(0) == Qt.Checked:
+                    included.add((category, entry_item.text(0)))
                     text = self.compendium_manager.get_text(category, entry_item.text(0))
                     texts.append(f"[Compendium Entry - {category} - {entry_item.text(0)}]:\n{text}")
 
+        # Entries mentioned in the referenced text
+        if referenced_text and self.mentions_checkbox is not None and self.mentions_checkbox.isChecked():
+            for mention in self.compendium_manager.find_mentions(referenced_text):
+                if mention.key in included:
+                    continue
+                included.add(mention.key)
+                category, entry = mention.key
+                text = self.compendium_manager.get_text(category, entry)
+                texts.append(f"[Compendium Entry - {category} - {entry}]:\n{text}")
+
         if texts:
             return "\n\n".join(texts)
         return ""
@@ -272,7 +306,7 @@ class ContextPanel(QWidget):
             return self.controller.model.load_autosave(hierarchy) or data.get("content")
         return None
 
-    def _traverse_project_item(self, item, texts, temp_editor):
+    def _traverse_project_item(self, item, texts):
         data = item.data(0, Qt.UserRole)
         hierarchy = self.controller.get_item_hierarchy(item)
         
@@ -281,8 +315,7 @@ class ContextPanel(QWidget):
             content = self._load_content(content_type, data.get("data"), hierarchy)
             
             if content:
-                temp_editor.setHtml(content)
-                content_text = temp_editor.toPlainText()
+                content_text = html_to_text(content)
                 if content_type == "summary":
                     texts.append(f"[Summary - {item.parent().text(0)}]:\n{content_text}")
                 elif content_type == "scene":
@@ -290,7 +323,7 @@ class ContextPanel(QWidget):
         
         # Recurse children
         for i in range(item.childCount()):
-            self._traverse_project_item(item.child(i), texts, temp_editor)
+            self._traverse_project_item(item.child(i), texts)
 
     def on_structure_changed(self, hierarchy, uuid):
         """Handle structure changes by updating only affected items."""
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Matching of compendium names in text.
+
+A MentionScanner compiles every name and alias of a compendium into one
+Aho-Corasick automaton, so a text is scanned once, whatever the number of
+entries, instead of once per name. Matching is case-insensitive and only
+accepts whole words (a name whose first or last character is a letter, digit
+or underscore must not be preceded or followed by one), like a regex \\b.
+
+scan() returns the mentions with their offsets in the original text. By
+default overlapping matches are resolved leftmost-longest, so "John Smith"
+is one mention of "John Smith", not also one of "John".
+"""
+from collections import Counter, deque, namedtuple
+from itertools import repeat
+
+Mention = namedtuple("Mention", "start end key")  # text[start:end] mentions key
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _folded(text: str):
+    """
+    Lowercase text character by character, keeping track of the original
+    offsets: (folded char, index of the original char, whether it is the
+    last folded char of it; a few characters lowercase to several).
+    """
+    for i, ch in enumerate(text):
+        lowered = ch.lower()
+        for j, folded in enumerate(lowered):
+            yield folded, i, j == len(lowered) - 1
+
+
+class MentionScanner:
+    """Aho-Corasick automaton over a set of names, each mapped to one or more keys."""
+
+    def __init__(self, terms):
+        """
+        Args:
+            terms: iterable of (name, key) pairs. A key is what scan() reports
+                   for the name (e.g. (category, entry name)); several names
+                   (aliases) may share a key and one name may have several keys.
+        """
+        self._goto = [{}]     # state -> {char: state}
+        self._fail = [0]
+        self._out = [[]]      # state -> [(term length, name, keys)] ending in the state
+        self._terms = {}      # folded name -> (name, [keys])
+        for name, key in terms:
+            folded = "".join(ch.lower() for ch in name.strip()) if name else ""
+            if not folded:
+                continue
+            keys = self._terms.setdefault(folded, (name.strip(), []))[1]
+            if key not in keys:
+                keys.append(key)
+        for folded, (name, keys) in self._terms.items():
+            state = 0
+            for ch in folded:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(folded), name, keys))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                # A state also ends every term that ends in its failure state
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _matches(self, text: str):
+        """Every whole-word match as (start, end, keys), in order of end."""
+        goto, fail, out = self._goto, self._fail, self._out
+        length = len(text)
+        lowered = text.lower()
+        if len(lowered) == length:
+            # Usual case: every character lowercases to one, offsets are unchanged
+            folded = zip(lowered, range(length), repeat(True))
+            starts = None
+        else:
+            folded = _folded(text)
+            starts = []  # original index of each folded char seen so far
+        state = 0
+        for ch, i, last in folded:
+            if starts is not None:
+                starts.append(i)
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state] or not last:
+                continue
+            end = i + 1
+            for term_length, name, keys in out[state]:
+                start = end - term_length if starts is None else starts[len(starts) - term_length]
+                if _is_word_char(name[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(name[-1]) and end < length and _is_word_char(text[end]):
+                    continue
+                yield start, end, keys
+
+    def scan(self, text: str, overlapping: bool = False) -> list:
+        """
+        Find the mentions in a text.
+
+        Args:
+            text (str): The text to scan.
+            overlapping (bool): Report every match, including matches inside
+                                or across other matches.
+
+        Returns:
+            list: Mention(start, end, key) tuples ordered by start; a match of a
+                  name with several keys gives one Mention per key.
+        """
+        if not text or not self._terms:
+            return []
+        matches = sorted(self._matches(text), key=lambda m: (m[0], -m[1]))
+        mentions = []
+        covered = 0
+        for start, end, keys in matches:
+            if not overlapping:
+                if start < covered:
+                    continue
+                covered = end
+            mentions.extend(Mention(start, end, key) for key in keys)
+        return mentions
+
+    def count(self, text: str) -> Counter:
+        """Number of mentions of each key in a text."""
+        return Counter(mention.key for mention in self.scan(text))
@@ -1,12 +1,11 @@
+# Page render workers are spawned and re-import this module as __mp_main__,
+# so everything beyond these imports happens in main().
 import sys
 import logging
-from settings.translation_manager import TranslationManager
-from settings.settings_manager import WWSettingsManager
 
 def exception_hook(exctype, value, traceback):
     logging.error("Unhandled exception", exc_info=(exctype, value, traceback))
     sys.__excepthook__(exctype, value, traceback)
-sys.excepthook = exception_hook
 
 def check_dependencies():
     """Check for required modules and notify the user via Tkinter if any are missing."""
@@ -37,18 +36,9 @@ def check_dependencies():
             print("Please install them by running:\n\npip install " + " ".join(missing))
         sys.exit(1)
 
-# Initialize translations
-translation_manager = TranslationManager()
-translation_manager.set_language(WWSettingsManager.get_general_settings().get("language", "en"))
-
-# Run dependency check after gettext is set up
-check_dependencies()
-
-from PyQt5.QtWidgets import QApplication
-from workbench import WorkbenchWindow
-from settings.theme_manager import ThemeManager
-
 def writingway_preload_settings(app):
+    from settings.settings_manager import WWSettingsManager
+    from settings.theme_manager import ThemeManager
     theme = WWSettingsManager.get_appearance_settings()["theme"]
     try:
         ThemeManager.apply_to_app(theme)
@@ -62,10 +52,26 @@ def writingway_preload_settings(app):
         app.setFont(font)
 
 def main():
+    sys.excepthook = exception_hook
+
+    # Initialize translations
+    from settings.translation_manager import TranslationManager
+    from settings.settings_manager import WWSettingsManager
+    translation_manager = TranslationManager()
+    translation_manager.set_language(WWSettingsManager.get_general_settings().get("language", "en"))
+
+    # Run dependency check after gettext is set up
+    check_dependencies()
+
+    from PyQt5.QtWidgets import QApplication
+    from workbench import WorkbenchWindow
+    from settings.llm_api_aggregator import WWApiAggregator
+
     app = QApplication(sys.argv)
     writingway_preload_settings(app)
     window = WorkbenchWindow(translation_manager)
     window.show()
+    WWApiAggregator.prefetch_models()
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import QFormLayout, QGroupBox, QComboBox
 from .prompt_utils import load_prompts
 from settings.llm_api_aggregator import WWApiAggregator
 from settings.settings_manager import WWSettingsManager
+from settings.model_catalog import WWModelCatalog
 
 class PromptPanel(QGroupBox):
     def __init__(self, prompt_style:str, parent=None):
@@ -37,6 +38,7 @@ class PromptPanel(QGroupBox):
         llm_settings_layout.addRow(self.provider_combo)
         llm_settings_layout.addRow(self.model_combo)
         self.setLayout(llm_settings_layout)
+        WWModelCatalog.models_updated.connect(self._on_models_updated)
     
     def repopulate_prompts(self):
         self._load_prompts()
@@ -56,6 +58,13 @@ class PromptPanel(QGroupBox):
 
         }
     
+    def _on_models_updated(self, _provider):
+        # A background refresh finished; repopulate but keep the chosen model
+        current_model = self.model_combo.currentText()
+        self._on_provider_combo_changed()
+        if current_model and self.model_combo.findText(current_model) >= 0:
+            self.model_combo.setCurrentText(current_model)
+
     def _populate_prompt_combo(self):
         self.prompt_combo.clear()
         self.prompt_combo.addItems([prompt["name"] for prompt in self.prompts])
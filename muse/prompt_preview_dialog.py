@@ -4,7 +4,7 @@ from PyQt5.QtGui import QFont, QKeySequence
 from PyQt5.QtWidgets import QShortcut
 from settings.theme_manager import ThemeManager
 import muse.prompt_handler as prompt_handler
-import tiktoken
+from util import tokenizer
 
 class PromptPreviewDialog(QDialog):
     def __init__(self, controller, conversation_payload=None, prompt_config=None, user_input=None, 
@@ -185,9 +185,7 @@ class PromptPreviewDialog(QDialog):
     def update_token_count(self):
         """Calculate and display the token count using tiktoken."""
         try:
-            encoding = tiktoken.get_encoding("cl100k_base")  # Use a common encoding, e.g., for GPT models
-            tokens = encoding.encode(self.final_prompt_text)
-            token_count = len(tokens)
+            token_count = tokenizer.count_tokens(self.final_prompt_text, tokenizer.encoding_for_provider())
             self.token_count_label.setText(_("Token Count: {}").format(token_count))
         except Exception as e:
             self.token_count_label.setText(_("Token Count: Error ({})").format(str(e)))
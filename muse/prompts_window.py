@@ -11,6 +11,7 @@ from settings.llm_api_aggregator import WWApiAggregator
 from settings.settings_manager import WWSettingsManager
 from settings.theme_manager import ThemeManager
 from settings.provider_info_dialog import ProviderInfoDialog
+from settings.model_catalog import WWModelCatalog
 
 class PromptsWindow(QDialog):
     def __init__(self, project_name, parent=None):
@@ -102,6 +103,7 @@ class PromptsWindow(QDialog):
         self.refresh_button.setToolTip(_("Refresh model list"))
         self.refresh_button.setMaximumWidth(30)
         self.refresh_button.clicked.connect(self.refresh_models)
+        WWModelCatalog.models_updated.connect(self.on_catalog_updated)
         model_header.addWidget(self.model_label)
         model_header.addWidget(self.refresh_button)
         model_header.addStretch()
@@ -220,6 +222,16 @@ class PromptsWindow(QDialog):
         except Exception as e:
             self.on_models_updated([], _("Error fetching models: {}").format(str(e)))
 
+    def on_catalog_updated(self, _provider):
+        """Show a model list that finished refreshing in the background."""
+        if not self.refresh_button.isEnabled():
+            return  # an explicit refresh is in progress
+        current_model = self.model_combo.currentText()
+        self.refresh_models(True)
+        idx = self.model_combo.findText(current_model)
+        if idx >= 0:
+            self.model_combo.setCurrentIndex(idx)
+
     def on_models_updated(self, models, error_msg):
         """Handle updated model list from the fetcher."""
         self.model_combo.clear()
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 import os
+import json
 import time
 import uuid
-from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QTimer, QCoreApplication, QEvent
 from . import project_settings_manager as psm
 from settings.settings_manager import WWSettingsManager
 from settings.autosave_manager import load_latest_autosave, save_scene, get_latest_autosave_path
-from .tree_manager import load_structure, save_structure, update_structure_from_tree, get_structure_file_path
+from .tree_manager import load_structure, get_structure_file_path
+from .save_queue import SaveQueue
+from .structure_index import StructureIndex
+
+STRUCTURE_SAVE_DELAY_MS = 500  # batch structure changes made in quick succession
+STRUCTURE_COMPACT_OPS = 500  # journaled changes before the structure file is rewritten
 
 class ProjectModel(QObject):
     """Manages project data and persistence."""
@@ -16,7 +22,22 @@ class ProjectModel(QObject):
     def __init__(self, project_name):
         super().__init__()
         self.project_name = project_name
+        # Scene and structure files are written by a background write-behind queue
+        self.save_queue = SaveQueue(project_name, self)
+        self.save_queue.scene_saved.connect(self._on_scene_saved)
+        self.save_queue.save_failed.connect(self.errorOccurred)
+        self.save_queue.start()
+        self._structure_timer = QTimer(self)
+        self._structure_timer.setSingleShot(True)
+        self._structure_timer.setInterval(STRUCTURE_SAVE_DELAY_MS)
+        self._structure_timer.timeout.connect(self._queue_structure)
+        self._structure_ops = []  # journal lines not yet queued
+        self._journal_length = 0  # journal lines written since the structure file
+        self._snapshot_pending = False
         self.structure = load_structure(project_name)
+        self.index = StructureIndex(self.structure)
+        if not os.path.exists(get_structure_file_path(project_name)):
+            self.save_structure()  # journaled changes need a file to apply to
         self.migrate_legacy_content()
         self.settings = self.load_settings()
         self.autosave_enabled = WWSettingsManager.get_setting("general", "enable_autosave", False)
@@ -36,28 +57,61 @@ class ProjectModel(QObject):
         """Save current settings to file."""
         psm.save_project_settings(self.project_name, self.settings)
 
-    def update_structure(self, tree):
-        """Update project structure from the tree widget and preserve latest_file."""
-        old_structure = self.structure
-        self.structure = update_structure_from_tree(tree, self.project_name)
-
-        # Preserve latest_file fields from old structure
-        def merge_latest_file(old_node, new_node):
-            if old_node.get("uuid") == new_node.get("uuid"):
-                if "latest_file" in old_node:
-                    new_node["latest_file"] = old_node["latest_file"]
-            for key in ["chapters", "scenes"]:
-                if key in old_node and key in new_node:
-                    for old_child, new_child in zip(old_node[key], new_node[key]):
-                        merge_latest_file(old_child, new_child)
-
-        for old_act, new_act in zip(old_structure.get("acts", []), self.structure.get("acts", [])):
-            merge_latest_file(old_act, new_act)
-        self.save_structure()
+    def apply(self, op):
+        """Apply a structure operation (see structure_index) and journal it."""
+        node = self.index.apply(op)
+        if node is not None:
+            self._structure_ops.append(json.dumps(op, ensure_ascii=False))
+            self._structure_timer.start()
+        return node
+
+    def update_node(self, uuid_val, **fields):
+        """Set fields (e.g. status or summary) of the node with the given UUID."""
+        return self.apply({"op": "set", "uuid": uuid_val, "fields": fields})
+
+    def move_node(self, uuid_val, index):
+        """Move a node to another position among its siblings."""
+        node = self.apply({"op": "move", "uuid": uuid_val, "parent": self.index.parent(uuid_val), "index": index})
+        if node:
+            self.structureChanged.emit(self.index.hierarchy(uuid_val), uuid_val)
+
+    def get_node(self, uuid_val):
+        return self.index.get(uuid_val)
 
     def save_structure(self):
-        """Persist the project structure."""
-        save_structure(self.project_name, self.structure)
+        """
+        Persist the whole project structure (batched, written in the background).
+        Changes made through apply() are journaled and need no call; this is
+        for changes made to self.structure directly.
+        """
+        self._snapshot_pending = True
+        self._structure_timer.start()
+
+    def _queue_structure(self):
+        self._journal_length += len(self._structure_ops)
+        if self._snapshot_pending or self._journal_length > STRUCTURE_COMPACT_OPS:
+            self.index.rebuild()
+            self.save_queue.enqueue_structure(self.structure)
+            self._journal_length = 0
+        elif self._structure_ops:
+            self.save_queue.enqueue_structure_ops(self._structure_ops)
+        self._structure_ops = []
+        self._snapshot_pending = False
+
+    def flush(self):
+        """Write all pending scene and structure saves now and wait for them."""
+        self.save_queue.flush()
+        # Apply scene_saved notifications still queued for this thread, then write their structure update
+        QCoreApplication.sendPostedEvents(self, QEvent.MetaCall)
+        if self._structure_timer.isActive():
+            self._structure_timer.stop()
+            self._queue_structure()
+            self.save_queue.flush()
+
+    def close(self):
+        """Flush pending saves and stop the save queue."""
+        self.flush()
+        self.save_queue.stop()
 
     def load_autosave(self, hierarchy):
         """Load the latest autosave for a given hierarchy."""
@@ -104,6 +158,7 @@ class ProjectModel(QObject):
         # Save updated structure
         if os.path.exists(backup_path):
             self.save_structure()
+            self.flush()  # do not leave the project without its structure file
 
     def load_scene_content(self, hierarchy):
         """Load content, prioritizing HTML, falling back to structure (for legacy)."""
@@ -112,40 +167,53 @@ class ProjectModel(QObject):
             return None
         uuid_val = node.setdefault("uuid", str(uuid.uuid4()))
 
+        # A save that has not reached the disk yet is newer than any file
+        content = self.save_queue.pending_content(uuid_val)
+        if content is not None:
+            return content
         content = load_latest_autosave(self.project_name, hierarchy, node)
         if content is None and "content" in node:  # Legacy content found, migrate it
             content = node["content"]
             filepath = save_scene(self.project_name, hierarchy, uuid_val, content)
             if filepath:
-                    del node["content"]
-                    node["latest_file"] = filepath
-                    self.save_structure()
+                    self.apply({"op": "unset", "uuid": uuid_val, "keys": ["content"]})
+                    self.update_node(uuid_val, latest_file=filepath)
                     self.structureChanged.emit(hierarchy, uuid_val)
         elif content and "latest_file" not in node:
             latest_autosave = get_latest_autosave_path(self.project_name, hierarchy)
             if latest_autosave:
-                node["latest_file"] = latest_autosave
-                self.save_structure()
+                self.update_node(uuid_val, latest_file=latest_autosave)
         if content and content.startswith("<!-- UUID:"):
             content = "\n".join(content.split("\n")[1:])
         return content
 
     def save_scene(self, hierarchy, content, expected_project_name=None):
-        """Save scene to HTML and remove content from structure."""
+        """
+        Queue the scene for saving to HTML. The file is written in the
+        background; _on_scene_saved updates the structure afterwards.
+        Returns True if the save was queued.
+        """
 
         node = self._get_node_by_hierarchy(hierarchy)
         if not node:
-            return None
+            return False
         uuid_val = node.setdefault("uuid", str(uuid.uuid4()))
 
-        filepath = save_scene(self.project_name, hierarchy, uuid_val, content, expected_project_name=expected_project_name)
-        if filepath:
-            if "content" in node:
-                del node["content"]
-            node["latest_file"] = filepath
-            self.save_structure()
-            self.structureChanged.emit(hierarchy, uuid_val)
-        return filepath
+        self.save_queue.enqueue_scene(hierarchy, uuid_val, content, expected_project_name=expected_project_name)
+        return True
+
+    @pyqtSlot(list, str, str)
+    def _on_scene_saved(self, hierarchy, uuid_val, filepath):
+        """Record a written scene file in the structure and remove legacy content."""
+        node = self.index.get(uuid_val)
+        if not node:
+            self.save_queue.acknowledge(uuid_val, filepath)
+            return
+        if "content" in node:
+            self.apply({"op": "unset", "uuid": uuid_val, "keys": ["content"]})
+        self.update_node(uuid_val, latest_file=filepath)
+        self.save_queue.acknowledge(uuid_val, filepath)
+        self.structureChanged.emit(hierarchy, uuid_val)
     
     def save_summary(self, hierarchy, summary_text):
         """
@@ -183,9 +251,8 @@ class ProjectModel(QObject):
                     os.remove(node["summary"])
                 except OSError:
                     pass
-            node["summary"] = filepath  # Store the filepath
-            node["latest_file"] = filepath  # Track latest summary file
-            self.save_structure()
+            # Store the filepath and track the latest summary file
+            self.update_node(uuid_val, summary=filepath, latest_file=filepath)
             self.last_saved_hierarchy = hierarchy
             self.structureChanged.emit(hierarchy, uuid_val)
             return filepath
@@ -210,7 +277,7 @@ class ProjectModel(QObject):
     
         node = None
         if uuid:
-            node = self._find_node_by_uuid(self.structure.get("acts", []), uuid)
+            node = self.index.get(uuid)
         elif hierarchy:
             node = self._get_node_by_hierarchy(hierarchy)
         if node and "summary" in node:
@@ -229,16 +296,6 @@ class ProjectModel(QObject):
             return summary_ref  # Legacy case: return text if not a filepath
         return None
     
-    def _find_node_by_uuid(self, nodes, target_uuid):
-        for node in nodes:
-            if node.get("uuid") == target_uuid:
-                return node
-            for child in node.get("chapters", []) + node.get("scenes", []):
-                result = self._find_node_by_uuid([child], target_uuid)
-                if result:
-                    return result
-        return None
-    
     def _check_duplicate_name(self, nodes, name, exclude_uuid=None):
         """Check if a name already exists in a list of nodes, excluding a specific UUID if provided."""
         for node in nodes:
@@ -247,7 +304,7 @@ class ProjectModel(QObject):
         return False
     
     def add_act(self, act_name):
-        if self._check_duplicate_name(self.structure.get("acts", []), act_name):
+        if self._check_duplicate_name(self.index.children(None), act_name):
             self.errorOccurred.emit(_("An Act named '{}' already exists. Please choose a unique name.").format(act_name))
             return
         
@@ -257,105 +314,59 @@ class ProjectModel(QObject):
             "summary": _("This is the summary for {}.").format(act_name),
             "chapters": []
         }
-        self.structure.setdefault("acts", []).append(new_act)
-        self.save_structure()
+        self.apply({"op": "insert", "parent": None, "index": len(self.index.children(None)), "node": new_act})
         self.structureChanged.emit([act_name], new_act["uuid"])
 
     def add_chapter(self, act_name, chapter_name):
-        for act in self.structure.get("acts", []):
-            if act.get("name") == act_name:
-                if self._check_duplicate_name(act.get("chapters", []), chapter_name):
-                    self.errorOccurred.emit(_("A Chapter named '{}' already exists in Act '{}'. Please choose a unique name.").format(chapter_name, act_name))
-                    return
-                new_chapter = {
-                    "uuid": str(uuid.uuid4()),
-                    "name": chapter_name,
-                    "summary": _("This is the summary for {}.").format(chapter_name),
-                    "scenes": []
-                }
-                act.setdefault("chapters", []).append(new_chapter)
-                self.save_structure()
-                self.structureChanged.emit([act_name, chapter_name], new_chapter["uuid"])
-                break
+        act = self.index.find([act_name])
+        if not act:
+            return
+        if self._check_duplicate_name(act.get("chapters", []), chapter_name):
+            self.errorOccurred.emit(_("A Chapter named '{}' already exists in Act '{}'. Please choose a unique name.").format(chapter_name, act_name))
+            return
+        new_chapter = {
+            "uuid": str(uuid.uuid4()),
+            "name": chapter_name,
+            "summary": _("This is the summary for {}.").format(chapter_name),
+            "scenes": []
+        }
+        self.apply({"op": "insert", "parent": act["uuid"], "index": len(act.get("chapters", [])), "node": new_chapter})
+        self.structureChanged.emit([act_name, chapter_name], new_chapter["uuid"])
 
     def add_scene(self, act_name, chapter_name, scene_name):
-        for act in self.structure.get("acts", []):
-            if act.get("name") == act_name:
-                for chapter in act.get("chapters", []):
-                    if chapter.get("name") == chapter_name:
-                        if self._check_duplicate_name(chapter.get("scenes", []), scene_name):
-                            self.errorOccurred.emit(_("A Scene named '{}' already exists in Chapter '{}' of Act '{}'. Please choose a unique name.").format(scene_name, chapter_name, act_name))
-                            return
-                        new_scene = {
-                            "uuid": str(uuid.uuid4()),
-                            "name": scene_name
-                        }
-                        chapter.setdefault("scenes", []).append(new_scene)
-                        self.save_structure()
-                        self.structureChanged.emit([act_name, chapter_name, scene_name], new_scene["uuid"])
-                        break
-                break
+        chapter = self.index.find([act_name, chapter_name])
+        if not chapter:
+            return
+        if self._check_duplicate_name(chapter.get("scenes", []), scene_name):
+            self.errorOccurred.emit(_("A Scene named '{}' already exists in Chapter '{}' of Act '{}'. Please choose a unique name.").format(scene_name, chapter_name, act_name))
+            return
+        new_scene = {
+            "uuid": str(uuid.uuid4()),
+            "name": scene_name
+        }
+        self.apply({"op": "insert", "parent": chapter["uuid"], "index": len(chapter.get("scenes", [])), "node": new_scene})
+        self.structureChanged.emit([act_name, chapter_name, scene_name], new_scene["uuid"])
 
     def rename_node(self, hierarchy, new_name):
         node = self._get_node_by_hierarchy(hierarchy)
         if not node:
             return
         uuid_val = node["uuid"]
-        parent_nodes = self._get_parent_nodes(hierarchy)
-        if self._check_duplicate_name(parent_nodes, new_name, exclude_uuid=uuid_val):
+        if self._check_duplicate_name(self.index.siblings(uuid_val), new_name, exclude_uuid=uuid_val):
             level_name = "Act" if len(hierarchy) == 1 else "Chapter" if len(hierarchy) == 2 else "Scene"
             parent_context = " in " + " -> ".join(hierarchy[:-1]) if len(hierarchy) > 1 else ""
             self.errorOccurred.emit(_("A {} named '{}' already exists {}. Please choose a unique name.").format(level_name, new_name, parent_context))
             return
-        old_hierarchy = hierarchy.copy()
-        node["name"] = new_name
-        self.save_structure()
-        new_hierarchy = old_hierarchy[:-1] + [new_name]  # Use new hierarchy
+        self.update_node(uuid_val, name=new_name)
+        new_hierarchy = hierarchy[:-1] + [new_name]  # Use new hierarchy
         self.structureChanged.emit(new_hierarchy, uuid_val)
 
-    def _get_parent_nodes(self, hierarchy):
-        """Get the list of sibling nodes at the same level as the node in the hierarchy."""
-        if not hierarchy:
-            return []
-        current = self.structure.get("acts", [])
-        for level, name in enumerate(hierarchy[:-1]):
-            for item in current:
-                if item.get("name") == name:
-                    current = item.get("chapters" if level == 0 else "scenes", [])
-                    break
-        return current
-    
     def delete_node(self, hierarchy):
         node = self._get_node_by_hierarchy(hierarchy)
         if node:
             uuid_val = node["uuid"]
-        parent, index = self._get_parent_and_index(hierarchy)
-        if parent and index is not None:
-            parent.pop(index)
-            self.save_structure()
+            self.apply({"op": "remove", "uuid": uuid_val})
             self.structureChanged.emit(hierarchy, uuid_val)
 
     def _get_node_by_hierarchy(self, hierarchy):
-        current = self.structure.get("acts", [])
-        for level, name in enumerate(hierarchy):
-            for item in current:
-                if item.get("name") == name:
-                    if level == len(hierarchy) - 1:
-                        return item
-                    current = item.get("chapters" if level == 0 else "scenes", [])
-                    break
-        return None
-
-    def _get_parent_and_index(self, hierarchy):
-        current = self.structure.get("acts", [])
-        parent = None
-        for level, name in enumerate(hierarchy[:-1]):
-            for item in current:
-                if item.get("name") == name:
-                    parent = current
-                    current = item.get("chapters" if level == 0 else "scenes", [])
-                    break
-        for i, item in enumerate(current):
-            if item.get("name") == hierarchy[-1]:
-                return current, i
-        return None, None
\ No newline at end of file
+        return self.index.find(hierarchy)
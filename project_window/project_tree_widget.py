@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, QMenu, 
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QMenu, 
                              QMessageBox, QInputDialog)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
@@ -13,6 +13,7 @@ class ProjectTreeWidget(QWidget):
         self.controller = controller
         self.model = model
         self.tree = QTreeWidget()
+        self.items = {}  # uuid -> QTreeWidgetItem
         self.init_ui()
         self.model.structureChanged.connect(self.refresh_tree)
         self.model.errorOccurred.connect(self.show_error_message)
@@ -32,8 +33,21 @@ class ProjectTreeWidget(QWidget):
     def populate(self):
         """Populate the tree with the project structure."""
         tree_manager.populate_tree(self.tree, self.model.structure)
+        self.items = {}
+        self._register_items(self.tree.invisibleRootItem())
         self.assign_all_icons()
 
+    def _register_items(self, parent):
+        for i in range(parent.childCount()):
+            item = parent.child(i)
+            self.items[(item.data(0, Qt.UserRole) or {}).get("uuid")] = item
+            self._register_items(item)
+
+    def _forget_items(self, item):
+        self.items.pop((item.data(0, Qt.UserRole) or {}).get("uuid"), None)
+        for i in range(item.childCount()):
+            self._forget_items(item.child(i))
+
     def update_scene_status_icon(self, item):
         """Update the status icon for a scene item."""
         tint = self.controller.icon_tint
@@ -62,30 +76,35 @@ class ProjectTreeWidget(QWidget):
 
     def _sync_tree_with_structure(self, hierarchy, uuid):
         """Synchronize the tree with the project structure incrementally."""
-        def find_item_by_uuid(parent, target_uuid, level=0):
-            for i in range(parent.childCount()):
-                item = parent.child(i)
-                item_data = item.data(0, Qt.UserRole)
-                if item_data.get("uuid") == target_uuid:
-                    return item, level
-                found, found_level = find_item_by_uuid(item, target_uuid, level + 1)
-                if found:
-                    return found, found_level
-            return None, -1
-
         root = self.tree.invisibleRootItem()
-        item, level = find_item_by_uuid(root, uuid)
+        item = self.items.get(uuid)
+        node = self.model.get_node(uuid)
         if item:
-            node = self.model._get_node_by_hierarchy(hierarchy)
-            if node:  # Update or create
+            if node:  # Update, rename or move
                 item.setText(0, node["name"])
                 item.setData(0, Qt.UserRole, node)
-                self.assign_item_icon(item, level)
+                parent = item.parent() or root
+                index = self.model.index.index_of(uuid)
+                if index is not None and parent.indexOfChild(item) != index:
+                    parent.takeChild(parent.indexOfChild(item))
+                    parent.insertChild(index, item)
+                self.assign_item_icon(item, self.get_item_level(item))
             else:  # Delete
+                self._forget_items(item)
                 parent = item.parent() or root
                 parent.removeChild(item)
-        else:  # New item, rebuild or insert
-            self.populate()  # Fallback to full rebuild for simplicity
+        elif node:  # New item: insert it under its parent
+            parent_uuid = self.model.index.parent(uuid)
+            parent = self.items.get(parent_uuid) if parent_uuid else root
+            if parent is None or node.get("chapters") or node.get("scenes"):
+                self.populate()  # Fallback to full rebuild
+                return
+            item = QTreeWidgetItem([node["name"]])
+            item.setData(0, Qt.UserRole, node)
+            parent.insertChild(self.model.index.index_of(uuid), item)
+            parent.setExpanded(True)
+            self.items[uuid] = item
+            self.assign_item_icon(item, self.get_item_level(item))
 
     def get_item_level(self, item):
         """Calculate the level of an item in the tree."""
@@ -1,7 +1,7 @@
 import os
 import time
 import json
-import tiktoken
+from util import tokenizer
 import re
 import logging
 import threading
@@ -21,11 +21,11 @@ from .rewrite_feature import RewriteDialog
 from util.tts_manager import WW_TTSManager
 from compendium.compendium_panel import CompendiumPanel
 from settings.backup_manager import show_backup_dialog
-from settings.llm_api_aggregator import WWApiAggregator
 from settings.llm_worker import LLMWorker
 from settings.settings_manager import WWSettingsManager
 from settings.theme_manager import ThemeManager
 from workshop.workshop import WorkshopWindow
+from workshop.project_indexer import ProjectIndexer
 from util.text_analysis_gui import TextAnalysisApp
 from util.web_llm import MainWindow
 from util.whisper_app import WhisperApp
@@ -55,6 +55,11 @@ class ProjectWindow(QMainWindow):
     def __init__(self, project_name, compendium_window):
         super().__init__()
         self.model = ProjectModel(project_name)
+        # Background embedding indexer fed by scene saves
+        self.indexer = ProjectIndexer(project_name, self)
+        self.indexer.start()
+        self.indexer.sync_structure(self.model.structure)
+        self.model.structureChanged.connect(lambda *_: self.indexer.sync_structure(self.model.structure))
         self.current_theme = WWSettingsManager.get_appearance_settings()["theme"]
         self.icon_tint = QColor(ThemeManager.ICON_TINTS.get(self.current_theme, "black"))
         self.tts_playing = False
@@ -184,6 +189,8 @@ class ProjectWindow(QMainWindow):
         if hasattr(self, 'autosave_timer') and self.autosave_timer.isActive():
             self.autosave_timer.stop()
         self.write_settings()
+        self.model.close()  # Flush queued saves before the indexer stops listening
+        self.indexer.stop()
         event.accept()
 
     # This used to ask if you want to save. Now it just autosaves.
@@ -247,7 +254,8 @@ class ProjectWindow(QMainWindow):
         scene_data["status"] = new_status
         item.setData(0, Qt.UserRole, scene_data)
         self.project_tree.assign_item_icon(item, self.project_tree.get_item_level(item))  # Update icon
-        self.model.update_structure(self.project_tree.tree)
+        if "uuid" in scene_data:
+            self.model.update_node(scene_data["uuid"], status=new_status)
 
     def manual_save_scene(self):
         current_item = self.project_tree.tree.currentItem()
@@ -259,8 +267,7 @@ class ProjectWindow(QMainWindow):
             QMessageBox.warning(self, _("Manual Save"), _("There is no content to save."))
             return
         hierarchy = self.get_item_hierarchy(current_item)
-        filepath = self.model.save_scene(hierarchy, content)
-        if filepath:
+        if self.model.save_scene(hierarchy, content):
             self.update_save_status(_("Scene manually saved"))
             self.model.unsaved_changes = False
 
@@ -273,8 +280,7 @@ class ProjectWindow(QMainWindow):
         if not content.strip():
             return
         hierarchy = self.get_item_hierarchy(current_item)
-        filepath = self.model.save_scene(hierarchy, content, expected_project_name=self.model.project_name)
-        if filepath:
+        if self.model.save_scene(hierarchy, content, expected_project_name=self.model.project_name):
             self.update_save_status(_("Scene autosaved"))
             self.model.unsaved_changes = False
 
@@ -294,16 +300,17 @@ class ProjectWindow(QMainWindow):
         if not current_item or self.project_tree.get_item_level(current_item) < 2:
             QMessageBox.warning(self, _("Backup Versions"), _("Please select a scene to view backups."))
             return
-        backup_file_path = show_backup_dialog(self, self.model.project_name, current_item.text(0))
-        if backup_file_path:
-            with open(backup_file_path, "r", encoding="utf-8") as f:
-                content = f.read()
+        hierarchy = self.get_item_hierarchy(current_item)
+        scene_data = current_item.data(0, Qt.UserRole) or {}
+        self.model.flush()  # list the revisions that are still queued for saving too
+        revision = show_backup_dialog(self, self.model.project_name, hierarchy, scene_data.get("uuid"))
+        if revision:
             editor = self.scene_editor.editor
-            if backup_file_path.endswith(".html"):
-                editor.setHtml(content)
+            if revision["file"].endswith(".txt"):
+                editor.setPlainText(revision["content"])
             else:
-                editor.setPlainText(content)
-            QMessageBox.information(self, _("Backup Loaded"), _("Backup loaded from:\n{}").format(backup_file_path))
+                editor.setHtml(revision["content"])
+            QMessageBox.information(self, _("Backup Loaded"), _("Backup loaded from:\n{}").format(revision["file"]))
 
     def handle_pov_change(self, index):
         value = self.bottom_stack.pov_combo.currentText()
@@ -464,9 +471,8 @@ class ProjectWindow(QMainWindow):
     def retry_with_truncated_story(self):
         full_text = self.scene_editor.editor.toPlainText()
         prose_config = self.bottom_stack.prose_prompt_panel.get_prompt()
-        tokens = tiktoken.get_encoding("cl100k_base").encode(full_text)
         max_tokens = prose_config.get("max_tokens", 2000) * 0.5  # Use half for safety
-        truncated = self.encoding.decode(tokens[-int(max_tokens):])
+        truncated = tokenizer.truncate_tokens(full_text, int(max_tokens), keep_end=True)
         self.retry_with_summary(truncated)
 
     def update_text(self, text):
@@ -524,8 +530,6 @@ class ProjectWindow(QMainWindow):
             if hasattr(self, 'worker') and self.worker and self.worker.isRunning():
                 logging.debug("Calling worker.stop()")
                 self.worker.stop()
-                logging.debug("Calling WWApiAggregator.interrupt()")
-                WWApiAggregator.interrupt()
             self.bottom_stack.send_button.setEnabled(True)
             self.bottom_stack.preview_text.setReadOnly(False)
             logging.debug("Calling cleanup_worker")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Write-behind persistence for a project window.
+
+Scene and structure saves are handed to a SaveQueue thread instead of being
+written on the GUI thread:
+- saves of one scene that arrive before the worker gets to them are
+  coalesced, so only the newest content is written,
+- structure changes are appended to the structure journal; a full
+  structure snapshot (which supersedes the journal) is written only when
+  requested, from the newest snapshot,
+- files are written atomically (temp file + rename),
+- flush() blocks until everything queued is on disk (used on close).
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from settings.autosave_manager import save_scene
+from .tree_manager import save_structure, append_structure_journal
+
+COALESCE_SECONDS = 0.3  # collect rapid saves before writing
+
+
+class SaveQueue(QThread):
+    scene_saved = pyqtSignal(list, str, str)  # hierarchy, uuid, filepath
+    save_failed = pyqtSignal(str)  # error message
+
+    def __init__(self, project_name, parent=None):
+        super().__init__(parent)
+        self.project_name = project_name
+        self._cond = threading.Condition()
+        self._scenes = OrderedDict()  # uuid -> (hierarchy, content, expected_project_name)
+        self._in_flight = {}  # uuid -> content being written
+        self._written = {}  # uuid -> (filepath, content) written but not yet acknowledged
+        self._structure = None  # newest structure snapshot not yet written
+        self._structure_ops = []  # journal lines queued after that snapshot
+        self._busy = False
+        self._flushing = False
+        self._running = True
+
+    # ------------------------------------------------------------------
+    # Producers (GUI thread)
+    # ------------------------------------------------------------------
+    def enqueue_scene(self, hierarchy, uuid, content, expected_project_name=None):
+        """Queue a scene save; replaces a queued save of the same scene."""
+        with self._cond:
+            self._scenes.pop(uuid, None)
+            self._scenes[uuid] = (list(hierarchy), content, expected_project_name)
+            self._cond.notify_all()
+
+    def enqueue_structure(self, structure):
+        """Queue a snapshot of the structure; only the newest snapshot is written."""
+        snapshot = copy.deepcopy(structure)
+        with self._cond:
+            self._structure = snapshot
+            self._structure_ops = []  # already part of the snapshot
+            self._cond.notify_all()
+
+    def enqueue_structure_ops(self, lines):
+        """Queue JSON-encoded structure operations for the journal."""
+        with self._cond:
+            self._structure_ops.extend(lines)
+            self._cond.notify_all()
+
+    def pending_content(self, uuid):
+        """Content of a scene save that is queued or being written, or None."""
+        with self._cond:
+            if uuid in self._scenes:
+                return self._scenes[uuid][1]
+            if uuid in self._in_flight:
+                return self._in_flight[uuid]
+            written = self._written.get(uuid)
+            return written[1] if written else None
+
+    def acknowledge(self, uuid, filepath):
+        """Called once the structure points at filepath: the file is now the source of the content."""
+        with self._cond:
+            if self._written.get(uuid, (None,))[0] == filepath:
+                del self._written[uuid]
+
+    def flush(self, timeout=None) -> bool:
+        """Write everything queued now and wait for it; False on timeout."""
+        if not self.isRunning():
+            with self._cond:
+                scenes, self._scenes = self._scenes, OrderedDict()
+                structure, self._structure = self._structure, None
+                ops, self._structure_ops = self._structure_ops, []
+            self._write(scenes, structure, ops)
+            return True
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(
+                lambda: not (self._has_work() or self._busy), timeout)
+            self._flushing = False
+            return done
+
+    def stop(self):
+        """Flush pending saves and stop the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self.wait()
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _has_work(self):
+        return bool(self._scenes) or self._structure is not None or bool(self._structure_ops)
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._has_work() or not self._running)
+                if not self._has_work():
+                    break  # stopped with nothing left to write
+                # Let rapid saves coalesce unless a flush or stop is waiting
+                self._cond.wait_for(lambda: self._flushing or not self._running, COALESCE_SECONDS)
+                scenes, self._scenes = self._scenes, OrderedDict()
+                structure, self._structure = self._structure, None
+                ops, self._structure_ops = self._structure_ops, []
+                self._in_flight = {uuid: job[1] for uuid, job in scenes.items()}
+                self._busy = True
+            try:
+                self._write(scenes, structure, ops)
+            finally:
+                with self._cond:
+                    self._in_flight = {}
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, scenes, structure, ops):
+        for uuid, (hierarchy, content, expected_project_name) in scenes.items():
+            try:
+                filepath = save_scene(self.project_name, hierarchy, uuid, content,
+                                      expected_project_name=expected_project_name)
+            except Exception as e:
+                print("Error during background save:", e)
+                self.save_failed.emit(_("Could not save scene '{}': {}").format(hierarchy[-1], e))
+                continue
+            if filepath:
+                with self._cond:
+                    self._written[uuid] = (filepath, content)
+                self.scene_saved.emit(hierarchy, uuid, filepath)
+        if structure is not None:
+            save_structure(self.project_name, structure)
+        if ops:
+            append_structure_journal(self.project_name, ops)
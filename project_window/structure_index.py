@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+In-memory index of a project structure ({"acts": [{"chapters": [{"scenes": [...]}]}]}).
+
+The structure dict stays the single source of truth (it is what is saved and
+what other panels read); the index adds lookup tables over it:
+- nodes:   uuid -> node
+- parents: uuid -> parent uuid (None for acts)
+- paths:   tuple of names (act, chapter, scene) -> uuid
+
+Every change goes through apply(), which takes a small JSON-able operation,
+so the same operations can be appended to the structure journal
+(tree_manager) and replayed on load. Operations are idempotent (they
+describe the resulting state), so replaying a journal onto a snapshot that
+already contains some of them is harmless:
+    {"op": "insert", "parent": uuid|None, "index": int|None, "node": {...}}
+    {"op": "remove", "uuid": uuid}
+    {"op": "move", "uuid": uuid, "parent": uuid|None, "index": int}
+    {"op": "set", "uuid": uuid, "fields": {...}}
+    {"op": "unset", "uuid": uuid, "keys": [...]}
+"""
+import uuid
+
+CHILD_KEYS = ("chapters", "scenes")  # children of an act, of a chapter
+
+
+def child_key(level):
+    """Key of the child list of a node at level (0: act, 1: chapter), None for scenes."""
+    return CHILD_KEYS[level] if level < len(CHILD_KEYS) else None
+
+
+class StructureIndex:
+    def __init__(self, structure):
+        self.structure = structure
+        self.rebuild()
+
+    def rebuild(self):
+        """Re-index the whole structure (after it was changed without apply())."""
+        self.nodes = {}
+        self.parents = {}
+        self.paths = {}
+        for act in self.structure.setdefault("acts", []):
+            self._index(act, None, ())
+
+    def _index(self, node, parent_uuid, parent_path):
+        node_uuid = node.setdefault("uuid", str(uuid.uuid4()))
+        path = parent_path + (node.get("name"),)
+        self.nodes[node_uuid] = node
+        self.parents[node_uuid] = parent_uuid
+        self.paths.setdefault(path, node_uuid)  # the first of duplicate names wins, as in a name walk
+        key = child_key(len(path) - 1)
+        for child in node.get(key, []) if key else []:
+            self._index(child, node_uuid, path)
+
+    def _unindex(self, node, path):
+        node_uuid = node.get("uuid")
+        self.nodes.pop(node_uuid, None)
+        self.parents.pop(node_uuid, None)
+        if self.paths.get(path) == node_uuid:
+            del self.paths[path]
+        key = child_key(len(path) - 1)
+        for child in node.get(key, []) if key else []:
+            self._unindex(child, path + (child.get("name"),))
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get(self, node_uuid):
+        return self.nodes.get(node_uuid)
+
+    def parent(self, node_uuid):
+        return self.parents.get(node_uuid)
+
+    def hierarchy(self, node_uuid):
+        """Names from the act down to the node."""
+        names = []
+        while node_uuid is not None and node_uuid in self.nodes:
+            names.insert(0, self.nodes[node_uuid].get("name"))
+            node_uuid = self.parents.get(node_uuid)
+        return names
+
+    def level(self, node_uuid):
+        return len(self.hierarchy(node_uuid)) - 1
+
+    def find(self, hierarchy):
+        """Node at a name hierarchy ([act], [act, chapter] or [act, chapter, scene]), or None."""
+        node_uuid = self.paths.get(tuple(hierarchy))
+        return self.nodes.get(node_uuid) if node_uuid else None
+
+    def siblings(self, node_uuid):
+        """The list that holds the node (the acts, or the children of its parent)."""
+        parent_uuid = self.parents.get(node_uuid)
+        return self.children(parent_uuid)
+
+    def children(self, parent_uuid):
+        """Child list of a node (the acts for None); created if missing."""
+        if parent_uuid is None:
+            return self.structure.setdefault("acts", [])
+        key = child_key(self.level(parent_uuid))
+        return self.nodes[parent_uuid].setdefault(key, []) if key else []
+
+    def index_of(self, node_uuid):
+        siblings = self.siblings(node_uuid)
+        for i, node in enumerate(siblings):
+            if node.get("uuid") == node_uuid:
+                return i
+        return None
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+    def apply(self, op):
+        """Apply one operation; returns the node it changed (None if it does not apply)."""
+        kind = op["op"]
+        if kind == "insert":
+            node = op["node"]
+            if node.get("uuid") in self.nodes:
+                self._detach(node["uuid"])
+            if op.get("parent") is not None and op["parent"] not in self.nodes:
+                return None
+            return self._attach(node, op.get("parent"), op.get("index"))
+        node = self.nodes.get(op["uuid"])
+        if node is None:
+            return None
+        if kind == "remove":
+            self._detach(op["uuid"])
+        elif kind == "move":
+            parent_uuid = op.get("parent", self.parents.get(op["uuid"]))
+            if parent_uuid is not None and parent_uuid not in self.nodes:
+                return None
+            self._detach(op["uuid"])
+            self._attach(node, parent_uuid, op.get("index"))
+        elif kind == "set":
+            if "name" in op["fields"]:
+                # The paths of the node and its subtree change with the name
+                parent_uuid = self.parents.get(op["uuid"])
+                path = tuple(self.hierarchy(op["uuid"]))
+                self._unindex(node, path)
+                node.update(op["fields"])
+                self._index(node, parent_uuid, path[:-1])
+            else:
+                node.update(op["fields"])
+        elif kind == "unset":
+            for key in op["keys"]:
+                node.pop(key, None)
+        return node
+
+    def _attach(self, node, parent_uuid, index):
+        siblings = self.children(parent_uuid)
+        if index is None or not 0 <= index <= len(siblings):
+            index = len(siblings)
+        siblings.insert(index, node)
+        parent_path = tuple(self.hierarchy(parent_uuid)) if parent_uuid is not None else ()
+        self._index(node, parent_uuid, parent_path)
+        return node
+
+    def _detach(self, node_uuid):
+        node = self.nodes[node_uuid]
+        path = tuple(self.hierarchy(node_uuid))
+        siblings = self.siblings(node_uuid)
+        for i, sibling in enumerate(siblings):
+            if sibling is node:
+                del siblings[i]
+                break
+        self._unindex(node, path)
+        return node
@@ -87,7 +87,8 @@ class SummaryController(QObject):
         item_data = self.current_item.data(0, Qt.UserRole) or {"name": self.current_item.text(0)}
         item_data["summary"] = generated_summary
         self.current_item.setData(0, Qt.UserRole, item_data)
-        self.project_tree.model.update_structure(self.project_tree.tree)
+        if "uuid" in item_data:
+            self.project_tree.model.update_node(item_data["uuid"], summary=generated_summary)
         self.status_updated.emit(_("Summary generated successfully."))
 
     def _show_warning(self, message):
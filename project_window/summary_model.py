@@ -1,31 +1,29 @@
 import re
-import tiktoken
 from PyQt5.QtCore import Qt
+from util import tokenizer
+from util.html_text import html_to_text
 
 class SummaryModel:
     def __init__(self, project_name, max_tokens=16000, encoding_name="cl100k_base"):
         self.project_name = project_name
         self.max_tokens = max_tokens
-        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.encoding_name = encoding_name
+        self.encoding = tokenizer.get_encoding(encoding_name)
         self.structure = None  # Set by controller
 
     def optimize_text(self, html_content):
         """Convert HTML to optimized plain text for LLM."""
-        from PyQt5.QtWidgets import QTextEdit
-        temp_editor = QTextEdit()
-        temp_editor.setHtml(html_content)
-        text = temp_editor.toPlainText()
+        text = html_to_text(html_content)
 
         # Minimal whitespace normalization: collapse multiple newlines/spaces, but preserve word boundaries
         text = re.sub(r'\n+', '\n', text.strip())  # Collapse newlines
         text = re.sub(r'[ \t]+', ' ', text)  # Collapse spaces/tabs, but keep them
         
-        tokens = self.encoding.encode(text)
-        if len(tokens) > self.max_tokens:
-            return self._chunk_text(text, tokens)
+        if tokenizer.count_tokens(text, self.encoding_name) > self.max_tokens:
+            return self._chunk_text(text)
         return text
 
-    def _chunk_text(self, text, tokens):
+    def _chunk_text(self, text):
         """Chunk text to fit token limit."""
         target_tokens = int(self.max_tokens * 0.9)
         trimmed_text = []
@@ -33,25 +31,21 @@ class SummaryModel:
 
         # Split by newlines first (paragraph-like boundaries)
         lines = text.split('\n')
-        for line in lines:
-            line_tokens = self.encoding.encode(line)
-            if current_tokens + len(line_tokens) <= target_tokens:
+        line_counts = tokenizer.count_tokens_batch(lines, self.encoding_name)
+        for line, line_count in zip(lines, line_counts):
+            if current_tokens + line_count <= target_tokens:
                 trimmed_text.append(line)
-                current_tokens += len(line_tokens)
+                current_tokens += line_count
             else:
                 # If line exceeds remaining tokens, split by characters
                 remaining_tokens = target_tokens - current_tokens
                 if remaining_tokens > 0:
                     # Decode back a subset of tokens
-                    partial_line = self.encoding.decode(line_tokens[:remaining_tokens])
-                    trimmed_text.append(partial_line)
+                    trimmed_text.append(tokenizer.truncate_tokens(line, remaining_tokens, self.encoding_name))
                 break
 
         result = '\n'.join(trimmed_text)
-        final_tokens = self.encoding.encode(result)
-        if len(final_tokens) > self.max_tokens:
-            result = self.encoding.decode(final_tokens[:self.max_tokens])
-        return result
+        return tokenizer.truncate_tokens(result, self.max_tokens, self.encoding_name)
 
     def gather_child_content(self, item):
         """Recursively gather content from child scenes."""
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QTextEdit, QPushButton, QHBoxLayout, QMessageBox
 from PyQt5.QtCore import Qt, pyqtSignal
-import tiktoken
+from util import tokenizer
 
 class TokenLimitDialog(QDialog):
     """
@@ -31,7 +31,8 @@ class TokenLimitDialog(QDialog):
         self.error_message = error_message
         self.initial_summary = initial_summary
         self.max_tokens = max_tokens
-        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.encoding_name = encoding_name
+        self.encoding = tokenizer.get_encoding(encoding_name)
         self.init_ui()
 
     def init_ui(self):
@@ -75,7 +76,7 @@ class TokenLimitDialog(QDialog):
     def update_token_count(self):
         """Update the token count display based on the current text."""
         text = self.summary_editor.toPlainText()
-        tokens = len(self.encoding.encode(text))
+        tokens = tokenizer.count_tokens(text, self.encoding_name)
         self.token_label.setText(_("Tokens: {}/{}"). format(tokens, self.max_tokens))
         # Optional: Highlight if over limit
         if tokens > self.max_tokens:
@@ -5,6 +5,8 @@ import uuid
 from PyQt5.QtWidgets import QTreeWidgetItem
 from PyQt5.QtCore import Qt
 from settings.settings_manager import WWSettingsManager
+from settings.autosave_manager import write_text_atomic
+from .structure_index import StructureIndex
 
 def get_structure_file_path(project_name, backward_compat=False):
     """Return the path to the project-specific structure file."""
@@ -33,9 +35,36 @@ def get_structure_file_path(project_name, backward_compat=False):
                     os.rename(oldpath, path)
     return path
 
+def get_structure_journal_path(project_name):
+    """Return the path to the journal of structure changes made since the structure file was written."""
+    return os.path.splitext(get_structure_file_path(project_name))[0] + ".journal"
+
+def append_structure_journal(project_name, lines):
+    """Append JSON-encoded structure operations (see structure_index) to the journal."""
+    try:
+        with open(get_structure_journal_path(project_name), "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+    except Exception as e:
+        print("Error writing project structure journal:", e)
+
+def replay_structure_journal(journal_path, structure):
+    """Apply the journaled operations to a structure loaded from its file; returns their count."""
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return 0
+    index = StructureIndex(structure)
+    for line in lines:
+        try:
+            index.apply(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            continue  # a torn last line after a crash
+    return len(lines)
+
 def load_structure(project_name):
     """
-    Load the project structure from the file.
+    Load the project structure from the file and replay its journal.
     If the file is missing or in an unexpected format, return a default structure.
     """
     # The words "This is the summary" have special meaning, so we can't localize them
@@ -63,19 +92,36 @@ def load_structure(project_name):
                 add_uuids(child)
         for act in structure.get("acts", []):
             add_uuids(act)
-        save_structure(project_name, structure)
+        replay_structure_journal(get_structure_journal_path(project_name), structure)
+        save_structure(project_name, structure)  # compacts the journal into the file
+    return structure
+
+def read_structure_file(file_path):
+    """
+    Read a structure file with its journal applied, without rewriting either
+    (for readers outside the project window, e.g. the statistics).
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        structure = json.load(f)
+    replay_structure_journal(os.path.splitext(file_path)[0] + ".journal", structure)
     return structure
 
 def save_structure(project_name, structure):
-    """Save the given project structure to the file."""
+    """Save the given project structure to the file; the journal it supersedes is removed."""
     file_path = get_structure_file_path(project_name)
     try:
         if not os.path.exists(os.path.dirname(file_path)):
             os.makedirs(os.path.dirname(file_path))
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(structure, f, indent=4)
+        write_text_atomic(file_path, json.dumps(structure, indent=4))
     except Exception as e:
         print("Error saving project structure:", e)
+        return
+    try:
+        os.remove(get_structure_journal_path(project_name))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print("Error removing project structure journal:", e)
 
 def populate_tree(tree, structure):
     """
@@ -107,48 +153,3 @@ def populate_tree(tree, structure):
                 scene_item = QTreeWidgetItem(chapter_item, [scene.get("name", "Unnamed Scene")])
                 scene_item.setData(0, Qt.UserRole, scene)
     tree.expandAll()
-
-def update_structure_from_tree(tree, project_name):
-    """
-    Rebuild the project structure by traversing the QTreeWidget.
-    Saves the updated structure and returns it.
-    """
-    structure = {"acts": []}
-    root = tree.invisibleRootItem()
-    for i in range(root.childCount()):
-        act_item = root.child(i)
-        act = act_item.data(0, Qt.UserRole)
-        chapters = []
-        for j in range(act_item.childCount()):
-            chapter_item = act_item.child(j)
-            chapter = chapter_item.data(0, Qt.UserRole)
-            scenes = []
-            for k in range(chapter_item.childCount()):
-                scene_item = chapter_item.child(k)
-                scene = scene_item.data(0, Qt.UserRole)
-                scenes.append(scene)
-            chapter["scenes"] = scenes
-            chapters.append(chapter)
-        act["chapters"] = chapters
-        structure["acts"].append(act)
-    save_structure(project_name, structure)
-    return structure
-
-def delete_node(tree, item, project_name):
-    """
-    Deletes the specified item from the QTreeWidget and updates the project structure.
-    Returns the updated structure.
-    """
-    if item is None:
-        return
-    parent = item.parent()
-    if parent is None:
-        index = tree.indexOfTopLevelItem(item)
-        if index != -1:
-            tree.takeTopLevelItem(index)
-    else:
-        index = parent.indexOfChild(item)
-        if index != -1:
-            parent.takeChild(index)
-    new_structure = update_structure_from_tree(tree, project_name)
-    return new_structure
@@ -0,0 +1,159 @@
+"""
+One background asyncio loop for LLM requests, bridged to Qt.
+
+Instead of one QThread per request, coroutines from the aggregator's async API
+(asend_prompt, astream_prompt, agather, asend_batch) are scheduled on a single daemon
+thread running an event loop. AsyncLLMRequest turns a request into Qt signals
+that are delivered on the GUI thread; LLMWorker (settings.llm_worker), the
+streaming worker of the editors and the workshop, is built on it.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .llm_api_aggregator import WWApiAggregator
+
+
+class AsyncLoopThread:
+    """A daemon thread running an asyncio event loop forever."""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _run(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        ready.set()
+        self.loop.run_forever()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,),
+                                            name="llm-async-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self._thread
+
+
+WWAsyncLoop = AsyncLoopThread()
+
+
+def run_async(coro) -> Future:
+    """Run a coroutine on the shared LLM loop from any thread."""
+    return WWAsyncLoop.submit(coro)
+
+
+class AsyncLLMRequest(QObject):
+    """
+    A single request on the shared loop, reported through Qt signals.
+
+    Create it on the GUI thread, connect its signals, then call send() or
+    stream(). cancel() stops the request; finished is emitted in every case.
+    """
+    data_received = pyqtSignal(str)  # stream chunks
+    result_ready = pyqtSignal(str)   # full response of send()
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._future: Optional[Future] = None
+        self._task: Optional[asyncio.Task] = None  # set while the request runs on the loop
+        self._cancelled = threading.Event()  # checked before the request starts and between chunks
+        self._done = threading.Event()  # set once the coroutine has ended (after finished)
+
+    def send(self, prompt: str, overrides: Optional[Dict[str, Any]] = None,
+             conversation_history: Optional[List[Dict[str, str]]] = None):
+        self._start(self._send(prompt, overrides, conversation_history))
+
+    def stream(self, prompt: str, overrides: Optional[Dict[str, Any]] = None,
+               conversation_history: Optional[List[Dict[str, str]]] = None):
+        self._start(self._stream(prompt, overrides, conversation_history))
+
+    def _start(self, coro):
+        self._cancelled.clear()
+        self._done.clear()
+        self._future = run_async(self._run(coro))
+
+    def cancel(self):
+        """
+        Stop the request from any thread. A request the loop has not started
+        yet ends as soon as it starts; a running one has its task cancelled.
+        """
+        self._cancelled.set()
+        if self._future and not self._done.is_set():
+            WWAsyncLoop.loop.call_soon_threadsafe(self._cancel_task)
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def is_running(self) -> bool:
+        return bool(self._future) and not self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the request has ended (also after cancel()); False on timeout."""
+        if not self._future or WWAsyncLoop.in_loop():
+            return True
+        return self._done.wait(timeout)
+
+    async def _run(self, coro):
+        self._task = asyncio.current_task()
+        try:
+            if self._cancelled.is_set():
+                coro.close()  # cancelled before it started
+                self.finished.emit()
+                return
+            await coro
+        except asyncio.CancelledError:
+            pass  # cancel(); the request has emitted finished
+        finally:
+            self._task = None
+            self._done.set()
+
+    async def _send(self, prompt, overrides, conversation_history):
+        try:
+            self.result_ready.emit(await WWApiAggregator.asend_prompt(prompt, overrides, conversation_history))
+        except asyncio.CancelledError:
+            logging.debug("Async LLM request cancelled")
+            raise
+        except Exception as e:
+            logging.error(f"Async LLM request error: {e}")
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+    async def _stream(self, prompt, overrides, conversation_history):
+        try:
+            async for chunk in WWApiAggregator.astream_prompt(prompt, overrides, conversation_history):
+                if self._cancelled.is_set():
+                    break
+                if chunk and isinstance(chunk, str):
+                    self.data_received.emit(chunk)
+        except asyncio.CancelledError:
+            logging.debug("Async LLM stream cancelled")
+            raise
+        except Exception as e:
+            logging.error(f"Async LLM streaming error: {e}")
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
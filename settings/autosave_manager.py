@@ -1,10 +1,57 @@
 #!/usr/bin/env python3
 import os
-import time
-import glob
 import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from settings.revision_store import get_revision_store
 
 NEW_FILE_EXTENSION = ".html"  # Use HTML for new files
+MANIFEST_FILE = "autosave_manifest.jsonl"
+MANIFEST_VERSION = 1
+MAX_AUTOSAVES = 6
+# <scene identifier>_<YYYYmmddHHMMSS>.html|.txt; summaries (<...>-Summary_<stamp>.html) are not scene revisions
+REVISION_FILE = re.compile(r"^(?P<scene>.+)_(?P<stamp>\d{14})\.(?:txt|html)$")
+SUMMARY_FILE = re.compile(r"-Summary_\d{14}\.html$")
+
+# Callbacks notified after every successful scene save:
+# callback(project_name, hierarchy, uuid, filepath, content)
+_save_listeners = []
+
+def add_save_listener(callback) -> None:
+    """Register a callback to be notified whenever a scene file is written."""
+    if callback not in _save_listeners:
+        _save_listeners.append(callback)
+
+def remove_save_listener(callback) -> None:
+    """Unregister a callback added with add_save_listener."""
+    if callback in _save_listeners:
+        _save_listeners.remove(callback)
+
+def notify_save_listeners(project_name: str, hierarchy: list, uuid: str, filepath: str, content: str) -> None:
+    """Call every registered save listener, isolating their failures from the save."""
+    for callback in list(_save_listeners):
+        try:
+            callback(project_name, hierarchy, uuid, filepath, content)
+        except Exception as e:
+            print("Error in autosave listener:", e)
+
+def write_text_atomic(filepath: str, text: str) -> None:
+    """Write text to a temp file next to filepath and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 def sanitize(text: str) -> str:
     """Return a sanitized string suitable for file names."""
@@ -30,6 +77,211 @@ def get_project_folder(project_name: str) -> str:
         os.makedirs(project_folder)
     return project_folder
 
+class AutosaveManifest:
+    """
+    Index of the autosave revisions in one project folder: scene key (the
+    scene UUID, or "scene:<identifier>" for legacy files without one) ->
+    revisions oldest first, each with its file name, content hash and size.
+
+    It is persisted as an append-only journal (one JSON operation per line)
+    that is compacted when most of it is superseded, so a save appends a line
+    instead of rewriting the index. The folder is listed once when the
+    manifest is opened; if its revision files differ from the journal (e.g.
+    after a project rename) the index is rebuilt from the files.
+    """
+
+    def __init__(self, project_folder: str):
+        self.folder = project_folder
+        self.path = os.path.join(project_folder, MANIFEST_FILE)
+        self.lock = threading.RLock()
+        self.scenes = {}       # key -> [{"file", "hash", "size", "time"}], oldest first
+        self.identifiers = {}  # scene identifier -> key of the scene last saved under it
+        self._journal_lines = 0
+        with self.lock:
+            if not self._load() or not self._matches_folder():
+                self.rebuild()
+
+    @staticmethod
+    def key_for(uuid, scene_identifier: str) -> str:
+        return uuid or f"scene:{scene_identifier}"
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("version") != MANIFEST_VERSION:
+                    return False
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue  # a torn last line after a crash
+                    self._journal_lines += 1
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def _matches_folder(self) -> bool:
+        """True when the journal lists exactly the revision files in the folder."""
+        indexed = {rev["file"] for revisions in self.scenes.values() for rev in revisions}
+        try:
+            on_disk = {name for name in os.listdir(self.folder)
+                       if REVISION_FILE.match(name) and not SUMMARY_FILE.search(name)}
+        except OSError:
+            return False
+        return indexed == on_disk
+
+    def _apply(self, op: dict):
+        key = op["key"]
+        if op["op"] == "add":
+            revisions = [r for r in self.scenes.get(key, []) if r["file"] != op["file"]]
+            revisions.append({"file": op["file"], "hash": op.get("hash"), "size": op.get("size"),
+                              "time": op.get("time")})
+            self.scenes[key] = revisions
+            self.identifiers[op["scene"]] = key
+        elif op["op"] == "remove":
+            revisions = [r for r in self.scenes.get(key, []) if r["file"] != op["file"]]
+            if revisions:
+                self.scenes[key] = revisions
+            else:
+                self.scenes.pop(key, None)
+        elif op["op"] == "hash":
+            for rev in self.scenes.get(key, []):
+                if rev["file"] == op["file"]:
+                    rev["hash"] = op["hash"]
+
+    def _append(self, *ops: dict):
+        for op in ops:
+            self._apply(op)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for op in ops:
+                    f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print("Error writing autosave manifest:", e)
+            return
+        self._journal_lines += len(ops)
+        live = sum(len(revisions) for revisions in self.scenes.values())
+        if self._journal_lines > 4 * max(live, 64):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal as one "add" per live revision, oldest first."""
+        revisions = sorted(((rev.get("time") or 0, key, rev) for key, revs in self.scenes.items() for rev in revs),
+                           key=lambda item: item[0])
+        lines = [json.dumps({"version": MANIFEST_VERSION})]
+        for _time, key, rev in revisions:
+            lines.append(json.dumps({"op": "add", "key": key, "scene": REVISION_FILE.match(rev["file"]).group("scene"),
+                                     **rev}, ensure_ascii=False))
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print("Error writing autosave manifest:", e)
+            return
+        self._journal_lines = len(lines) - 1
+
+    def rebuild(self):
+        """Re-index the revision files of the folder (reads the UUID line of each file)."""
+        found = []
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            entries = []
+        for entry in entries:
+            match = REVISION_FILE.match(entry.name)
+            if not match or SUMMARY_FILE.search(entry.name) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, entry.name, match.group("scene"), stat.st_size,
+                          get_uuid_from_file(entry.path)))
+        self.scenes, self.identifiers = {}, {}
+        for mtime, name, scene_identifier, size, uuid in sorted(found):
+            self._apply({"op": "add", "key": self.key_for(uuid, scene_identifier), "scene": scene_identifier,
+                         "file": name, "hash": None, "size": size, "time": mtime})
+        self.compact()
+
+    def latest(self, key: str):
+        """Newest revision of a scene, or None."""
+        with self.lock:
+            revisions = self.scenes.get(key)
+            return dict(revisions[-1]) if revisions else None
+
+    def latest_path(self, key: str):
+        """Path of the newest revision of a scene, re-indexing once if the file has disappeared."""
+        with self.lock:
+            rev = self.latest(key)
+            if rev is None:
+                return None
+            path = os.path.join(self.folder, rev["file"])
+            if os.path.exists(path):
+                return path
+            self.rebuild()
+            rev = self.latest(key)
+            return os.path.join(self.folder, rev["file"]) if rev else None
+
+    def key_of_identifier(self, scene_identifier: str):
+        with self.lock:
+            return self.identifiers.get(scene_identifier)
+
+    def revisions(self, key: str) -> list:
+        with self.lock:
+            return [dict(rev) for rev in self.scenes.get(key, [])]
+
+    def add_revision(self, key: str, scene_identifier: str, filename: str, content_hash: str, size: int):
+        with self.lock:
+            self._append({"op": "add", "key": key, "scene": scene_identifier, "file": filename,
+                          "hash": content_hash, "size": size, "time": time.time()})
+
+    def remove_revision(self, key: str, filename: str):
+        with self.lock:
+            self._append({"op": "remove", "key": key, "file": filename})
+
+    def set_hash(self, key: str, filename: str, content_hash: str):
+        with self.lock:
+            self._append({"op": "hash", "key": key, "file": filename, "hash": content_hash})
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+def get_manifest(project_folder: str) -> AutosaveManifest:
+    """Return the (shared) autosave manifest of a project folder."""
+    folder = os.path.abspath(project_folder)
+    with _manifests_lock:
+        manifest = _manifests.get(folder)
+        if manifest is None:
+            # Paths handed out keep the form of project_folder (relative to the working directory)
+            manifest = _manifests[folder] = AutosaveManifest(project_folder)
+        return manifest
+
+def content_hash(content: str) -> str:
+    """Hash used to detect changes (ignores surrounding whitespace, like the old comparison)."""
+    return hashlib.sha256(content.strip().encode("utf-8")).hexdigest()
+
+def get_uuid_from_file(filepath):
+    """Return the UUID embedded in the first line of a scene file, or None."""
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            first_line = f.readline().strip()
+            if first_line.startswith("<!-- UUID:"):
+                return first_line.split("<!-- UUID:")[1].split("-->")[0].strip()
+            return None
+    except Exception:
+        return None
+
+def read_scene_file(filepath: str) -> str:
+    """Read a scene file without its UUID line."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        content = f.read()
+    if content.startswith("<!-- UUID:"):
+        content = "\n".join(content.split("\n")[1:])
+    return content
+
 def get_latest_autosave_path(project_name: str, hierarchy: list) -> str | None:
     """
     Return the path to the most recent autosave file for a given scene.
@@ -37,13 +289,9 @@ def get_latest_autosave_path(project_name: str, hierarchy: list) -> str | None:
     Returns None if no autosave file exists.
     """
     scene_identifier = build_scene_identifier(project_name, hierarchy)
-    project_folder = get_project_folder(project_name)
-    pattern_txt = os.path.join(project_folder, f"{scene_identifier}_*.txt")
-    pattern_html = os.path.join(project_folder, f"{scene_identifier}_*{NEW_FILE_EXTENSION}")
-    autosave_files = glob.glob(pattern_txt) + glob.glob(pattern_html)
-    if not autosave_files:
-        return None
-    return max(autosave_files, key=os.path.getmtime)
+    manifest = get_manifest(get_project_folder(project_name))
+    key = manifest.key_of_identifier(scene_identifier)
+    return manifest.latest_path(key) if key else None
 
 def load_latest_autosave(project_name: str, hierarchy: list, node: dict = None) -> str | None:
     """
@@ -58,26 +306,10 @@ def load_latest_autosave(project_name: str, hierarchy: list, node: dict = None)
     """
     uuid_val = node.get("uuid") if node else None
 
-    # Helper function to extract UUID from file content
-    def get_uuid_from_file(filepath):
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                first_line = f.readline().strip()
-                if first_line.startswith("<!-- UUID:"):
-                    return first_line.split("<!-- UUID:")[1].split("-->")[0].strip()
-                return None
-        except Exception:
-            return None
-
     # Try loading from node's latest_file if provided
     if node and "latest_file" in node and os.path.exists(node["latest_file"]):
-        filepath = node["latest_file"]
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content.startswith("<!-- UUID:"):
-                    content = "\n".join(content.split("\n")[1:])
-                return content
+            return read_scene_file(node["latest_file"])
         except Exception as e:
             print(f"Error loading latest file {node['latest_file']}: {e}")
 
@@ -85,50 +317,80 @@ def load_latest_autosave(project_name: str, hierarchy: list, node: dict = None)
     latest_file = get_latest_autosave_path(project_name, hierarchy)
     if latest_file:
         try:
-            with open(latest_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content.startswith("<!-- UUID:"):
-                    content = "\n".join(content.split("\n")[1:])
-                return content
+            return read_scene_file(latest_file)
         except Exception as e:
             print(f"Error loading autosave file {latest_file}: {e}")
 
-    # If UUID is available but no match found, scan project folder as a last resort
+    # The scene may have been saved under another name (it was renamed or moved)
     if uuid_val:
-        project_folder = get_project_folder(project_name)
-        pattern = os.path.join(project_folder, f"*{NEW_FILE_EXTENSION}")
-        autosave_files = glob.glob(pattern)
-        for filepath in sorted(autosave_files, key=os.path.getmtime, reverse=True):
-            file_uuid = get_uuid_from_file(filepath)
-            if file_uuid == uuid_val:
-                try:
-                    with open(filepath, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        if content.startswith("<!-- UUID:"):
-                            content = "\n".join(content.split("\n")[1:])
-                        return content
-                except Exception as e:
-                    print(f"Error loading autosave file {filepath}: {e}")
-                # Update node's latest_file if found
-                if node and "latest_file" in node:
-                    node["latest_file"] = filepath
+        filepath = get_manifest(get_project_folder(project_name)).latest_path(uuid_val)
+        if filepath:
+            try:
+                content = read_scene_file(filepath)
+            except Exception as e:
+                print(f"Error loading autosave file {filepath}: {e}")
+                return None
+            # Update node's latest_file if found
+            if "latest_file" in node:
+                node["latest_file"] = filepath
+            return content
     return None
 
-def cleanup_old_autosaves(project_folder: str, scene_identifier: str, max_files: int = 6) -> None:
+def cleanup_old_autosaves(project_folder: str, scene_identifier: str, max_files: int = MAX_AUTOSAVES,
+                          key: str = None) -> None:
     """
-    Remove the oldest autosave files if the number of autosaves exceeds max_files.
-    Searches for both .txt and .html files.
+    Move the oldest autosave files into the scene's compressed history
+    (settings.revision_store) if the number of autosaves exceeds max_files.
+    The revisions come from the manifest, so the folder is not scanned. key
+    selects the scene (default: the scene last saved under scene_identifier).
     """
-    pattern_txt = os.path.join(project_folder, f"{scene_identifier}_*.txt")
-    pattern_html = os.path.join(project_folder, f"{scene_identifier}_*{NEW_FILE_EXTENSION}")
-    autosave_files = sorted(glob.glob(pattern_txt) + glob.glob(pattern_html), key=os.path.getmtime)
-    while len(autosave_files) > max_files:
-        oldest = autosave_files.pop(0)
+    manifest = get_manifest(project_folder)
+    key = key or manifest.key_of_identifier(scene_identifier)
+    if not key:
+        return
+    store = get_revision_store(project_folder)
+    revisions = manifest.revisions(key)
+    while len(revisions) > max_files:
+        oldest = revisions.pop(0)
+        path = os.path.join(manifest.folder, oldest["file"])
         try:
-            os.remove(oldest)
-            print("Removed old autosave file:", oldest)
+            content = read_scene_file(path)
+            store.archive(key, oldest["file"], content, oldest.get("time"),
+                          oldest.get("hash") or content_hash(content))
+            os.remove(path)
+            print("Archived old autosave file:", path)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print("Error removing old autosave file:", e)
+            print("Error archiving old autosave file:", e)
+            continue
+        manifest.remove_revision(key, oldest["file"])
+
+def list_scene_revisions(project_name: str, hierarchy: list, uuid: str = None) -> list:
+    """
+    All saved revisions of a scene, newest first: the autosave files and the
+    revisions in the scene's history. Each is a dict with "key", "file",
+    "time", "source" ("file" or "history") and, for history, "index".
+    """
+    project_folder = get_project_folder(project_name)
+    manifest = get_manifest(project_folder)
+    store = get_revision_store(project_folder)
+    keys = [uuid, manifest.key_of_identifier(build_scene_identifier(project_name, hierarchy))]
+    revisions = []
+    for key in dict.fromkeys(k for k in keys if k):
+        for rev in store.revisions(key):
+            revisions.append(dict(rev, key=key, source="history"))
+        for rev in manifest.revisions(key):
+            revisions.append(dict(rev, key=key, source="file"))
+    revisions.sort(key=lambda rev: rev.get("time") or 0, reverse=True)
+    return revisions
+
+def load_scene_revision(project_name: str, revision: dict) -> str:
+    """Content of a revision returned by list_scene_revisions (without the UUID line)."""
+    project_folder = get_project_folder(project_name)
+    if revision["source"] == "history":
+        return get_revision_store(project_folder).load(revision["key"], revision["index"])
+    return read_scene_file(os.path.join(project_folder, revision["file"]))
 
 def save_scene(project_name: str, hierarchy: list, uuid: str, content: str, expected_project_name: str = None) -> str:
     """
@@ -147,14 +409,25 @@ def save_scene(project_name: str, hierarchy: list, uuid: str, content: str, expe
     """
 
     scene_identifier = build_scene_identifier(project_name, hierarchy)
+    project_folder = get_project_folder(project_name)
+    manifest = get_manifest(project_folder)
+    key = AutosaveManifest.key_for(uuid, scene_identifier)
 
-    # Check if the scene content has changed.
-    last_content = load_latest_autosave(project_name, hierarchy)
-    if last_content is not None and last_content.strip() == content.strip():
+    # Check if the scene content has changed: compare hashes, not file contents.
+    digest = content_hash(content)
+    last_key = key if manifest.latest(key) else manifest.key_of_identifier(scene_identifier)
+    last = manifest.latest(last_key) if last_key else None
+    if last is not None and last["hash"] is None:
+        # Indexed from an older version: hash the file once
+        try:
+            last["hash"] = content_hash(read_scene_file(os.path.join(project_folder, last["file"])))
+            manifest.set_hash(last_key, last["file"], last["hash"])
+        except OSError:
+            pass
+    if last is not None and last["hash"] == digest:
         print("No changes detected since the last autosave. Skipping autosave.")
         return None
 
-    project_folder = get_project_folder(project_name)
     timestamp = time.strftime("%Y%m%d%H%M%S")
     filename = f"{scene_identifier}_{timestamp}{NEW_FILE_EXTENSION}"
     filepath = os.path.join(project_folder, filename)
@@ -169,13 +442,13 @@ def save_scene(project_name: str, hierarchy: list, uuid: str, content: str, expe
     content_with_uuid = f"<!-- UUID: {uuid} -->\n{content}"
 
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(content_with_uuid)
+        write_text_atomic(filepath, content_with_uuid)
         print("Autosaved scene to", filepath)
     except Exception as e:
         print("Error during autosave:", e)
         return None
 
-    cleanup_old_autosaves(project_folder, scene_identifier)
+    manifest.add_revision(key, scene_identifier, filename, digest, len(content_with_uuid.encode("utf-8")))
+    cleanup_old_autosaves(project_folder, scene_identifier, key=key)
+    notify_save_listeners(project_name, hierarchy, uuid, filepath, content)
     return filepath
-
@@ -1,60 +1,44 @@
-import os
 import re
 from datetime import datetime
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QListWidget, QDialogButtonBox
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QListWidget, QDialogButtonBox, QMessageBox
 from PyQt5.QtCore import Qt
 
+from settings.autosave_manager import list_scene_revisions, load_scene_revision
+
 def sanitize(text):
     """Remove non-alphanumeric characters from text."""
     return re.sub(r'\W+', '', text)
 
-def show_backup_dialog(parent, project_name, scene_identifier):
+def show_backup_dialog(parent, project_name, hierarchy, uuid=None):
     """
-    Opens a dialog that lists backup files from the project's backup directory.
-    Supports both legacy .txt files and new HTML files.
-    Returns the full path of the selected backup file, or None if canceled.
+    Opens a dialog that lists the saved revisions of a scene: the newest
+    autosave files and the older revisions kept in the scene's compressed
+    history. Supports both legacy .txt files and new HTML files.
+    Returns the selected revision (a dict with its "file", "time" and the
+    reconstructed "content"), or None if canceled.
     """
-    base_dir = os.getcwd()
-    sanitized_project = sanitize(project_name)
-    backup_dir = os.path.join(base_dir, "Projects", sanitized_project)
-    
-    sanitized_scene = sanitize(scene_identifier)
-    
-    backup_files = []
-    if os.path.exists(backup_dir):
-        # List only .txt and .html files that contain the sanitized scene identifier in the filename.
-        for filename in os.listdir(backup_dir):
-            if (filename.endswith(".txt") or filename.endswith(".html")) and sanitized_scene in filename:
-                backup_files.append(filename)
-    else:
-        backup_files = []
+    revisions = list_scene_revisions(project_name, hierarchy, uuid)
     
     # Create the dialog.
     dialog = QDialog(parent)
     dialog.setWindowTitle("Backup Versions")
     dialog.setModal(True)
-    dialog.resize(400, 300)
+    dialog.resize(500, 300)
     
     dialog_layout = QVBoxLayout(dialog)
     list_widget = QListWidget(dialog)
     
-    # Populate the list with backup files and format their timestamps.
-    for f in sorted(backup_files):
-        parts = f.rsplit("_", 1)
-        if len(parts) == 2:
-            timestamp_str = parts[1].split('.')[0]  # Remove file extension
-            try:
-                dt = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
-                formatted_timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-            except Exception:
-                formatted_timestamp = timestamp_str
-            display_text = f"{f}   (Timestamp: {formatted_timestamp})"
+    # Populate the list with the revisions (newest first) and format their timestamps.
+    for rev in revisions:
+        if rev.get("time"):
+            formatted_timestamp = datetime.fromtimestamp(rev["time"]).strftime("%Y-%m-%d %H:%M:%S")
         else:
-            display_text = f
-        list_widget.addItem(display_text)
-        # Store the raw filename in the item's UserRole.
+            formatted_timestamp = "?"
+        source = _("history") if rev["source"] == "history" else _("autosave file")
+        list_widget.addItem(f"{formatted_timestamp}   {rev['file']}   ({source})")
+        # Store the revision in the item's UserRole.
         list_item = list_widget.item(list_widget.count() - 1)
-        list_item.setData(Qt.UserRole, f)
+        list_item.setData(Qt.UserRole, rev)
     
     dialog_layout.addWidget(list_widget)
     
@@ -62,19 +46,26 @@ def show_backup_dialog(parent, project_name, scene_identifier):
     button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
     dialog_layout.addWidget(button_box)
     
-    # Function to handle OK: if an item is selected, store its filename.
+    # Function to handle OK: if an item is selected, store its revision.
     def on_accept():
         if list_widget.currentItem() is not None:
-            dialog.selected_file = list_widget.currentItem().data(Qt.UserRole)
+            dialog.selected_revision = list_widget.currentItem().data(Qt.UserRole)
             dialog.accept()
         else:
             dialog.reject()
     
     button_box.accepted.connect(on_accept)
     button_box.rejected.connect(dialog.reject)
+    list_widget.itemDoubleClicked.connect(lambda item: on_accept())
     
     result = dialog.exec_()
-    if result == QDialog.Accepted and hasattr(dialog, "selected_file"):
-        return os.path.join(backup_dir, dialog.selected_file)
-    else:
+    if result != QDialog.Accepted or not hasattr(dialog, "selected_revision"):
+        return None
+    revision = dict(dialog.selected_revision)
+    try:
+        revision["content"] = load_scene_revision(project_name, revision)
+    except Exception as e:
+        print("Error loading backup revision:", e)
+        QMessageBox.warning(parent, _("Backup Versions"), _("Could not load the backup: {}").format(e))
         return None
+    return revision
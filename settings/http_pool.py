@@ -0,0 +1,136 @@
+"""
+Process-wide, keep-alive HTTP clients shared by all LLM providers.
+
+Model listings go through one pooled requests.Session and the OpenAI-compatible
+LangChain clients share one httpx.Client, so back-to-back calls reuse open
+TLS connections instead of handshaking again. pool_stats() reports how the
+pools and the LLM instance cache are being used.
+"""
+import threading
+from collections import Counter
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+KEEPALIVE_EXPIRY = 90.0  # seconds an idle connection is kept open
+
+_lock = threading.Lock()
+_session = None
+_httpx_client = None
+_httpx_async_client = None
+_stats: Counter = Counter()
+_requests_per_host: Counter = Counter()
+
+
+def _count_request(host: str):
+    with _lock:
+        _requests_per_host[host] += 1
+
+
+def _on_httpx_request(request):
+    _count_request(request.url.host)
+
+
+async def _on_httpx_async_request(request):
+    _count_request(request.url.host)
+
+
+def get_requests_session() -> requests.Session:
+    """Shared requests session with a connection pool per host."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_KEEPALIVE_CONNECTIONS,
+                                  pool_maxsize=MAX_CONNECTIONS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session (drop-in for requests.get)."""
+    _count_request(urlsplit(url).hostname or "")
+    return get_requests_session().get(url, **kwargs)
+
+
+def get_httpx_client() -> httpx.Client:
+    """
+    Shared httpx client for LangChain/OpenAI SDK clients. Per-request timeouts
+    set by the SDK override the client's default.
+    """
+    global _httpx_client
+    with _lock:
+        if _httpx_client is None:
+            _httpx_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_on_httpx_request]}
+            )
+        return _httpx_client
+
+
+def get_httpx_async_client() -> httpx.AsyncClient:
+    """
+    Shared async httpx client. Its connections belong to the event loop that
+    opens them, so async requests should all run on the background loop of
+    settings.async_llm.
+    """
+    global _httpx_async_client
+    with _lock:
+        if _httpx_async_client is None:
+            _httpx_async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_on_httpx_async_request]}
+            )
+        return _httpx_async_client
+
+
+def record(event: str, amount: int = 1):
+    """Count an event (e.g. "llm_cache_hit") for pool_stats()."""
+    with _lock:
+        _stats[event] += amount
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Snapshot of request counts, open connections and LLM cache usage."""
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats["requests_per_host"] = dict(_requests_per_host)
+        if _httpx_client is not None:
+            # The connection list is an httpcore detail; report it when available
+            pool = getattr(getattr(_httpx_client, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", None)
+            if connections is not None:
+                stats["httpx_open_connections"] = len(connections)
+                stats["httpx_idle_connections"] = sum(1 for c in connections if c.is_idle())
+        if _session is not None:
+            adapter = _session.get_adapter("https://")
+            stats["requests_host_pools"] = len(adapter.poolmanager.pools)
+    return stats
+
+
+def close():
+    """Close the synchronous shared clients (they are recreated on next use)."""
+    global _session, _httpx_client
+    with _lock:
+        if _httpx_client is not None:
+            _httpx_client.close()
+            _httpx_client = None
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -1,4 +1,8 @@
-import requests
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Type, Union
 from abc import ABC, abstractmethod
 from pydantic import ValidationError
@@ -12,19 +16,32 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_ollama import ChatOllama
 from langchain_together import ChatTogether
 from .settings_manager import WWSettingsManager
+from . import http_pool
+from . import llm_metrics
+from .response_cache import get_response_cache, make_key
+from .model_catalog import WWModelCatalog
+from .llm_middleware import (WWMiddleware, get_policy, hedged_call, hedged_stream,
+                             ahedged_call, ahedged_stream)
 import logging
 
 # Configuration constants
 DEFAULT_MAX_TOKENS = 1024
 DEFAULT_TEMPERATURE = 0.7
+# LLM instances kept per provider, one per distinct (model, overrides) combination
+MAX_CACHED_LLM_INSTANCES = 8
+DEFAULT_BATCH_CONCURRENCY = 8
+# Seconds a fetched model list stays fresh
+MODEL_LIST_TTL = 24 * 3600
+LOCAL_MODEL_LIST_TTL = 5 * 60
 
 class LLMProviderBase(ABC):
     """Base class for all LLM providers."""
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
-        self.cached_models = None
         self.llm_instance = None
+        self._llm_instances = OrderedDict()  # instance key -> LLM, most recent last
+        self._instances_lock = threading.RLock()
     
     @property
     @abstractmethod
@@ -58,19 +75,67 @@ class LLMProviderBase(ABC):
         """Return whether to reverse the output of the model list."""
         return False
 
+    @property
+    def model_list_ttl(self) -> float:
+        """Return how many seconds a cached model list stays fresh."""
+        return self.config.get("model_list_ttl", MODEL_LIST_TTL)
+
     @abstractmethod
     def get_llm_instance(self, overrides) -> Union[LLM, BaseChatModel]:
         """Returns a configured LLM instance."""
         pass
     
     def reset_llm_instance(self):
-        """Reset the cached LLM instance to force reinitialization."""
-        self.llm_instance = None
+        """Reset the cached LLM instances to force reinitialization."""
+        with self._instances_lock:
+            self.llm_instance = None
+            self._llm_instances.clear()
+
+    def _instance_key(self, overrides) -> str:
+        """Hash of everything that shapes an LLM instance: config and overrides."""
+        payload = json.dumps([self.config, overrides or {}], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get_cached_llm_instance(self, overrides) -> Union[LLM, BaseChatModel]:
+        """
+        Return an LLM instance for these overrides, reusing a previous one (and
+        its open HTTP connections) when the model and overrides are the same.
+        """
+        overrides = overrides or {}
+        key = self._instance_key(overrides)
+        with self._instances_lock:
+            llm = self._llm_instances.get(key)
+            if llm is not None:
+                self._llm_instances.move_to_end(key)
+                http_pool.record("llm_cache_hits")
+                return llm
+            # get_llm_instance builds a fresh instance only when none is set
+            self.llm_instance = None
+            llm = self.get_llm_instance(overrides)
+            if llm is not None:
+                self._llm_instances[key] = llm
+                while len(self._llm_instances) > MAX_CACHED_LLM_INSTANCES:
+                    self._llm_instances.popitem(last=False)
+            http_pool.record("llm_cache_misses")
+            return llm
+
+    def batch(self, llm, inputs: List[Any], max_concurrency: int) -> List[Any]:
+        """
+        Send independent inputs as one batch and return a message or an
+        exception per input, in order. Uses LangChain's batch() (concurrent
+        requests); a provider with a synchronous native batch endpoint can
+        override this and batch() below.
+        """
+        return llm.batch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+
+    async def abatch(self, llm, inputs: List[Any], max_concurrency: int) -> List[Any]:
+        """Async counterpart of batch() (LangChain abatch())."""
+        return await llm.abatch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
     
     def _do_models_request(self, url: str, headers: Dict[str, str] = None) -> List[str]:
         """Send a request to the provider to fetch available models."""
         headers = headers or {'Authorization': f'Bearer {self.get_api_key()}'}
-        return requests.get(url, headers=headers)
+        return http_pool.http_get(url, headers=headers)
     
     def get_available_models(self, do_refresh: bool = False) -> List[str]:
         """Returns a list of available model IDs from the provider."""
@@ -78,32 +143,36 @@ class LLMProviderBase(ABC):
         return [model[self.model_key] for model in model_details]
 
     def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available models."""
-        if do_refresh or self.cached_models is None:
-            if self.model_requires_api_key and not self.get_api_key():
-                raise ValueError(f"API key required for {self.provider_name}")
-            url = self.get_base_url()
-            if url[-1] != "/":
-                url += "/"
-            url += "models"
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get(self.model_key, ""),
-                        "name": model.get("name", model.get("display_name", model.get(self.model_key, ""))),
-                        "description": model.get("description", "No description available"),
-                        "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"})
-                    }
-                    for model in models_data.get(self.model_list_key, [])
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+        """Returns detailed information about available models (served by the model catalog)."""
+        return WWModelCatalog.get_model_details(self, do_refresh)
+
+    def fetch_model_details(self) -> List[Dict[str, Any]]:
+        """Fetch the model list from the provider (blocks on the network)."""
+        if self.model_requires_api_key and not self.get_api_key():
+            raise ValueError(f"API key required for {self.provider_name}")
+        response = self._do_models_request(self._models_url())
+        if response.status_code != 200:
+            raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
+        models = [self._model_entry(model) for model in self._model_list(response.json())]
+        models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
+        return models
+
+    def _models_url(self) -> str:
+        url = self.get_base_url()
+        if url[-1] != "/":
+            url += "/"
+        return url + "models"
+
+    def _model_list(self, models_data) -> List[Dict[str, Any]]:
+        return models_data.get(self.model_list_key, [])
+
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get(self.model_key, ""),
+            "name": model.get("name", model.get("display_name", model.get(self.model_key, ""))),
+            "description": model.get("description", "No description available"),
+            "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"})
+        }
 
     def get_current_model(self) -> str:
         """Returns the currently configured model name."""
@@ -136,11 +205,12 @@ class LLMProviderBase(ABC):
 
     def test_connection(self, overrides = None) -> bool:
         """Test the connection to the provider."""
-        overrides = overrides or {}
+        overrides = dict(overrides or {})
         overrides["max_tokens"] = 1
         if not overrides.get("model"):
             overrides["model"] = self.get_current_model() or "None"
-        llm = self.get_llm_instance(overrides)
+        # Keyed on the config under test and these overrides, never an instance built for other ones
+        llm = self.get_cached_llm_instance(overrides)
         if not llm:
             return False
 
@@ -175,38 +245,20 @@ class OpenAIProvider(LLMProviderBase):
                 model=overrides.get("model", self.get_current_model()),
                 temperature=self.config.get("temperature", DEFAULT_TEMPERATURE),
                 max_tokens=self.config.get("max_tokens", DEFAULT_MAX_TOKENS),
-                request_timeout=self.get_timeout(overrides)
+                request_timeout=self.get_timeout(overrides),
+                http_client=http_pool.get_httpx_client(),
+                http_async_client=http_pool.get_httpx_async_client()
             )
         return self.llm_instance
 
-    def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available OpenAI models."""
-        if do_refresh or self.cached_models is None:
-            if self.model_requires_api_key and not self.get_api_key():
-                raise ValueError(f"API key required for {self.provider_name}")
-            url = self.get_base_url()
-            if url[-1] != "/":
-                url += "/"
-            url += "models"
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get("id", ""),
-                        "name": model.get("id", ""),
-                        "description": "https://platform.openai.com/docs/models/compare",
-                        "context_length": "unknown",
-                        "architecture": {"modality": "text->text", "instruct_type": "general"}
-                    }
-                    for model in models_data.get(self.model_list_key, [])
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get("id", ""),
+            "name": model.get("id", ""),
+            "description": "https://platform.openai.com/docs/models/compare",
+            "context_length": "unknown",
+            "architecture": {"modality": "text->text", "instruct_type": "general"}
+        }
 
 class AnthropicProvider(LLMProviderBase):
     """Anthropic LLM provider implementation."""
@@ -247,7 +299,7 @@ class AnthropicProvider(LLMProviderBase):
         }
         if headers:
             default_headers.update(headers)
-        return requests.get(url, headers=default_headers)
+        return http_pool.http_get(url, headers=default_headers)
 
 class GeminiProvider(LLMProviderBase):
     """Google Gemini provider implementation."""
@@ -293,43 +345,23 @@ class GeminiProvider(LLMProviderBase):
         if not api_key:
             raise ValueError(f"API key required for {self.provider_name}")
         url += f"?key={api_key}"
-        return requests.get(url, headers=headers)
+        return http_pool.http_get(url, headers=headers)
 
-    def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available Gemini models."""
-        if do_refresh or self.cached_models is None:
-            if self.model_requires_api_key and not self.get_api_key():
-                raise ValueError(f"API key required for {self.provider_name}")
-            url = self.get_base_url()
-            if url[-1] != "/":
-                url += "/"
-            url += "models"
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get("name", ""),
-                        "name": model.get("displayName", model.get("name", "")),
-                        "description": model.get("description", "Gemini model"),
-                        "version": model.get("version", "unknown"),
-                        "context_length": model.get("inputTokenLimit", 0),
-                        "output_Length": model.get("outputTokenLimit", 0),
-                        "architecture": {"modality": "text->text", "instruct_type": "general"},
-                        "temperature": model.get("temperature", 0),
-                        "max_temperature": model.get("maxTemperature", 1),
-                        "topP": model.get("topP", 0),
-                        "topK": model.get("topK", 0),
-                        "methods": model.get("supportedGenerationMethods", "")
-                    }
-                    for model in models_data.get(self.model_list_key, [])
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get("name", ""),
+            "name": model.get("displayName", model.get("name", "")),
+            "description": model.get("description", "Gemini model"),
+            "version": model.get("version", "unknown"),
+            "context_length": model.get("inputTokenLimit", 0),
+            "output_Length": model.get("outputTokenLimit", 0),
+            "architecture": {"modality": "text->text", "instruct_type": "general"},
+            "temperature": model.get("temperature", 0),
+            "max_temperature": model.get("maxTemperature", 1),
+            "topP": model.get("topP", 0),
+            "topK": model.get("topK", 0),
+            "methods": model.get("supportedGenerationMethods", "")
+        }
 
 class OllamaProvider(LLMProviderBase):
     """Ollama LLM provider implementation."""
@@ -342,6 +374,10 @@ class OllamaProvider(LLMProviderBase):
     def default_endpoint(self) -> str:
         return "http://localhost:11434/v1/"
     
+    @property
+    def model_list_ttl(self) -> float:
+        return self.config.get("model_list_ttl", LOCAL_MODEL_LIST_TTL)
+    
     def get_llm_instance(self, overrides) -> LLM:
         if not self.llm_instance:
             mymodel = overrides.get("model", self.get_current_model())
@@ -354,30 +390,21 @@ class OllamaProvider(LLMProviderBase):
             )
         return self.llm_instance
 
-    def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available Ollama models."""
-        if do_refresh or self.cached_models is None:
-            url = self.get_base_url().replace("/v1/", "/api/tags")
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get("name", ""),
-                        "name": model.get("model", model.get("name", "")),
-                        "description": "Local Ollama model",
-                        "context_length": 4096,
-                        "pricing": {"prompt": "0", "completion": "0", "request": "0"},
-                        "architecture": {"modality": "text->text", "instruct_type": "general"}
-                    }
-                    for model in models_data.get("models", [])
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+    def _models_url(self) -> str:
+        return self.get_base_url().replace("/v1/", "/api/tags")
+
+    def _model_list(self, models_data) -> List[Dict[str, Any]]:
+        return models_data.get("models", [])
+
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get("name", ""),
+            "name": model.get("model", model.get("name", "")),
+            "description": "Local Ollama model",
+            "context_length": 4096,
+            "pricing": {"prompt": "0", "completion": "0", "request": "0"},
+            "architecture": {"modality": "text->text", "instruct_type": "general"}
+        }
 
 class OpenRouterProvider(LLMProviderBase):
     """OpenRouter provider implementation."""
@@ -402,39 +429,21 @@ class OpenRouterProvider(LLMProviderBase):
                 model=overrides.get("model", self.get_current_model()),
                 temperature=overrides.get("temperature", self.config.get("temperature", DEFAULT_TEMPERATURE)),
                 max_tokens=overrides.get("max_tokens", self.config.get("max_tokens", DEFAULT_MAX_TOKENS)),
-                request_timeout=self.get_timeout(overrides)
+                request_timeout=self.get_timeout(overrides),
+                http_client=http_pool.get_httpx_client(),
+                http_async_client=http_pool.get_httpx_async_client()
             )
         return self.llm_instance
 
-    def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available OpenRouter models."""
-        if do_refresh or self.cached_models is None:
-            if self.model_requires_api_key and not self.get_api_key():
-                raise ValueError(f"API key required for {self.provider_name}")
-            url = self.get_base_url()
-            if url[-1] != "/":
-                url += "/"
-            url += "models"
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get("id", ""),
-                        "name": model.get("name", model.get("id", "")),
-                        "description": model.get("description", "OpenRouter model"),
-                        "context_length": model.get("context_length", 4096),
-                        "pricing": model.get("pricing", {"prompt": "0", "completion": "0", "request": "0"}),
-                        "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"})
-                    }
-                    for model in models_data.get(self.model_list_key, [])
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get("id", ""),
+            "name": model.get("name", model.get("id", "")),
+            "description": model.get("description", "OpenRouter model"),
+            "context_length": model.get("context_length", 4096),
+            "pricing": model.get("pricing", {"prompt": "0", "completion": "0", "request": "0"}),
+            "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"})
+        }
 
 class TogetherAIProvider(LLMProviderBase):
     """Together AI provider implementation."""
@@ -459,6 +468,8 @@ class TogetherAIProvider(LLMProviderBase):
                 model=overrides.get("model", self.get_current_model()),
                 temperature=self.config.get("temperature", DEFAULT_TEMPERATURE),
                 max_tokens=self.config.get("max_tokens", DEFAULT_MAX_TOKENS),
+                http_client=http_pool.get_httpx_client(),
+                http_async_client=http_pool.get_httpx_async_client()
             )
         return self.llm_instance
 
@@ -466,48 +477,31 @@ class TogetherAIProvider(LLMProviderBase):
         """Returns a list of available model IDs from the provider."""
         return [model["id"] for model in self.get_model_details(do_refresh)]
 
-    def get_model_details(self, do_refresh: bool = False) -> List[Dict[str, Any]]:
-        """Returns detailed information about available TogetherAI models."""
-        if do_refresh or self.cached_models is None:
-            if self.model_requires_api_key and not self.get_api_key():
-                raise ValueError(f"API key required for {self.provider_name}")
-            url = self.get_base_url()
-            if url[-1] != "/":
-                url += "/"
-            url += "models"
-            response = self._do_models_request(url)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.cached_models = [
-                    {
-                        "id": model.get("id", ""),
-                        "name": model.get("display_name", model.get("id", "")),
-                        "description": model.get("description", "TogetherAI model"),
-                        "context_length": model.get("context_length", 4096),
-                        "pricing": model.get("pricing", {"hourly": "0", "input": "0", "output": "0", "base": "0", "finetune": "0"}),
-                        "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"}),
-                        "created": model.get("created", None),
-                        "type": model.get("type", "chat"),
-                        "running": model.get("running", False),
-                        "organization": model.get("organization", ""),
-                        "link": model.get("link", ""),
-                        "license": model.get("license", ""),
-                        "config": model.get("config", {
-                            "chat_template": "",
-                            "stop": [],
-                            "bos_token": "",
-                            "eos_token": "",
-                            "max_output_length": None
-                        })
-                    }
-                    for model in models_data
-                ]
-                self.cached_models.sort(key=lambda x: x["id"], reverse=self.use_reverse_sort)
-            else:
-                self.cached_models = []
-                if do_refresh:
-                    raise ResourceWarning(response.json().get("error", "Failed to fetch models"))
-        return self.cached_models
+    def _model_list(self, models_data) -> List[Dict[str, Any]]:
+        return models_data
+
+    def _model_entry(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": model.get("id", ""),
+            "name": model.get("display_name", model.get("id", "")),
+            "description": model.get("description", "TogetherAI model"),
+            "context_length": model.get("context_length", 4096),
+            "pricing": model.get("pricing", {"hourly": "0", "input": "0", "output": "0", "base": "0", "finetune": "0"}),
+            "architecture": model.get("architecture", {"modality": "text->text", "instruct_type": "general"}),
+            "created": model.get("created", None),
+            "type": model.get("type", "chat"),
+            "running": model.get("running", False),
+            "organization": model.get("organization", ""),
+            "link": model.get("link", ""),
+            "license": model.get("license", ""),
+            "config": model.get("config", {
+                "chat_template": "",
+                "stop": [],
+                "bos_token": "",
+                "eos_token": "",
+                "max_output_length": None
+            })
+        }
     
 class LMStudioProvider(LLMProviderBase):
     """LMStudio provider implementation."""
@@ -520,6 +514,10 @@ class LMStudioProvider(LLMProviderBase):
     def default_endpoint(self) -> str:
         return "http://localhost:1234/v1"
     
+    @property
+    def model_list_ttl(self) -> float:
+        return self.config.get("model_list_ttl", LOCAL_MODEL_LIST_TTL)
+    
     def get_llm_instance(self, overrides) -> BaseChatModel:
         if not self.llm_instance:
             self.llm_instance = ChatOpenAI(
@@ -528,7 +526,9 @@ class LMStudioProvider(LLMProviderBase):
                 model_name=overrides.get("model", self.get_current_model() or "local-model"),
                 temperature=self.config.get("temperature", DEFAULT_TEMPERATURE),
                 max_tokens=self.config.get("max_tokens", DEFAULT_MAX_TOKENS),
-                request_timeout=self.get_timeout(overrides)
+                request_timeout=self.get_timeout(overrides),
+                http_client=http_pool.get_httpx_client(),
+                http_async_client=http_pool.get_httpx_async_client()
             )
         return self.llm_instance
 
@@ -546,6 +546,10 @@ class CustomProvider(LLMProviderBase):
     def get_api_key(self):
         return super().get_api_key() or "not-needed"
     
+    @property
+    def model_list_ttl(self) -> float:
+        return self.config.get("model_list_ttl", LOCAL_MODEL_LIST_TTL)
+    
     def get_llm_instance(self, overrides) -> BaseChatModel:
         if not self.llm_instance:
             self.config["endpoint"] = overrides.get("endpoint", self.get_base_url())
@@ -557,7 +561,9 @@ class CustomProvider(LLMProviderBase):
                 model_name=self.get_current_model() or "custom-model",
                 temperature=self.config.get("temperature", DEFAULT_TEMPERATURE),
                 max_tokens=self.config.get("max_tokens", DEFAULT_MAX_TOKENS),
-                request_timeout=self.get_timeout(overrides)
+                request_timeout=self.get_timeout(overrides),
+                http_client=http_pool.get_httpx_client(),
+                http_async_client=http_pool.get_httpx_async_client()
             )
         return self.llm_instance
 
@@ -607,13 +613,13 @@ class WW_Aggregator:
     
     def _get_provider_class(self, provider_name: str) -> Optional[Type[LLMProviderBase]]:
         """Get the provider class based on the provider name."""
-        provider_map = {
-            cls().provider_name: cls
-            for cls in LLMProviderBase.__subclasses__()
-        }
-        return provider_map.get(provider_name)
+        return PROVIDER_CLASSES.get(provider_name)
 
-import threading
+# Provider name -> class, built once all provider classes are defined
+PROVIDER_CLASSES: Dict[str, Type[LLMProviderBase]] = {
+    cls().provider_name: cls
+    for cls in LLMProviderBase.__subclasses__()
+}
 
 class LLMAPIAggregator:
     """Main class for the LLM API Aggregator."""
@@ -625,16 +631,20 @@ class LLMAPIAggregator:
         logging.debug("LLMAPIAggregator initialized")
     
     def get_llm_providers(self) -> List[str]:
-        """Dynamically returns a list of supported LLM provider names."""
-        return [cls().provider_name for cls in LLMProviderBase.__subclasses__()]
-    
-    def send_prompt_to_llm(
-        self, 
-        final_prompt: str, 
-        overrides: Optional[Dict[str, Any]] = None,
-        conversation_history: Optional[List[Dict[str, str]]] = None
-    ) -> str:
-        """Send a prompt to the active LLM and return the generated text."""
+        """Returns a list of supported LLM provider names."""
+        return list(PROVIDER_CLASSES)
+
+    def prefetch_models(self):
+        """Refresh missing or stale model lists of configured providers in the background."""
+        providers = []
+        for name in WWSettingsManager.get_llm_configs():
+            provider = self.aggregator.get_provider(name)
+            if provider:
+                providers.append(provider)
+        WWModelCatalog.refresh_stale(providers)
+
+    def _resolve_provider(self, overrides: Optional[Dict[str, Any]]):
+        """Return (provider, provider_name, effective overrides) for a request."""
         overrides = overrides or {}
         
         provider_name = overrides.get("provider") or WWSettingsManager.get_active_llm_name()
@@ -647,30 +657,168 @@ class LLMAPIAggregator:
         provider = self.aggregator.get_provider(provider_name)
         if not provider:
             raise ValueError(f"Provider '{provider_name}' not found or not configured")
+        return provider, provider_name, overrides
+
+    @staticmethod
+    def _build_input(final_prompt: str, conversation_history: Optional[List[Dict[str, str]]]):
+        """Return the plain prompt, or a message list when there is a history."""
+        if not conversation_history:
+            return final_prompt
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
         
-        llm = provider.get_llm_instance(overrides)
-        
-        if conversation_history:
-            from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-            
-            messages = []
-            for message in conversation_history:
-                role = message.get("role", "").lower()
-                content = message.get("content", "")
-                
-                if role == "system":
-                    messages.append(SystemMessage(content=content))
-                elif role == "user" or role == "human":
-                    messages.append(HumanMessage(content=content))
-                elif role == "assistant" or role == "ai":
-                    messages.append(AIMessage(content=content))
-            
-            messages.append(HumanMessage(content=final_prompt))
+        messages = []
+        for message in conversation_history:
+            role = message.get("role", "").lower()
+            content = message.get("content", "")
             
-            response = llm.invoke(messages)
-            return response.content
+            if role == "system":
+                messages.append(SystemMessage(content=content))
+            elif role == "user" or role == "human":
+                messages.append(HumanMessage(content=content))
+            elif role == "assistant" or role == "ai":
+                messages.append(AIMessage(content=content))
+        
+        messages.append(HumanMessage(content=final_prompt))
+        return messages
+
+    @staticmethod
+    def _response_cache(provider, provider_name: str, overrides: Dict[str, Any],
+                        final_prompt: str, conversation_history: Optional[List[Dict[str, str]]]):
+        """Return (cache, key) for a request, or (None, None) while caching is off."""
+        cache = get_response_cache()
+        if cache is None:
+            return None, None
+        return cache, LLMAPIAggregator._request_key(provider, provider_name, overrides, final_prompt,
+                                                    conversation_history)
+
+    @staticmethod
+    def _request_key(provider, provider_name: str, overrides: Dict[str, Any],
+                     final_prompt: str, conversation_history: Optional[List[Dict[str, str]]]) -> str:
+        """Hash of everything that determines a response (cache key, batch deduplication)."""
+        return make_key(
+            provider_name,
+            overrides.get("model", provider.get_current_model()),
+            overrides.get("temperature", provider.config.get("temperature", DEFAULT_TEMPERATURE)),
+            overrides.get("max_tokens", provider.config.get("max_tokens", DEFAULT_MAX_TOKENS)),
+            final_prompt,
+            conversation_history
+        )
+
+    def _streaming_llm(self, overrides: Optional[Dict[str, Any]]):
+        provider, provider_name, overrides = self._resolve_provider(overrides)
+        if provider.model_requires_api_key:
+            api_key = overrides.get("api_key", provider.get_api_key())
+            if not api_key or api_key == "not-needed":
+                raise ValueError(f"API key required for {provider_name} but not provided")
+
+        try:
+            return provider.get_cached_llm_instance(overrides)
+        except ValueError as e:
+            raise ValueError(f"Failed to initialize LLM: {e}")
+    
+    def _hedge(self, provider_name: str, overrides: Dict[str, Any]):
+        """Return (provider, name, overrides, delay) of the configured hedge provider, or None."""
+        policy = get_policy(provider_name)
+        hedge_name = policy.get("hedge_provider")
+        delay = float(policy.get("hedge_after_seconds") or 0)
+        if not hedge_name or delay <= 0 or hedge_name == provider_name:
+            return None
+        hedge_provider = self.aggregator.get_provider(hedge_name)
+        if not hedge_provider:
+            logging.warning(f"Hedge provider '{hedge_name}' is not configured")
+            return None
+        # The primary's model and endpoint do not apply to another provider
+        hedge_overrides = {k: overrides[k] for k in ("max_tokens", "temperature", "timeout") if k in overrides}
+        return hedge_provider, hedge_name, hedge_overrides, delay
+
+    @staticmethod
+    def _start_timer(provider, provider_name: str, overrides: Dict[str, Any], kind: str, llm_input):
+        return llm_metrics.start(provider_name, overrides.get("model") or provider.get_current_model(),
+                                 kind, llm_input)
+
+    def _invoke(self, provider, provider_name: str, overrides: Dict[str, Any], llm_input) -> str:
+        timer = self._start_timer(provider, provider_name, overrides, "invoke", llm_input)
+        try:
+            response = WWMiddleware.call(
+                provider_name, lambda: provider.get_cached_llm_instance(overrides).invoke(llm_input).content
+            )
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+        timer.finish(response)
+        return response
+
+    def _stream(self, provider, provider_name: str, overrides: Dict[str, Any], llm_input):
+        llm = provider.get_cached_llm_instance(overrides)
+        timer = self._start_timer(provider, provider_name, overrides, "stream", llm_input)
+        try:
+            for content in WWMiddleware.stream(
+                provider_name, lambda: (chunk.content for chunk in llm.stream(llm_input)), self.interrupt_flag
+            ):
+                timer.chunk(content)
+                yield content
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+        timer.finish()
+
+    async def _ainvoke(self, provider, provider_name: str, overrides: Dict[str, Any], llm_input) -> str:
+        llm = provider.get_cached_llm_instance(overrides)
+        timer = self._start_timer(provider, provider_name, overrides, "invoke", llm_input)
+        try:
+            response = await WWMiddleware.acall(provider_name, lambda: llm.ainvoke(llm_input))
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+        timer.finish(response.content)
+        return response.content
+
+    async def _astream(self, provider, provider_name: str, overrides: Dict[str, Any], llm_input):
+        llm = provider.get_cached_llm_instance(overrides)
+        timer = self._start_timer(provider, provider_name, overrides, "stream", llm_input)
+
+        async def contents():
+            async for chunk in llm.astream(llm_input):
+                yield chunk.content
+
+        try:
+            async for content in WWMiddleware.astream(provider_name, contents):
+                timer.chunk(content)
+                yield content
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+        timer.finish()
+
+    def send_prompt_to_llm(
+        self, 
+        final_prompt: str, 
+        overrides: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """Send a prompt to the active LLM and return the generated text."""
+        provider, provider_name, overrides = self._resolve_provider(overrides)
+        llm_metrics.record_prompt(provider_name, "invoke", final_prompt, conversation_history, overrides)
+        cache, key = self._response_cache(provider, provider_name, overrides, final_prompt, conversation_history)
+        if cache:
+            hit = cache.get(key)
+            if hit:
+                http_pool.record("response_cache_hit")
+                return hit[0]
+        llm_input = self._build_input(final_prompt, conversation_history)
+        hedge = self._hedge(provider_name, overrides)
+        if hedge:
+            hedge_provider, hedge_name, hedge_overrides, delay = hedge
+            response = hedged_call(
+                lambda: self._invoke(provider, provider_name, overrides, llm_input),
+                lambda: self._invoke(hedge_provider, hedge_name, hedge_overrides, llm_input),
+                delay
+            )
         else:
-            return llm.invoke(final_prompt).content
+            response = self._invoke(provider, provider_name, overrides, llm_input)
+        if cache:
+            cache.put(key, response)
+        return response
 
     def stream_prompt_to_llm(
         self, 
@@ -680,61 +828,40 @@ class LLMAPIAggregator:
     ):
         """Stream a prompt to the active LLM and yield the generated text."""
         logging.debug(f"Starting stream_prompt_to_llm, interrupt_flag: {self.interrupt_flag.is_set()}")
-        overrides = overrides or {}
-        
-        provider_name = overrides.get("provider") or WWSettingsManager.get_active_llm_name()
-        if provider_name in ["Local", "Default"]:
-            provider_name = WWSettingsManager.get_active_llm_name()
-            overrides = {}
-        if not provider_name:
-            raise ValueError("No active LLM provider specified")
-        
-        provider = self.aggregator.get_provider(provider_name)
-        if not provider:
-            raise ValueError(f"Provider '{provider_name}' not found or not configured")
-        
-        if provider.model_requires_api_key:
-            api_key = overrides.get("api_key", provider.get_api_key())
-            if not api_key or api_key == "not-needed":
-                raise ValueError(f"API key required for {provider_name} but not provided")
-
-        try:
-            llm = provider.get_llm_instance(overrides)
-        except ValueError as e:
-            raise ValueError(f"Failed to initialize LLM: {e}")
+        provider, provider_name, resolved = self._resolve_provider(overrides)
+        llm_metrics.record_prompt(provider_name, "stream", final_prompt, conversation_history, resolved)
+        cache, key = self._response_cache(provider, provider_name, resolved, final_prompt, conversation_history)
+        hit = cache.get(key) if cache else None
+        if not hit:
+            self._streaming_llm(overrides)  # validates the API key and configuration up front
         
         self.is_streaming = True
         try:
-            if conversation_history:
-                from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-                
-                messages = []
-                for message in conversation_history:
-                    role = message.get("role", "").lower()
-                    content = message.get("content", "")
-                    
-                    if role == "system":
-                        messages.append(SystemMessage(content=content))
-                    elif role == "user" or role == "human":
-                        messages.append(HumanMessage(content=content))
-                    elif role == "assistant" or role == "ai":
-                        messages.append(AIMessage(content=content))
-                
-                messages.append(HumanMessage(content=final_prompt))
-                
-                stream = llm.stream(messages)
-                for chunk in stream:
-                    if self.interrupt_flag.is_set():
-                        logging.debug("Stream interrupted by flag")
-                        break
-                    yield chunk.content
+            if hit:
+                http_pool.record("response_cache_hit")
+                chunks = hit[1]
+            else:
+                llm_input = self._build_input(final_prompt, conversation_history)
+                hedge = self._hedge(provider_name, resolved)
+                if hedge:
+                    hedge_provider, hedge_name, hedge_overrides, delay = hedge
+                    chunks = hedged_stream(
+                        lambda: self._stream(provider, provider_name, resolved, llm_input),
+                        lambda: self._stream(hedge_provider, hedge_name, hedge_overrides, llm_input),
+                        delay
+                    )
+                else:
+                    chunks = self._stream(provider, provider_name, resolved, llm_input)
+            received = []
+            for content in chunks:
+                if self.interrupt_flag.is_set():
+                    logging.debug("Stream interrupted by flag")
+                    break
+                received.append(content)
+                yield content
             else:
-                stream = llm.stream(final_prompt)
-                for chunk in stream:
-                    if self.interrupt_flag.is_set():
-                        logging.debug("Stream interrupted by flag")
-                        break
-                    yield chunk.content
+                if cache and not hit and not self.interrupt_flag.is_set():
+                    cache.put(key, "".join(c for c in received if isinstance(c, str)), received)
         except Exception as e:
             logging.error(f"Streaming error: {e}")
             raise
@@ -742,9 +869,227 @@ class LLMAPIAggregator:
             logging.debug(f"Stream cleanup, setting is_streaming=False, clearing interrupt_flag")
             self.is_streaming = False
             self.interrupt_flag.clear()
-            provider.reset_llm_instance()
             logging.debug(f"After cleanup, interrupt_flag: {self.interrupt_flag.is_set()}")
 
+    # ------------------------------------------------------------------
+    # asyncio API. Run these on the shared background loop
+    # (settings.async_llm.run_async) so the pooled async HTTP client is
+    # always used from the loop it belongs to.
+    # ------------------------------------------------------------------
+    async def asend_prompt(
+        self,
+        final_prompt: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """Async counterpart of send_prompt_to_llm (uses ainvoke)."""
+        provider, provider_name, overrides = self._resolve_provider(overrides)
+        llm_metrics.record_prompt(provider_name, "invoke", final_prompt, conversation_history, overrides)
+        cache, key = self._response_cache(provider, provider_name, overrides, final_prompt, conversation_history)
+        if cache:
+            hit = cache.get(key)
+            if hit:
+                http_pool.record("response_cache_hit")
+                return hit[0]
+        llm_input = self._build_input(final_prompt, conversation_history)
+        hedge = self._hedge(provider_name, overrides)
+        if hedge:
+            hedge_provider, hedge_name, hedge_overrides, delay = hedge
+            response = await ahedged_call(
+                lambda: self._ainvoke(provider, provider_name, overrides, llm_input),
+                lambda: self._ainvoke(hedge_provider, hedge_name, hedge_overrides, llm_input),
+                delay
+            )
+        else:
+            response = await self._ainvoke(provider, provider_name, overrides, llm_input)
+        if cache:
+            cache.put(key, response)
+        return response
+
+    async def astream_prompt(
+        self,
+        final_prompt: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ):
+        """
+        Async counterpart of stream_prompt_to_llm (uses astream). Each call is
+        independent: stop it by cancelling the task that iterates it, not with
+        interrupt().
+        """
+        provider, provider_name, resolved = self._resolve_provider(overrides)
+        llm_metrics.record_prompt(provider_name, "stream", final_prompt, conversation_history, resolved)
+        cache, key = self._response_cache(provider, provider_name, resolved, final_prompt, conversation_history)
+        hit = cache.get(key) if cache else None
+        if hit:
+            http_pool.record("response_cache_hit")
+            for content in hit[1]:
+                yield content
+            return
+        self._streaming_llm(overrides)
+        llm_input = self._build_input(final_prompt, conversation_history)
+        hedge = self._hedge(provider_name, resolved)
+        if hedge:
+            hedge_provider, hedge_name, hedge_overrides, delay = hedge
+            chunks = ahedged_stream(
+                lambda: self._astream(provider, provider_name, resolved, llm_input),
+                lambda: self._astream(hedge_provider, hedge_name, hedge_overrides, llm_input),
+                delay
+            )
+        else:
+            chunks = self._astream(provider, provider_name, resolved, llm_input)
+        received = []
+        async for content in chunks:
+            received.append(content)
+            yield content
+        if cache:
+            cache.put(key, "".join(c for c in received if isinstance(c, str)), received)
+
+    async def agather(
+        self,
+        prompts: List[Union[str, Dict[str, Any]]],
+        max_concurrency: int = 8,
+        return_exceptions: bool = True
+    ) -> List[Any]:
+        """
+        Send many prompts concurrently and return their responses in order.
+
+        Each item is a prompt string or a dict with "final_prompt" and optional
+        "overrides" and "conversation_history". At most max_concurrency requests
+        are in flight. With return_exceptions a failed item yields its exception
+        instead of cancelling the others.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(item):
+            if isinstance(item, str):
+                item = {"final_prompt": item}
+            async with semaphore:
+                return await self.asend_prompt(
+                    item["final_prompt"], item.get("overrides"), item.get("conversation_history")
+                )
+
+        return await asyncio.gather(*(run_one(item) for item in prompts),
+                                    return_exceptions=return_exceptions)
+
+    def _prepare_batch(self, prompts: List[Union[str, Dict[str, Any]]], overrides: Optional[Dict[str, Any]]):
+        """
+        Resolve the provider and deduplicate the prompts. Returns the provider
+        details, the request key of every item, the unique requests to send
+        (key -> llm input) and the responses already found in the cache.
+        """
+        provider, provider_name, overrides = self._resolve_provider(overrides)
+        cache = get_response_cache()
+        keys: List[str] = []
+        unique: Dict[str, Any] = {}
+        done: Dict[str, Any] = {}
+        for item in prompts:
+            if isinstance(item, str):
+                item = {"final_prompt": item}
+            final_prompt, history = item["final_prompt"], item.get("conversation_history")
+            llm_metrics.record_prompt(provider_name, "batch", final_prompt, history, overrides)
+            key = self._request_key(provider, provider_name, overrides, final_prompt, history)
+            keys.append(key)
+            if key in unique or key in done:
+                continue
+            hit = cache.get(key) if cache else None
+            if hit:
+                http_pool.record("response_cache_hit")
+                done[key] = hit[0]
+            else:
+                unique[key] = self._build_input(final_prompt, history)
+        return provider, provider_name, overrides, cache, keys, unique, done
+
+    def _batch_round(self, provider, provider_name: str, overrides: Dict[str, Any],
+                     inputs: List[Any], max_concurrency: int) -> List[Any]:
+        """One batch request: a response text or an exception per input."""
+        timers = [self._start_timer(provider, provider_name, overrides, "batch", llm_input) for llm_input in inputs]
+        try:
+            outcomes = provider.batch(provider.get_cached_llm_instance(overrides), inputs, max_concurrency)
+        except Exception as e:
+            outcomes = [e] * len(inputs)
+        return self._finish_batch_round(timers, outcomes)
+
+    async def _abatch_round(self, provider, provider_name: str, overrides: Dict[str, Any],
+                            inputs: List[Any], max_concurrency: int) -> List[Any]:
+        timers = [self._start_timer(provider, provider_name, overrides, "batch", llm_input) for llm_input in inputs]
+        try:
+            outcomes = await provider.abatch(provider.get_cached_llm_instance(overrides), inputs, max_concurrency)
+        except Exception as e:
+            outcomes = [e] * len(inputs)
+        return self._finish_batch_round(timers, outcomes)
+
+    @staticmethod
+    def _finish_batch_round(timers, outcomes: List[Any]) -> List[Any]:
+        results = []
+        for timer, outcome in zip(timers, outcomes):
+            if isinstance(outcome, Exception):
+                timer.finish(error=outcome)
+                results.append(outcome)
+            else:
+                timer.finish(outcome.content)
+                results.append(outcome.content)
+        return results
+
+    @staticmethod
+    def _finish_batch(cache, keys: List[str], sent: List[str], outcomes: List[Any],
+                      done: Dict[str, Any]) -> List[Any]:
+        for key, outcome in zip(sent, outcomes):
+            done[key] = outcome
+            if cache and not isinstance(outcome, Exception):
+                cache.put(key, outcome)
+        return [done[key] for key in keys]
+
+    def send_batch(
+        self,
+        prompts: List[Union[str, Dict[str, Any]]],
+        overrides: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+    ) -> List[Union[str, Exception]]:
+        """
+        Send many independent prompts to one provider and return their
+        responses in order.
+
+        Each item is a prompt string or a dict with "final_prompt" and an
+        optional "conversation_history"; overrides apply to the whole batch.
+        Identical requests are sent once, cached responses are reused, and the
+        rest go out through the provider's batch() with at most
+        max_concurrency requests in flight. A failed item yields its exception
+        in place of the response; retryable failures are retried first.
+        """
+        provider, provider_name, overrides, cache, keys, unique, done = self._prepare_batch(prompts, overrides)
+        sent = list(unique)
+        inputs = list(unique.values())
+        outcomes = WWMiddleware.batch(
+            provider_name, len(inputs),
+            lambda indices: self._batch_round(provider, provider_name, overrides,
+                                              [inputs[i] for i in indices], max_concurrency)
+        ) if inputs else []
+        return self._finish_batch(cache, keys, sent, outcomes, done)
+
+    async def asend_batch(
+        self,
+        prompts: List[Union[str, Dict[str, Any]]],
+        overrides: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+    ) -> List[Union[str, Exception]]:
+        """Async counterpart of send_batch (uses abatch)."""
+        provider, provider_name, overrides, cache, keys, unique, done = self._prepare_batch(prompts, overrides)
+        sent = list(unique)
+        inputs = list(unique.values())
+        outcomes = await WWMiddleware.abatch(
+            provider_name, len(inputs),
+            lambda indices: self._abatch_round(provider, provider_name, overrides,
+                                               [inputs[i] for i in indices], max_concurrency)
+        ) if inputs else []
+        return self._finish_batch(cache, keys, sent, outcomes, done)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """HTTP pool and LLM instance cache statistics."""
+        stats = http_pool.pool_stats()
+        stats["circuits"] = WWMiddleware.status()
+        return stats
+
     def interrupt(self):
         """Interrupt the streaming process."""
         if self.is_streaming:
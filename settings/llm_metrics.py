@@ -0,0 +1,216 @@
+"""
+Latency and throughput metrics of LLM requests.
+
+The aggregator opens a RequestTimer for every provider call. When the call
+ends, one JSON line is appended to llm_metrics.jsonl (rotated by a
+RotatingFileHandler) with the provider, model, request kind, time to first
+token, total latency, prompt/completion token counts, tokens per second and
+the error class, if any. summarize() turns records into percentiles per
+provider and model for the metrics dialog.
+
+With the "general" setting record_llm_prompts enabled, the prompt payloads
+themselves are appended to llm_prompts.jsonl as well, so real workloads can be
+replayed with util.llm_replay. Recording is off by default since the file
+holds the full text sent to providers.
+"""
+import os
+import json
+import math
+import time
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from util import tokenizer
+from .settings_manager import WWSettingsManager
+
+METRICS_FILE = "llm_metrics.jsonl"
+PROMPTS_FILE = "llm_prompts.jsonl"
+MAX_FILE_BYTES = 2 * 1024 * 1024
+BACKUP_COUNT = 3
+
+_logger = logging.getLogger("ww.llm_metrics")
+_logger.propagate = False
+_prompt_logger = logging.getLogger("ww.llm_prompts")
+_prompt_logger.propagate = False
+_handler_lock = threading.Lock()
+
+
+def metrics_path() -> str:
+    return os.path.join(os.getcwd(), METRICS_FILE)
+
+
+def prompts_path() -> str:
+    return os.path.join(os.getcwd(), PROMPTS_FILE)
+
+
+def _write(record: Dict[str, Any], logger: logging.Logger = _logger, path: Optional[str] = None):
+    with _handler_lock:
+        if not logger.handlers:
+            try:
+                handler = RotatingFileHandler(path or metrics_path(), maxBytes=MAX_FILE_BYTES,
+                                              backupCount=BACKUP_COUNT, encoding="utf-8")
+            except OSError as e:
+                logging.error(f"Cannot open LLM metrics file: {e}")
+                return
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def prompt_recording_enabled() -> bool:
+    return bool(WWSettingsManager.get_setting("general", "record_llm_prompts", False))
+
+
+def record_prompt(provider_name: str, kind: str, final_prompt: str,
+                  conversation_history: Optional[List[Dict[str, str]]], overrides: Optional[Dict[str, Any]]):
+    """Append a request payload to llm_prompts.jsonl when prompt recording is enabled."""
+    if not prompt_recording_enabled():
+        return
+    _write({
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "provider": provider_name,
+        "kind": kind,
+        "final_prompt": final_prompt,
+        "conversation_history": conversation_history or [],
+        "overrides": {k: v for k, v in (overrides or {}).items() if k != "api_key"}
+    }, _prompt_logger, prompts_path())
+
+
+def _text_of(llm_input) -> str:
+    """Plain text of a prompt or message list, for counting prompt tokens."""
+    if isinstance(llm_input, str):
+        return llm_input
+    parts = []
+    for message in llm_input or []:
+        content = getattr(message, "content", message)
+        if isinstance(content, list):
+            content = " ".join(str(part.get("text", "")) if isinstance(part, dict) else str(part)
+                               for part in content)
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+class RequestTimer:
+    """Measures one provider request; call finish() exactly once."""
+
+    def __init__(self, provider_name: str, model: str, kind: str, llm_input):
+        self.provider_name = provider_name
+        self.model = model
+        self.kind = kind
+        self.llm_input = llm_input
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.chunks: List[str] = []
+        self.done = False
+
+    def chunk(self, content):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        if isinstance(content, str):
+            self.chunks.append(content)
+
+    def finish(self, completion: Optional[str] = None, error: Optional[BaseException] = None):
+        if self.done:
+            return
+        self.done = True
+        ended = time.monotonic()
+        if completion is not None:
+            self.chunk(completion)
+        encoding = tokenizer.encoding_for_model(self.model) if self.model else tokenizer.DEFAULT_ENCODING
+        try:
+            prompt_tokens = tokenizer.count_tokens(_text_of(self.llm_input), encoding)
+            completion_tokens = tokenizer.count_tokens("".join(self.chunks), encoding)
+        except Exception as e:  # the encoding may be unavailable offline
+            logging.debug(f"Token counting for metrics failed: {e}")
+            prompt_tokens = completion_tokens = None
+        ttft = (self.first_token_at - self.started) if self.first_token_at is not None else None
+        # Streams generate after their first token; a single response arrives all at once
+        generation_time = ended - (self.first_token_at if self.kind == "stream" and ttft is not None
+                                   else self.started)
+        error_class = None
+        if error is not None:
+            error_class = "Cancelled" if isinstance(error, (GeneratorExit, InterruptedError)) \
+                or type(error).__name__ == "CancelledError" else type(error).__name__
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "provider": self.provider_name,
+            "model": self.model,
+            "kind": self.kind,
+            "ttft": round(ttft, 4) if ttft is not None else None,
+            "latency": round(ended - self.started, 4),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": round(completion_tokens / generation_time, 2)
+            if completion_tokens and generation_time > 0 else None,
+            "error": error_class
+        }
+        _write(record)
+
+
+def start(provider_name: str, model: str, kind: str, llm_input) -> RequestTimer:
+    return RequestTimer(provider_name, model, kind, llm_input)
+
+
+def load_records(include_rotated: bool = True) -> List[Dict[str, Any]]:
+    """Read the records of the metrics file (and its rotated backups), oldest first."""
+    paths = [metrics_path()]
+    if include_rotated:
+        paths = [f"{metrics_path()}.{i}" for i in range(BACKUP_COUNT, 0, -1)] + paths
+    records = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return records
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Per (provider, model): request and error counts plus p50/p90/p99 of the timings."""
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault((record.get("provider", ""), record.get("model", "")), []).append(record)
+    summary = {}
+    for key, group in groups.items():
+        ok = [r for r in group if not r.get("error")]
+        row: Dict[str, Any] = {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "error_classes": sorted({r["error"] for r in group if r.get("error")})
+        }
+        for field in ("ttft", "latency", "tokens_per_second"):
+            values = [r[field] for r in ok if r.get(field) is not None]
+            for pct in (50, 90, 99):
+                row[f"{field}_p{pct}"] = percentile(values, pct)
+        summary[key] = row
+    return summary
+
+
+def clear():
+    """Delete the metrics file and its backups."""
+    with _handler_lock:
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        for path in [metrics_path()] + [f"{metrics_path()}.{i}" for i in range(1, BACKUP_COUNT + 1)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,99 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QLabel, QHeaderView, QMessageBox, QComboBox)
+from PyQt5.QtCore import Qt
+
+from . import llm_metrics
+
+
+class LLMMetricsDialog(QDialog):
+    """Percentiles of LLM request timings per provider and model."""
+
+    # (header, summary field, format); headers are translated when the table is built
+    COLUMNS = [
+        ("Requests", "requests", "{}"),
+        ("Errors", "errors", "{}"),
+        ("TTFT p50 (s)", "ttft_p50", "{:.2f}"),
+        ("TTFT p90 (s)", "ttft_p90", "{:.2f}"),
+        ("TTFT p99 (s)", "ttft_p99", "{:.2f}"),
+        ("Latency p50 (s)", "latency_p50", "{:.2f}"),
+        ("Latency p90 (s)", "latency_p90", "{:.2f}"),
+        ("Latency p99 (s)", "latency_p99", "{:.2f}"),
+        ("Tokens/s p50", "tokens_per_second_p50", "{:.1f}"),
+        ("Tokens/s p90", "tokens_per_second_p90", "{:.1f}"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(_("LLM Request Statistics"))
+        self.resize(1000, 400)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(QLabel(_("Requests:")))
+        self.kind_combo = QComboBox()
+        self.kind_combo.addItem(_("All"), None)
+        self.kind_combo.addItem(_("Streaming"), "stream")
+        self.kind_combo.addItem(_("Non-streaming"), "invoke")
+        self.kind_combo.addItem(_("Batched"), "batch")
+        self.kind_combo.currentIndexChanged.connect(self.refresh)
+        top_layout.addWidget(self.kind_combo)
+        top_layout.addStretch()
+        layout.addLayout(top_layout)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(2 + len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels([_("Provider"), _("Model")] + [_(c[0]) for c in self.COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        button_layout = QHBoxLayout()
+        self.refresh_button = QPushButton(_("Refresh"))
+        self.refresh_button.clicked.connect(self.refresh)
+        self.clear_button = QPushButton(_("Clear"))
+        self.clear_button.clicked.connect(self.clear_metrics)
+        self.close_button = QPushButton(_("Close"))
+        self.close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.refresh_button)
+        button_layout.addWidget(self.clear_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def refresh(self):
+        kind = self.kind_combo.currentData()
+        records = [r for r in llm_metrics.load_records() if kind is None or r.get("kind") == kind]
+        summary = llm_metrics.summarize(records)
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(summary))
+        for row, ((provider, model), stats) in enumerate(sorted(summary.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1])))):
+            self.table.setItem(row, 0, QTableWidgetItem(provider or ""))
+            self.table.setItem(row, 1, QTableWidgetItem(model or ""))
+            for col, (_header, field, fmt) in enumerate(self.COLUMNS, 2):
+                value = stats.get(field)
+                item = QTableWidgetItem()
+                if value is not None:
+                    # Numeric data so that sorting is numeric
+                    item.setData(Qt.DisplayRole, float(fmt.format(value)) if "." in fmt else value)
+                if field == "errors" and stats["error_classes"]:
+                    item.setToolTip(", ".join(stats["error_classes"]))
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        self.status_label.setText(_("{} requests recorded in {}").format(len(records), llm_metrics.metrics_path()))
+
+    def clear_metrics(self):
+        reply = QMessageBox.question(self, _("Clear Statistics"),
+                                     _("Delete all recorded LLM request statistics?"),
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            llm_metrics.clear()
+            self.refresh()
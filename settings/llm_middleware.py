@@ -0,0 +1,541 @@
+"""
+Resilience policies applied between LLMAPIAggregator and the providers.
+
+Every provider call goes through WWMiddleware, which applies per provider:
+- a token bucket limiting requests per minute,
+- retries of 429/5xx/timeout errors with exponential backoff and full jitter,
+- a circuit breaker that fails fast after repeated failures
+  (batch()/abatch() apply the same per item of a batch),
+and hedged_call/hedged_stream can race a secondary provider when the primary
+has not produced its first token within a threshold.
+
+Policies come from the "llm_policies" section of settings.json and can be
+overridden per provider with a "policies" dict in its LLM config.
+"""
+import re
+import time
+import queue
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .settings_manager import WWSettingsManager
+
+DEFAULT_POLICIES = {
+    "max_retries": 3,
+    "backoff_base": 1.0,              # seconds
+    "backoff_cap": 30.0,              # seconds
+    "requests_per_minute": 0,         # 0 disables rate limiting
+    "burst": 4,                       # requests allowed back to back
+    "circuit_failure_threshold": 5,   # consecutive failures that open the circuit, 0 disables
+    "circuit_reset_seconds": 60.0,
+    "hedge_provider": "",             # configured provider raced against a slow one
+    "hedge_after_seconds": 0.0        # time to first token before hedging, 0 disables
+}
+
+# Status codes and messages worth retrying: rate limits, server errors and timeouts
+RETRYABLE_STATUS = re.compile(r'\b(429|5\d\d)\b')
+RETRYABLE_PHRASES = ("rate limit", "too many requests", "overloaded", "temporarily unavailable",
+                     "timed out", "connection error", "connection refused")
+
+
+def error_status_code(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status of a provider exception (openai, anthropic, httpx, requests)."""
+    for candidate in (error, getattr(error, "response", None)):
+        status = getattr(candidate, "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for 429 and 5xx responses, timeouts and refused connections."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = error_status_code(error)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    text = str(error).lower()
+    return bool(RETRYABLE_STATUS.search(text)) or any(p in text for p in RETRYABLE_PHRASES)
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def get_policy(provider_name: str) -> Dict[str, Any]:
+    """Effective policies of a provider: defaults < llm_policies < the provider's "policies"."""
+    policy = dict(DEFAULT_POLICIES)
+    policy.update(WWSettingsManager.settings.get("llm_policies", {}) or {})
+    config = WWSettingsManager.get_llm_config(provider_name) or {}
+    policy.update(config.get("policies", {}) or {})
+    return policy
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class TokenBucket:
+    """Requests-per-minute limiter allowing bursts of up to `burst` requests."""
+
+    def __init__(self, requests_per_minute: float = 0, burst: int = 1):
+        self.configure(requests_per_minute, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def configure(self, requests_per_minute: float, burst: int):
+        self.rate = max(0.0, float(requests_per_minute)) / 60.0
+        self.capacity = max(1, int(burst))
+
+    def _try_take(self) -> float:
+        """Take a token (returns 0) or return the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, cancelled: Optional[threading.Event] = None) -> bool:
+        """Block until a request may be sent; False if cancelled while waiting."""
+        while True:
+            wait_for = self._try_take()
+            if not wait_for:
+                return True
+            if cancelled is not None:
+                if cancelled.wait(wait_for):
+                    return False
+            else:
+                time.sleep(wait_for)
+
+    async def aacquire(self) -> None:
+        while True:
+            wait_for = self._try_take()
+            if not wait_for:
+                return
+            await asyncio.sleep(wait_for)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_seconds`; the next call after that is a trial that closes the
+    circuit again on success.
+    """
+
+    def __init__(self, threshold: int = 5, reset_seconds: float = 60.0):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def check(self, provider_name: str):
+        with self.lock:
+            if self.opened_at is None or self.threshold <= 0:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"{provider_name} failed {self.failures} times in a row; "
+                    f"not sending requests for another {remaining:.1f}s"
+                )
+            # Half-open: let a trial request through
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.threshold > 0 and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() < self.opened_at + self.reset_seconds else "half-open"
+
+
+class ProviderGuard:
+    """Rate limiter and circuit breaker of one provider."""
+
+    def __init__(self, provider_name: str):
+        self.provider_name = provider_name
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.policy: Dict[str, Any] = {}
+
+    def refresh_policy(self) -> Dict[str, Any]:
+        """Re-read the policies so changes in the settings apply to the next request."""
+        self.policy = get_policy(self.provider_name)
+        self.bucket.configure(self.policy["requests_per_minute"], self.policy["burst"])
+        self.breaker.threshold = int(self.policy["circuit_failure_threshold"])
+        self.breaker.reset_seconds = float(self.policy["circuit_reset_seconds"])
+        return self.policy
+
+    def record_failure(self, error: Exception):
+        # Client errors (bad request, auth) say nothing about the provider's health
+        if is_retryable_error(error):
+            self.breaker.record_failure()
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the error should be raised."""
+        if attempt >= int(self.policy["max_retries"]) or not is_retryable_error(error):
+            return None
+        if self.breaker.state == "open":
+            return None  # this failure opened the circuit
+        return backoff_delay(attempt, float(self.policy["backoff_base"]), float(self.policy["backoff_cap"]))
+
+
+class LLMMiddleware:
+    """Applies the rate limit, retry and circuit breaker policies to provider calls."""
+
+    def __init__(self):
+        self._guards: Dict[str, ProviderGuard] = {}
+        self._lock = threading.Lock()
+
+    def guard(self, provider_name: str) -> ProviderGuard:
+        with self._lock:
+            guard = self._guards.get(provider_name)
+            if guard is None:
+                guard = self._guards[provider_name] = ProviderGuard(provider_name)
+            return guard
+
+    def _retrying(self, guard: ProviderGuard, error: Exception, attempt: int) -> Optional[float]:
+        guard.record_failure(error)
+        delay = guard.retry_delay(error, attempt)
+        if delay is not None:
+            logging.warning(f"{guard.provider_name}: retrying in {delay:.1f}s after error: {error}")
+        return delay
+
+    def call(self, provider_name: str, fn: Callable[[], Any],
+             cancelled: Optional[threading.Event] = None) -> Any:
+        """Run fn() (one provider request) under the provider's policies."""
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        attempt = 0
+        while True:
+            guard.breaker.check(provider_name)
+            if not guard.bucket.acquire(cancelled):
+                raise InterruptedError("Request cancelled")
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._retrying(guard, e, attempt)
+                if delay is None or (cancelled is not None and cancelled.is_set()):
+                    raise
+            else:
+                guard.breaker.record_success()
+                return result
+            if cancelled is not None:
+                if cancelled.wait(delay):
+                    raise InterruptedError("Request cancelled")
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+    def stream(self, provider_name: str, open_stream: Callable[[], Iterator[str]],
+               cancelled: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Yield the chunks of open_stream() under the provider's policies. A
+        failed stream is retried only until its first chunk was yielded.
+        """
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        attempt = 0
+        while True:
+            guard.breaker.check(provider_name)
+            if not guard.bucket.acquire(cancelled):
+                return
+            started = False
+            try:
+                for chunk in open_stream():
+                    if not started:
+                        started = True
+                        guard.breaker.record_success()
+                    yield chunk
+                return
+            except Exception as e:
+                delay = self._retrying(guard, e, attempt)
+                if started or delay is None or (cancelled is not None and cancelled.is_set()):
+                    raise
+            if cancelled is not None:
+                if cancelled.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, provider_name: str, make_coro: Callable[[], Any]) -> Any:
+        """Async counterpart of call(); make_coro() returns a fresh coroutine per attempt."""
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        attempt = 0
+        while True:
+            guard.breaker.check(provider_name)
+            await guard.bucket.aacquire()
+            try:
+                result = await make_coro()
+            except Exception as e:
+                delay = self._retrying(guard, e, attempt)
+                if delay is None:
+                    raise
+            else:
+                guard.breaker.record_success()
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def astream(self, provider_name: str, open_stream: Callable[[], Any]):
+        """Async counterpart of stream(); open_stream() returns an async iterator."""
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        attempt = 0
+        while True:
+            guard.breaker.check(provider_name)
+            await guard.bucket.aacquire()
+            started = False
+            try:
+                async for chunk in open_stream():
+                    if not started:
+                        started = True
+                        guard.breaker.record_success()
+                    yield chunk
+                return
+            except Exception as e:
+                delay = self._retrying(guard, e, attempt)
+                if started or delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _settle_batch(self, guard: ProviderGuard, pending: List[int], outcomes: List[Any],
+                      results: List[Any], attempt: int) -> Tuple[List[int], Optional[float]]:
+        """Store a batch round's outcomes; return the items to retry and the delay before retrying."""
+        retry, delay = [], None
+        for idx, outcome in zip(pending, outcomes):
+            results[idx] = outcome
+            if not isinstance(outcome, Exception):
+                guard.breaker.record_success()
+                continue
+            guard.record_failure(outcome)
+            item_delay = guard.retry_delay(outcome, attempt)
+            if item_delay is not None:
+                retry.append(idx)
+                delay = max(delay or 0.0, item_delay)
+        if retry:
+            logging.warning(f"{guard.provider_name}: retrying {len(retry)} of {len(pending)} batch "
+                            f"items in {delay:.1f}s")
+        return retry, delay
+
+    def batch(self, provider_name: str, count: int,
+              run_batch: Callable[[List[int]], List[Any]]) -> List[Any]:
+        """
+        Run `count` requests as batches under the provider's policies.
+        run_batch(indices) sends the requests at those indices and returns a
+        response or exception per index. Items failing with a retryable error
+        are sent again together after a backoff; the others keep their
+        exception in the returned list.
+        """
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        results: List[Any] = [None] * count
+        pending = list(range(count))
+        attempt = 0
+        while pending:
+            try:
+                guard.breaker.check(provider_name)
+            except CircuitOpenError as e:
+                for idx in pending:
+                    results[idx] = e
+                break
+            for _ in pending:
+                guard.bucket.acquire()
+            pending, delay = self._settle_batch(guard, pending, run_batch(pending), results, attempt)
+            if pending:
+                time.sleep(delay)
+            attempt += 1
+        return results
+
+    async def abatch(self, provider_name: str, count: int,
+                     run_batch: Callable[[List[int]], Any]) -> List[Any]:
+        """Async counterpart of batch(); run_batch(indices) returns a coroutine."""
+        guard = self.guard(provider_name)
+        guard.refresh_policy()
+        results: List[Any] = [None] * count
+        pending = list(range(count))
+        attempt = 0
+        while pending:
+            try:
+                guard.breaker.check(provider_name)
+            except CircuitOpenError as e:
+                for idx in pending:
+                    results[idx] = e
+                break
+            for _ in pending:
+                await guard.bucket.aacquire()
+            pending, delay = self._settle_batch(guard, pending, await run_batch(pending), results, attempt)
+            if pending:
+                await asyncio.sleep(delay)
+            attempt += 1
+        return results
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state and consecutive failures per provider."""
+        with self._lock:
+            guards = list(self._guards.values())
+        return {g.provider_name: {"circuit": g.breaker.state, "failures": g.breaker.failures}
+                for g in guards}
+
+
+WWMiddleware = LLMMiddleware()
+
+
+def hedged_stream(primary: Callable[[], Iterator[str]], secondary: Callable[[], Iterator[str]],
+                  after_seconds: float) -> Iterator[str]:
+    """
+    Stream from primary(); if it has not produced a chunk after
+    `after_seconds` (or fails before its first chunk), also start secondary()
+    and keep whichever produces a chunk first. The other one is abandoned.
+    """
+    events: "queue.Queue" = queue.Queue()
+    stops = [threading.Event(), threading.Event()]
+
+    def pump(index: int, open_stream):
+        try:
+            for chunk in open_stream():
+                if stops[index].is_set():
+                    return
+                events.put((index, "chunk", chunk))
+            events.put((index, "done", None))
+        except Exception as e:
+            events.put((index, "error", e))
+
+    def start(index: int, open_stream):
+        threading.Thread(target=pump, args=(index, open_stream),
+                         name=f"llm-hedge-{index}", daemon=True).start()
+
+    start(0, primary)
+    started, winner, errors = 1, None, {}
+    deadline = time.monotonic() + after_seconds
+    try:
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if winner is None and started == 1 else None
+            try:
+                index, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                logging.info("Primary provider is slow; hedging with the secondary provider")
+                start(1, secondary)
+                started = 2
+                continue
+            if winner is not None and index != winner:
+                continue
+            if kind == "error":
+                if winner == index:
+                    raise value
+                errors[index] = value
+                if started == 1:
+                    logging.info(f"Primary provider failed ({value}); trying the secondary provider")
+                    start(1, secondary)
+                    started = 2
+                elif len(errors) == started:
+                    raise errors[0]
+                continue
+            if winner is None:
+                winner = index
+                stops[1 - index].set()
+            if kind == "done":
+                return
+            yield value
+    finally:
+        for stop in stops:
+            stop.set()
+
+
+def hedged_call(primary: Callable[[], Any], secondary: Callable[[], Any], after_seconds: float) -> Any:
+    """Like hedged_stream() for single responses: the first successful result wins."""
+    stream = hedged_stream(lambda: iter([primary()]), lambda: iter([secondary()]), after_seconds)
+    try:
+        return next(stream)
+    finally:
+        stream.close()
+
+
+async def ahedged_stream(primary: Callable[[], Any], secondary: Callable[[], Any], after_seconds: float):
+    """Async counterpart of hedged_stream(); the losing stream's task is cancelled."""
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def pump(index: int, open_stream):
+        try:
+            async for chunk in open_stream():
+                await events.put((index, "chunk", chunk))
+            await events.put((index, "done", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await events.put((index, "error", e))
+
+    tasks = [asyncio.ensure_future(pump(0, primary))]
+    winner, errors = None, {}
+    deadline = time.monotonic() + after_seconds
+    try:
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if winner is None and len(tasks) == 1 else None
+            try:
+                index, kind, value = await asyncio.wait_for(events.get(), timeout)
+            except asyncio.TimeoutError:
+                logging.info("Primary provider is slow; hedging with the secondary provider")
+                tasks.append(asyncio.ensure_future(pump(1, secondary)))
+                continue
+            if winner is not None and index != winner:
+                continue
+            if kind == "error":
+                if winner == index:
+                    raise value
+                errors[index] = value
+                if len(tasks) == 1:
+                    logging.info(f"Primary provider failed ({value}); trying the secondary provider")
+                    tasks.append(asyncio.ensure_future(pump(1, secondary)))
+                elif len(errors) == len(tasks):
+                    raise errors[0]
+                continue
+            if winner is None:
+                winner = index
+                for i, task in enumerate(tasks):
+                    if i != index:
+                        task.cancel()
+            if kind == "done":
+                return
+            yield value
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def ahedged_call(primary: Callable[[], Any], secondary: Callable[[], Any], after_seconds: float) -> Any:
+    """Async counterpart of hedged_call(); primary/secondary return coroutines."""
+    async def once(make_coro):
+        yield await make_coro()
+
+    stream = ahedged_stream(lambda: once(primary), lambda: once(secondary), after_seconds)
+    try:
+        async for result in stream:
+            return result
+    finally:
+        await stream.aclose()
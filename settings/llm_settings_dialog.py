@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QSpinBox, QPushButton, QGroupBox
 from settings.llm_api_aggregator import WWApiAggregator
+from settings.model_catalog import WWModelCatalog
 
 class LLMSettingsDialog(QDialog):
     """A reusable modal dialog for selecting LLM provider overrides."""
@@ -30,6 +31,7 @@ class LLMSettingsDialog(QDialog):
         if default_model:
             self.model_combo.setCurrentText(default_model)
         form_layout.addRow("Model:", self.model_combo)
+        WWModelCatalog.models_updated.connect(self.on_models_updated)
 
         # Tokens and Timeout row
         tokens_timeout_layout = QVBoxLayout()
@@ -77,6 +79,13 @@ class LLMSettingsDialog(QDialog):
         else:
             self.model_combo.addItem("Default Model")
 
+    def on_models_updated(self, _provider):
+        """Repopulate the model dropdown when a background refresh finishes."""
+        current_model = self.model_combo.currentText()
+        self.update_model_combo(self.provider_combo.currentText())
+        if current_model:
+            self.model_combo.setCurrentText(current_model)
+
     def get_settings(self):
         """Return the selected settings as a dictionary."""
         return {
@@ -1,11 +1,18 @@
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import pyqtSignal
+from .async_llm import AsyncLLMRequest
 from .llm_api_aggregator import WWApiAggregator
 
+import asyncio
 import logging
 
-class LLMWorker(QThread):
-    data_received = pyqtSignal(str)
-    finished = pyqtSignal()
+STOP_TIMEOUT_MS = 2000  # longest stop() blocks the caller (the GUI thread)
+
+class LLMWorker(AsyncLLMRequest):
+    """
+    Streams a prompt on the shared LLM loop (settings.async_llm) instead of a
+    thread of its own. Keeps the QThread-style interface the editors use:
+    start(), stop(), isRunning(), isFinished() and wait(msecs).
+    """
     token_limit_exceeded = pyqtSignal(str)
 
     def __init__(self, prompt, overrides=None, conversation_history=None):
@@ -13,17 +20,22 @@ class LLMWorker(QThread):
         self.prompt = prompt
         self.overrides = overrides
         self.conversation_history = conversation_history
-        self._is_running = True  # Flag to control thread execution
+        self._started = False
         logging.debug(f"LLMWorker created: {id(self)}")
 
-    def run(self):
+    def start(self):
         logging.debug(f"LLMWorker started: {id(self)}")
+        self._started = True
+        self.stream(self.prompt, self.overrides, self.conversation_history)
+
+    async def _stream(self, prompt, overrides, conversation_history):
+        i = 0  # Initialize chunk counter
         try:
-            i = 0  # Initialize chunk counter
-            for i, chunk in enumerate(WWApiAggregator.stream_prompt_to_llm(self.prompt, self.overrides, self.conversation_history), 1):
-                if not self._is_running:  # Check if thread should stop
+            async for chunk in WWApiAggregator.astream_prompt(prompt, overrides, conversation_history):
+                if self.is_cancelled():
                     logging.debug("LLMWorker interrupted")
                     break
+                i += 1
                 if i == 1 and self.is_token_limit_error(chunk):
                     self.token_limit_exceeded.emit(chunk)
                     logging.debug("LLMWorker: Token limit error detected")
@@ -35,6 +47,10 @@ class LLMWorker(QThread):
                 self.data_received.emit(chunk)
             logging.debug(f"LLMWorker: Streaming completed processing {i} chunks")
             self.finished.emit()
+        except asyncio.CancelledError:
+            logging.debug("LLMWorker interrupted")
+            self.finished.emit()
+            raise
         except Exception as e:
             logging.error(f"LLMWorker streaming error: {e}")
             self.data_received.emit(f"Error: {e}")
@@ -42,11 +58,23 @@ class LLMWorker(QThread):
         finally:
             logging.debug(f"LLMWorker finished: {id(self)}")
 
+    def isRunning(self):
+        return self.is_running()
+
+    def isFinished(self):
+        return self._started and not self.is_running()
+
+    def wait(self, msecs=None):
+        """Like QThread.wait: milliseconds, None waits without limit."""
+        return super().wait(None if msecs is None else msecs / 1000)
+
     def stop(self):
         logging.debug(f"LLMWorker stopped: {id(self)}")
         try:
-            self._is_running = False  # Signal the thread to stop
-            self.wait()  # Wait for the thread to finish. Should we self.quit()?
+            self.cancel()
+            # Let the stream unwind (and emit finished) before the caller cleans up, within limits
+            if not self.wait(STOP_TIMEOUT_MS):
+                logging.warning(f"LLMWorker {id(self)} did not stop within {STOP_TIMEOUT_MS} ms")
         except Exception as e:
             logging.error(f"Error in LLMWorker.stop: {e}", exc_info=True)
             raise
@@ -62,4 +90,4 @@ class LLMWorker(QThread):
         error_text = str(response).lower()
         return any(phrase in error_text for phrase in [
             "too many tokens", "exceeds token limit", "max tokens", "context length"
-        ])
\ No newline at end of file
+        ])
@@ -0,0 +1,142 @@
+"""
+Model catalog: provider model lists served from a persisted cache.
+
+Lists are stored in model_cache.json keyed by provider and endpoint, so the
+settings and prompt dialogs can show them immediately. A list older than the
+provider's model_list_ttl is still returned, and a refresh is started on a
+background thread; models_updated is emitted when new data arrives so views
+can repopulate. Only an explicit refresh (do_refresh=True) waits for the
+network.
+"""
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+CATALOG_FILE = "model_cache.json"
+CATALOG_VERSION = 2
+REFRESH_WORKERS = 4
+
+
+class ModelCatalog(QObject):
+    """Persisted, TTL-based cache of provider model details."""
+    models_updated = pyqtSignal(str)  # provider_name of the refreshed list
+
+    def __init__(self, path: str = CATALOG_FILE):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._legacy: Dict[str, List[str]] = {}  # provider name -> model ids from the old format
+        self._refreshing = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CATALOG_VERSION:
+            self._entries = data.get("entries", {})
+            return
+        # Old format: {provider_name: {"timestamp": ..., "models": [ids]}}
+        for provider_name, entry in data.items():
+            if isinstance(entry, dict) and isinstance(entry.get("models"), list):
+                self._legacy[provider_name] = [m for m in entry["models"] if isinstance(m, str)]
+
+    def _save(self):
+        with self._lock:
+            data = {"version": CATALOG_VERSION, "entries": dict(self._entries)}
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logging.error(f"Error saving model catalog: {e}")
+
+    @staticmethod
+    def cache_key(provider) -> str:
+        return f"{provider.provider_name}|{provider.get_base_url()}"
+
+    def _is_stale(self, entry: Dict[str, Any], ttl: float) -> bool:
+        try:
+            fetched = datetime.fromisoformat(entry["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return (datetime.now() - fetched).total_seconds() > ttl
+
+    def _store(self, provider, models: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[self.cache_key(provider)] = {
+                "provider": provider.provider_name,
+                "timestamp": datetime.now().isoformat(),
+                "models": models
+            }
+        self._save()
+        self.models_updated.emit(provider.provider_name)
+
+    def get_model_details(self, provider, do_refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return the provider's model details. Cached lists are returned at once
+        (stale ones are refreshed in the background); with nothing cached an
+        empty list is returned while the first fetch runs. do_refresh fetches
+        synchronously and raises on failure.
+        """
+        if do_refresh:
+            models = provider.fetch_model_details()
+            self._store(provider, models)
+            return models
+
+        with self._lock:
+            entry = self._entries.get(self.cache_key(provider))
+        if entry is not None:
+            if self._is_stale(entry, provider.model_list_ttl):
+                self.refresh_in_background(provider)
+            return entry["models"]
+
+        if provider.model_requires_api_key and not provider.get_api_key():
+            raise ValueError(f"API key required for {provider.provider_name}")
+        self.refresh_in_background(provider)
+        legacy = self._legacy.get(provider.provider_name)
+        return [{"id": model_id, "name": model_id} for model_id in legacy] if legacy else []
+
+    def refresh_in_background(self, provider):
+        """Fetch the provider's model list on a worker thread (once at a time per key)."""
+        key = self.cache_key(provider)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                    thread_name_prefix="model-catalog")
+        self._executor.submit(self._refresh, provider, key)
+
+    def _refresh(self, provider, key: str):
+        try:
+            self._store(provider, provider.fetch_model_details())
+        except Exception as e:
+            logging.warning(f"Could not refresh models for {provider.provider_name}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def refresh_stale(self, providers):
+        """Start background refreshes for every provider whose list is missing or stale."""
+        for provider in providers:
+            with self._lock:
+                entry = self._entries.get(self.cache_key(provider))
+            if entry is None or self._is_stale(entry, provider.model_list_ttl):
+                if provider.model_requires_api_key and not provider.get_api_key():
+                    continue
+                self.refresh_in_background(provider)
+
+
+WWModelCatalog = ModelCatalog(os.path.join(os.getcwd(), CATALOG_FILE))
@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QIntValidator
 
 from .llm_api_aggregator import WWApiAggregator
+from .model_catalog import WWModelCatalog
 from .provider_info_dialog import ProviderInfoDialog
 from .settings_manager import WWSettingsManager
 from .theme_manager import ThemeManager
@@ -40,6 +41,7 @@ class ProviderDialog(QDialog):
         self.provider_combobox = QComboBox()
         self.provider_combobox.addItems(self.providers)
         self.provider_combobox.currentIndexChanged.connect(self.provider_selected)
+        WWModelCatalog.models_updated.connect(self.on_models_updated)
         self.provider_info_button = QPushButton()
         self.provider_info_button.setIcon(ThemeManager.get_tinted_icon("assets/icons/info.svg"))
         self.provider_info_button.setToolTip(_("Provider Information"))
@@ -166,6 +168,18 @@ class ProviderDialog(QDialog):
         provider_name = self.provider_combobox.currentText()
         self.populate_model_combobox(provider_name, True)
 
+    def on_models_updated(self, provider_name):
+        """Show a model list that finished refreshing in the background."""
+        if provider_name != self.provider_combobox.currentText():
+            return
+        current_model = self.model_combobox.currentText()
+        self.populate_model_combobox(provider_name)
+        index = self.model_combobox.findText(current_model)
+        if index >= 0:
+            self.model_combobox.setCurrentIndex(index)
+        elif current_model:
+            self.model_combobox.setEditText(current_model)
+
     def populate_model_combobox(self, provider_name, refresh=False):
         try:
             models = self.get_models_for_provider(provider_name, refresh)
@@ -10,6 +10,7 @@ import re
 from typing import Dict, List
 
 from .llm_api_aggregator import WWApiAggregator
+from .model_catalog import WWModelCatalog
 from .settings_manager import WWSettingsManager
 from .theme_manager import ThemeManager
 
@@ -34,6 +35,7 @@ class ProviderInfoDialog(QDialog):
         self.provider_tree = QTreeWidget()
         self.provider_tree.setHeaderLabels([_("Provider")])
         self.provider_tree.itemSelectionChanged.connect(self.provider_selected)
+        WWModelCatalog.models_updated.connect(self.on_models_updated)
         self.splitter.addWidget(self.provider_tree)
 
         right_widget = QWidget()
@@ -199,6 +201,11 @@ class ProviderInfoDialog(QDialog):
             self.current_group = selected_item.text(0)
             self.update_ui()
 
+    def on_models_updated(self, provider_name):
+        # A background refresh finished for the provider being shown
+        if provider_name == self.current_provider:
+            self.update_ui()
+
     def filter_changed(self):
         self.update_ui()
 
@@ -0,0 +1,155 @@
+"""
+Opt-in, content-addressed cache of LLM responses.
+
+A response is stored under the sha256 of (provider, model, temperature,
+max_tokens, full message list) in an SQLite file, together with the chunks it
+was streamed in, so a cached stream can be replayed chunk by chunk. Entries
+expire after a TTL and the least recently used ones are evicted once the file
+holds more than the configured size.
+
+The cache is off by default; it is enabled with the "general" settings
+response_cache_enabled, response_cache_ttl_hours and response_cache_max_mb.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settings_manager import WWSettingsManager
+
+DEFAULT_CACHE_FILE = "llm_response_cache.sqlite3"
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_MAX_MB = 64
+
+
+def cache_enabled() -> bool:
+    return bool(WWSettingsManager.get_setting("general", "response_cache_enabled", False))
+
+
+def make_key(provider_name: str, model: str, temperature: Any, max_tokens: Any,
+             final_prompt: str, conversation_history: Optional[List[Dict[str, str]]]) -> str:
+    """Hash everything that determines a response into a cache key."""
+    messages = [{"role": m.get("role", "").lower(), "content": m.get("content", "")}
+                for m in (conversation_history or [])]
+    messages.append({"role": "user", "content": final_prompt})
+    payload = json.dumps([provider_name, model, temperature, max_tokens, messages],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttl_hours: float = DEFAULT_TTL_HOURS,
+                 max_mb: float = DEFAULT_MAX_MB):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " chunks TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        """Return (response, chunks) for a key, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, chunks, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl > 0 and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, response: str, chunks: Optional[List[str]] = None):
+        """Store a response (and the chunks it was streamed in), then evict if needed."""
+        chunks = chunks if chunks else [response]
+        chunks_json = json.dumps(chunks, ensure_ascii=False)
+        size = len(response.encode("utf-8")) + len(chunks_json.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, chunks, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, chunks_json, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl > 0:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared cache, or None while caching is disabled in the settings."""
+    global _cache
+    if not cache_enabled():
+        return None
+    ttl_hours = float(WWSettingsManager.get_setting("general", "response_cache_ttl_hours", DEFAULT_TTL_HOURS))
+    max_mb = float(WWSettingsManager.get_setting("general", "response_cache_max_mb", DEFAULT_MAX_MB))
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache(os.path.join(os.getcwd(), DEFAULT_CACHE_FILE), ttl_hours, max_mb)
+            except sqlite3.Error as e:
+                logging.error(f"Could not open the LLM response cache: {e}")
+                return None
+        else:
+            # Settings may have changed since the cache was opened
+            _cache.ttl = ttl_hours * 3600
+            _cache.max_bytes = int(max_mb * 1024 * 1024)
+        return _cache
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Compressed history of scene revisions.
+
+A project folder keeps the newest MAX_AUTOSAVES revisions of a scene as plain
+files (see autosave_manager); older revisions are moved into one history file
+per scene instead of being deleted. A history file is a sequence of records,
+each either a zlib-compressed full snapshot or a compressed line diff against
+the previous revision. A snapshot is written every SNAPSHOT_INTERVAL records
+(or whenever a diff would not be smaller), so any revision is rebuilt from one
+snapshot and at most SNAPSHOT_INTERVAL - 1 diffs.
+
+Record layout: an 8-byte header (metadata length, data length; big-endian),
+the metadata as JSON ({"file", "time", "hash", "kind"}) and the zlib data.
+Records are only appended; when a scene has more than MAX_HISTORY revisions
+the oldest are dropped by rewriting the file from a new snapshot.
+"""
+import os
+import re
+import json
+import zlib
+import struct
+import difflib
+import threading
+
+HISTORY_EXTENSION = ".history"
+SNAPSHOT_INTERVAL = 20
+MAX_HISTORY = 500
+_HEADER = struct.Struct(">II")
+
+
+def history_filename(key: str) -> str:
+    """File name of the history of a scene key (a UUID or "scene:<identifier>")."""
+    return re.sub(r"[^\w-]+", "_", key) + HISTORY_EXTENSION
+
+
+def make_delta(base: str, content: str) -> list:
+    """
+    Line diff turning base into content: a list whose items are either
+    [start, end] (copy these lines of base) or a string (insert it).
+    """
+    a = base.splitlines(keepends=True)
+    b = content.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j1 != j2:
+            ops.append("".join(b[j1:j2]))
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    """Rebuild a revision from the previous one and its diff (see make_delta)."""
+    a = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(a[op[0]:op[1]])
+    return "".join(parts)
+
+
+class RevisionStore:
+    """History files of the scenes of one project folder."""
+
+    def __init__(self, project_folder: str):
+        self.folder = project_folder
+        self.lock = threading.RLock()
+        self._index = {}  # key -> [{"file", "time", "hash", "kind", "offset", "length"}], oldest first
+        self._ends = {}   # key -> end of the last complete record
+        self._last = {}   # key -> content of the newest record (base of the next diff)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.folder, history_filename(key))
+
+    def _records(self, key: str) -> list:
+        """Index of a history file, read once (record headers and metadata only)."""
+        records = self._index.get(key)
+        if records is not None:
+            return records
+        records, end = [], 0
+        try:
+            with open(self.path_for(key), "rb") as f:
+                while True:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    meta_length, data_length = _HEADER.unpack(header)
+                    try:
+                        meta = json.loads(f.read(meta_length).decode("utf-8"))
+                    except ValueError:
+                        break
+                    offset = end + _HEADER.size + meta_length
+                    if f.seek(data_length, os.SEEK_CUR) > os.fstat(f.fileno()).st_size:
+                        break  # a torn last record after a crash
+                    records.append(dict(meta, offset=offset, length=data_length))
+                    end = offset + data_length
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print("Error reading scene history:", e)
+        self._index[key] = records
+        self._ends[key] = end
+        return records
+
+    def revisions(self, key: str) -> list:
+        """Metadata of the archived revisions of a scene, oldest first."""
+        with self.lock:
+            return [{"file": rec["file"], "time": rec.get("time"), "hash": rec.get("hash"), "index": i}
+                    for i, rec in enumerate(self._records(key))]
+
+    def load(self, key: str, index: int) -> str:
+        """Content of an archived revision."""
+        with self.lock:
+            records = self._records(key)
+            if not 0 <= index < len(records):
+                raise IndexError(f"No revision {index} in the history of {key}")
+            start = index
+            while records[start]["kind"] != "full":
+                start -= 1
+            content = None
+            with open(self.path_for(key), "rb") as f:
+                for rec in records[start:index + 1]:
+                    f.seek(rec["offset"])
+                    data = zlib.decompress(f.read(rec["length"]))
+                    if rec["kind"] == "full":
+                        content = data.decode("utf-8")
+                    else:
+                        content = apply_delta(content, json.loads(data.decode("utf-8")))
+            return content
+
+    def archive(self, key: str, filename: str, content: str, timestamp: float = None, content_hash: str = None):
+        """Append a revision to the history of a scene (revisions must come oldest first)."""
+        with self.lock:
+            records = self._records(key)
+            kind, data = "full", zlib.compress(content.encode("utf-8"), 9)
+            since_snapshot = 0
+            for rec in reversed(records):
+                if rec["kind"] == "full":
+                    break
+                since_snapshot += 1
+            if records and since_snapshot + 1 < SNAPSHOT_INTERVAL:
+                base = self._last.get(key)
+                if base is None:
+                    base = self.load(key, len(records) - 1)
+                delta = zlib.compress(json.dumps(make_delta(base, content), ensure_ascii=False).encode("utf-8"), 9)
+                if len(delta) < len(data):
+                    kind, data = "delta", delta
+            meta = {"file": filename, "time": timestamp, "hash": content_hash, "kind": kind}
+            encoded_meta = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            end = self._ends[key]
+            with open(self.path_for(key), "ab") as f:
+                if f.tell() != end:
+                    f.truncate(end)  # drop a torn record left by a crash
+                f.write(_HEADER.pack(len(encoded_meta), len(data)) + encoded_meta + data)
+            offset = end + _HEADER.size + len(encoded_meta)
+            records.append(dict(meta, offset=offset, length=len(data)))
+            self._ends[key] = offset + len(data)
+            self._last[key] = content
+            if len(records) > MAX_HISTORY + SNAPSHOT_INTERVAL:
+                self._prune(key)
+
+    def _prune(self, key: str):
+        """Keep the newest MAX_HISTORY revisions; the first kept one becomes a snapshot."""
+        records = self._records(key)
+        first = len(records) - MAX_HISTORY
+        path = self.path_for(key)
+        chunks = []
+        data = zlib.compress(self.load(key, first).encode("utf-8"), 9)
+        with open(path, "rb") as f:
+            for i, rec in enumerate(records[first:]):
+                meta = {name: rec.get(name) for name in ("file", "time", "hash", "kind")}
+                if i == 0:
+                    meta["kind"] = "full"
+                else:
+                    f.seek(rec["offset"])
+                    data = f.read(rec["length"])
+                encoded_meta = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+                chunks.append(_HEADER.pack(len(encoded_meta), len(data)) + encoded_meta + data)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(b"".join(chunks))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print("Error pruning scene history:", e)
+            return
+        self._index.pop(key, None)
+        self._ends.pop(key, None)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_revision_store(project_folder: str) -> RevisionStore:
+    """Return the (shared) revision store of a project folder."""
+    folder = os.path.abspath(project_folder)
+    with _stores_lock:
+        store = _stores.get(folder)
+        if store is None:
+            store = _stores[folder] = RevisionStore(project_folder)
+        return store
@@ -16,6 +16,7 @@ from .theme_manager import ThemeManager
 from .llm_api_aggregator import WWApiAggregator
 from .settings_manager import WWSettingsManager
 from .provider_dialog import ProviderDialog
+from .llm_metrics_dialog import LLMMetricsDialog
 
 class SettingsDialog(QDialog):
     settings_saved = pyqtSignal()
@@ -88,6 +89,14 @@ class SettingsDialog(QDialog):
         self.enable_debug_logging_checkbox.stateChanged.connect(self.mark_unsaved_changes)
         layout.addRow(self.enable_debug_logging_checkbox)
 
+        self.response_cache_checkbox = QCheckBox(_("Cache LLM Responses"))
+        self.response_cache_checkbox.stateChanged.connect(self.mark_unsaved_changes)
+        layout.addRow(self.response_cache_checkbox)
+
+        self.record_prompts_checkbox = QCheckBox(_("Record LLM Prompts for Replay"))
+        self.record_prompts_checkbox.stateChanged.connect(self.mark_unsaved_changes)
+        layout.addRow(self.record_prompts_checkbox)
+
         self.language_combobox = QComboBox()
         self.language_combobox.setMinimumWidth(80)
         self.language_combobox.addItems(LANGUAGES)
@@ -157,6 +166,10 @@ class SettingsDialog(QDialog):
         buttons_layout.addWidget(self.new_provider_button)
         buttons_layout.addWidget(self.edit_provider_button)
         buttons_layout.addWidget(self.delete_provider_button)
+        self.metrics_button = QPushButton(_("Statistics"))
+        self.metrics_button.setToolTip(_("Latency and throughput of recent LLM requests"))
+        self.metrics_button.clicked.connect(self.show_llm_metrics)
+        buttons_layout.addWidget(self.metrics_button)
         providers_layout.addLayout(buttons_layout)
         
         self.providers_group.setLayout(providers_layout)
@@ -277,6 +290,9 @@ class SettingsDialog(QDialog):
         self.background_color_label.setText(color_code)
         self.background_color_label.update()
 
+    def show_llm_metrics(self):
+        LLMMetricsDialog(self).exec_()
+
     def delete_provider(self):
         """Deletes the currently selected provider."""
         if not self.providers_list.currentItem():
@@ -334,6 +350,8 @@ class SettingsDialog(QDialog):
         self.enable_autosave_checkbox.setText(_("Enable Auto-Save"))
         self.show_quote_checkbox.setText(_("Show Random Quotes"))
         self.enable_debug_logging_checkbox.setText(_("Enable Debug Logging"))
+        self.response_cache_checkbox.setText(_("Cache LLM Responses"))
+        self.record_prompts_checkbox.setText(_("Record LLM Prompts for Replay"))
         self.language_label.setText(_("Language"))
         self.theme_label.setText(_("Theme"))
         self.background_color_button.setText(_("Background Color"))
@@ -346,6 +364,7 @@ class SettingsDialog(QDialog):
         self.new_provider_button.setText(_("New Provider"))
         self.edit_provider_button.setText(_("Edit"))
         self.delete_provider_button.setText(_("Delete"))
+        self.metrics_button.setText(_("Statistics"))
         
         if hasattr(self, 'provider_dialog') and self.provider_dialog.isVisible():
             self.provider_dialog.update_labels()
@@ -357,6 +376,8 @@ class SettingsDialog(QDialog):
         self.fast_tts_checkbox.setChecked(self.general_settings["fast_tts"])
         self.enable_autosave_checkbox.setChecked(self.general_settings["enable_autosave"])
         self.enable_debug_logging_checkbox.setChecked(self.general_settings.get("enable_debug_logging", False))
+        self.response_cache_checkbox.setChecked(self.general_settings.get("response_cache_enabled", False))
+        self.record_prompts_checkbox.setChecked(self.general_settings.get("record_llm_prompts", False))
         index = self.language_combobox.findText(self.general_settings["language"])
         if index >= 0:
             self.language_combobox.setCurrentIndex(index)
@@ -377,6 +398,8 @@ class SettingsDialog(QDialog):
         self.general_settings["enable_autosave"] = self.enable_autosave_checkbox.isChecked()
         self.general_settings["show_random_quote"] = self.show_quote_checkbox.isChecked()
         self.general_settings["enable_debug_logging"] = self.enable_debug_logging_checkbox.isChecked()
+        self.general_settings["response_cache_enabled"] = self.response_cache_checkbox.isChecked()
+        self.general_settings["record_llm_prompts"] = self.record_prompts_checkbox.isChecked()
         self.general_settings["language"] = self.language_combobox.currentText()
         self.appearance_settings["theme"] = self.theme_combobox.currentText()
         self.appearance_settings["text_size"] = self.text_size_spinbox.value()
@@ -59,7 +59,18 @@ class SettingsManager:
                 "timeout": 30
             }
         },
-        "active_llm_config": "OpenAI"
+        "active_llm_config": "OpenAI",
+        "llm_policies": {
+            "max_retries": 3,
+            "backoff_base": 1.0,
+            "backoff_cap": 30.0,
+            "requests_per_minute": 0,
+            "burst": 4,
+            "circuit_failure_threshold": 5,
+            "circuit_reset_seconds": 60,
+            "hedge_provider": "",
+            "hedge_after_seconds": 0
+        }
     }
 
     def __init__(self, file_path: Union[str, Path] = "settings.json"):
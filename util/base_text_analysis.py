@@ -10,6 +10,15 @@ import spacy
 from collections import Counter, defaultdict
 import re
 
+# Pipeline components whose annotations the detectors read (sentences, POS,
+# lemmas, dependencies, morphology, entities); anything else in a model is
+# disabled while analyzing.
+ANALYSIS_PIPES = {
+    "tok2vec", "transformer", "tagger", "morphologizer", "attribute_ruler", "lemmatizer",
+    "trainable_lemmatizer", "parser", "senter", "sentencizer", "ner", "entity_ruler"
+}
+ANALYSIS_BATCH_SIZE = 16  # scenes per nlp.pipe batch
+
 class BaseTextAnalysis:
     def __init__(self, model_name, language_data):
         self.model_name = model_name
@@ -26,9 +35,10 @@ class BaseTextAnalysis:
         except OSError:
             return False
 
-    def analyze_text(self, text, target_grade):
+    def analyze_text(self, text, target_grade, doc=None):
         """Analyzes the text at the sentence level. This method can be overridden by language-specific subclasses."""
-        doc = self.nlp(text)
+        if doc is None:
+            doc = self.nlp(text)
         annotated_sentences = []
         for sent in doc.sents:
             sent_text = sent.text.strip()
@@ -81,9 +91,10 @@ class BaseTextAnalysis:
         spans.sort(key=lambda span: span[0])
         return spans
 
-    def detect_nonstandard_speech_verbs(self, text):
+    def detect_nonstandard_speech_verbs(self, text, doc=None):
         """Detects non-standard speech verbs."""
-        doc = self.nlp(text)
+        if doc is None:
+            doc = self.nlp(text)
         standard_verbs = self.language_data.get("standard_speech_verbs", {"say", "ask"})
         speech_verbs = self.language_data.get("speech_verbs", {"say", "ask"})
         spans = []
@@ -206,17 +217,18 @@ class BaseTextAnalysis:
                     results.append((start, end, starter))
         return results
 
-    def comprehensive_analysis(self, text, target_grade=8):
-        """Performs a comprehensive analysis of the text."""
+    def comprehensive_analysis(self, text, target_grade=8, doc=None):
+        """Performs a comprehensive analysis of the text (parsed once; doc may be given pre-parsed)."""
         if not self.nlp:
             raise RuntimeError(f"spaCy model for {self.model_name} has not been loaded.")
-        doc = self.nlp(text)
-        sentence_analysis = self.analyze_text(text, target_grade)
+        if doc is None:
+            doc = self.nlp(text, disable=self.unused_pipes())
+        sentence_analysis = self.analyze_text(text, target_grade, doc)
         results = {
             "sentence_analysis": sentence_analysis,
             "weak_formulations": [],
             "passive_voice": [],
-            "nonstandard_speech": self.detect_nonstandard_speech_verbs(text),
+            "nonstandard_speech": self.detect_nonstandard_speech_verbs(text, doc),
             "filter_words": [],
             "telling_not_showing": [],
             "weak_verbs": [],
@@ -247,3 +259,21 @@ class BaseTextAnalysis:
                 results["weak_verbs"].append((sent_start + start, sent_start + end, construction, verb_type))
         
         return results
+
+    def unused_pipes(self):
+        """Components of the loaded model that no detector needs."""
+        return [name for name in self.nlp.pipe_names if name not in ANALYSIS_PIPES]
+
+    def analyze_many(self, texts, target_grade=8, n_process=1, batch_size=ANALYSIS_BATCH_SIZE):
+        """
+        Performs a comprehensive analysis of many texts, yielding one result per
+        text in order. The texts are parsed in batches with nlp.pipe in this
+        process. spaCy starts n_process > 1 workers with the default start
+        method (fork on Linux), so only pass it outside the GUI process.
+        """
+        if not self.nlp:
+            raise RuntimeError(f"spaCy model for {self.model_name} has not been loaded.")
+        texts = list(texts)
+        docs = self.nlp.pipe(texts, n_process=n_process, batch_size=batch_size, disable=self.unused_pipes())
+        for text, doc in zip(texts, docs):
+            yield self.comprehensive_analysis(text, target_grade, doc)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+html_text.py
+
+Plain text of scene HTML without a GUI: no QTextEdit/QTextDocument and no
+QApplication, so it can be used from worker threads and processes.
+
+The HTML is parsed as a stream of start/end/data events, with lxml's parser
+when lxml is installed and the standard library's html.parser otherwise, and
+the text is built the way QTextEdit.toPlainText() lays it out: one line per
+block (paragraph, heading, list item, ...) and per <br>, whitespace collapsed
+outside <pre>, head/style/script skipped.
+
+Scene files are written once per revision, so the text of a file is cached by
+path and validated with its mtime and size (scene_file_text).
+
+Benchmark against BeautifulSoup and QTextEdit:
+    python -m util.html_text --paragraphs 2000 --repeat 5
+    python -m util.html_text Projects/MyProject/*.html
+"""
+
+import os
+import re
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # optional, html.parser is used instead
+    etree = None
+
+from settings.autosave_manager import read_scene_file
+
+BLOCK_TAGS = {
+    "p", "div", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6",
+    "tr", "table", "blockquote", "pre", "hr", "body", "center", "address"
+}
+SKIP_TAGS = {"head", "title", "style", "script"}
+TEXT_CACHE_SIZE = 512  # scene files whose text is kept
+_WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+
+
+class _TextBuilder:
+    """
+    Receives parser events (the lxml parser target interface) and lays the
+    text out in lines.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.current = []    # text of the line being built
+        self.in_block = False  # a block started whose line is not yet ended
+        self.skip = 0
+        self.pre = 0
+
+    def _end_line(self):
+        self.lines.append("".join(self.current).rstrip(" "))
+        self.current = []
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == "br":
+            self._end_line()
+            self.in_block = False
+        elif tag in BLOCK_TAGS:
+            if self.current:
+                self._end_line()
+            self.in_block = True
+            if tag == "pre":
+                self.pre += 1
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in BLOCK_TAGS:
+            if tag == "pre":
+                self.pre = max(0, self.pre - 1)
+            if self.in_block or self.current:
+                self._end_line()
+            self.in_block = False
+
+    def data(self, text):
+        if self.skip or not text:
+            return
+        if self.pre:
+            lines = text.split("\n")
+            self.current.append(lines[0])
+            for line in lines[1:]:
+                self._end_line()
+                self.current.append(line)
+            return
+        text = _WHITESPACE.sub(" ", text)
+        if text.startswith(" ") and (not self.current or self.current[-1].endswith(" ")):
+            text = text[1:]  # leading whitespace of a line, or a run across tags
+        if text:
+            self.current.append(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        if self.current:
+            self._end_line()
+        return "\n".join(self.lines).replace("\xa0", " ")
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds html.parser events to a _TextBuilder."""
+
+    def __init__(self, builder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.builder.start(tag)
+        if tag.lower() != "br":
+            self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+
+def _parse_stdlib(html: str) -> str:
+    builder = _TextBuilder()
+    parser = _StdlibParser(builder)
+    parser.feed(html)
+    parser.close()
+    return builder.close()
+
+
+def _parse_lxml(html: str) -> str:
+    parser = etree.HTMLParser(target=_TextBuilder(), remove_comments=True)
+    parser.feed(html)
+    return parser.close()
+
+
+def html_to_text(html: str, parser: str = None) -> str:
+    """
+    Plain text of HTML content (a scene, a summary); content that is not HTML
+    (legacy plain-text scenes) is returned unchanged.
+
+    Args:
+        html (str): The HTML, optionally starting with the UUID comment line of a scene file.
+        parser (str, optional): "lxml" or "stdlib"; by default lxml if it is installed.
+    """
+    if not html:
+        return ""
+    if html.startswith("<!-- UUID:"):
+        html = html.split("\n", 1)[1] if "\n" in html else ""
+    if not html.lstrip().startswith("<"):
+        return html
+    if parser is None:
+        parser = "lxml" if etree is not None else "stdlib"
+    if parser == "lxml":
+        try:
+            return _parse_lxml(html)
+        except Exception as e:
+            print(f"lxml could not parse the HTML, using html.parser: {e}")
+    return _parse_stdlib(html)
+
+
+_text_cache = OrderedDict()  # absolute path -> ((mtime, size), text)
+_text_cache_lock = threading.Lock()
+
+
+def scene_file_text(path: str) -> str:
+    """
+    Plain text of a scene file, cached by path; the cached text is used as
+    long as the file's mtime and size are unchanged.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _text_cache_lock:
+        cached = _text_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            _text_cache.move_to_end(path)
+            return cached[1]
+    text = html_to_text(read_scene_file(path))
+    with _text_cache_lock:
+        _text_cache[path] = (signature, text)
+        _text_cache.move_to_end(path)
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    return text
+
+
+def clear_text_cache():
+    with _text_cache_lock:
+        _text_cache.clear()
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+def _sample_scene(paragraphs: int) -> str:
+    """HTML in the shape QTextEdit.toHtml() writes scenes."""
+    body = []
+    for i in range(paragraphs):
+        if i % 10 == 9:
+            body.append('<p style="-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px;"><br /></p>')
+        body.append(
+            '<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; '
+            '-qt-block-indent:0; text-indent:0px;">'
+            f'Paragraph {i}: &quot;Where now?&quot; she asked. The <span style=" font-weight:600;">road</span> '
+            'ran on through the <span style=" font-style:italic;">hills</span> &amp; the river, '
+            'and the light was failing.</p>'
+        )
+    return (
+        '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+        '<html><head><meta name="qrichtext" content="1" /><style type="text/css">\n'
+        'p, li { white-space: pre-wrap; }\n</style></head>'
+        '<body style=" font-family:\'Sans Serif\'; font-size:10pt;">\n' + "\n".join(body) + "</body></html>"
+    )
+
+
+def _time(function, documents, repeat):
+    """Best time of repeat runs over all documents, and the output of the last run."""
+    best, output = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = [function(document) for document in documents]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def benchmark(documents, repeat=3, paths=None):
+    """Time the extraction methods on documents; returns [(name, seconds, texts)]."""
+    methods = [("html.parser (stdlib)", lambda html: html_to_text(html, "stdlib"))]
+    if etree is not None:
+        methods.append(("lxml", lambda html: html_to_text(html, "lxml")))
+    try:
+        from bs4 import BeautifulSoup
+        methods.append(("BeautifulSoup html.parser", lambda html: BeautifulSoup(html, "html.parser").get_text()))
+    except ImportError:
+        print("BeautifulSoup is not installed, skipped")
+    try:
+        from PyQt5.QtWidgets import QApplication, QTextEdit
+        benchmark._app = QApplication.instance() or QApplication(["html_text"])  # kept alive for QTextEdit
+
+        def with_text_edit(html):
+            editor = QTextEdit()
+            editor.setHtml(html)
+            return editor.toPlainText()
+        methods.append(("QTextEdit", with_text_edit))
+    except ImportError:
+        print("PyQt5 is not installed, QTextEdit skipped")
+    results = []
+    for name, function in methods:
+        seconds, texts = _time(function, documents, repeat)
+        results.append((name, seconds, texts))
+    if paths:
+        clear_text_cache()
+        for path in paths:
+            scene_file_text(path)
+        seconds, texts = _time(scene_file_text, paths, repeat)
+        results.append(("scene_file_text (cached)", seconds, texts))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-text extraction of scenes")
+    parser.add_argument("files", nargs="*", help="scene files (default: a generated scene)")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="paragraphs of the generated scene")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method (the best is reported)")
+    args = parser.parse_args()
+
+    if args.files:
+        documents = [read_scene_file(path) for path in args.files]
+    else:
+        documents = [_sample_scene(args.paragraphs)]
+    size = sum(len(document) for document in documents)
+    print(f"{len(documents)} document(s), {size / 1024:.0f} KiB of HTML")
+    results = benchmark(documents, args.repeat, args.files)
+    reference = next((texts for name, _, texts in results if name == "QTextEdit"), None)
+    for name, seconds, texts in results:
+        line = f"{name:28} {seconds * 1000:9.1f} ms  {size / 1024 / 1024 / seconds:8.1f} MiB/s"
+        if reference is not None and name != "QTextEdit":
+            same = sum(text.split() == ref.split() for text, ref in zip(texts, reference))
+            line += f"  same words as QTextEdit: {same}/{len(documents)}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+"""
+llm_benchmark.py
+
+End-to-end benchmarks of the LLM generation path against the local mock
+server (util.mock_llm_server) or a configured provider. Each suite drives one
+entry point the application uses:
+- send:    WWApiAggregator.send_prompt_to_llm from a thread pool
+- stream:  WWApiAggregator.stream_prompt_to_llm from a thread pool
+- worker:  LLMWorker, one at a time, with chunks delivered to the main thread
+- chunks:  the PDF chunk pipeline (chunk_markdown + ChunkDispatcher)
+- summary: SummaryService, the summary generation of the project window
+
+and reports throughput and latency percentiles. The mock provider is only
+registered in memory for the run, and the response cache is switched off so
+every request reaches the server.
+
+Run:
+    python -m util.llm_benchmark --requests 20 --concurrency 4
+    python -m util.llm_benchmark --provider "My LMStudio" --suites send,stream
+"""
+
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QCoreApplication
+
+from settings.llm_api_aggregator import WWApiAggregator
+from settings.llm_metrics import percentile
+from settings.settings_manager import WWSettingsManager
+from util import tokenizer
+from util.mock_llm_server import MOCK_MODEL, MockLLMServer, add_mock_arguments, config_from_args
+
+MOCK_PROVIDER_NAME = "Benchmark (mock)"
+SUITES = ("send", "stream", "worker", "chunks", "summary")
+# "general" settings switched off while benchmarking
+BENCHMARK_DISABLED_SETTINGS = ("response_cache_enabled", "record_llm_prompts")
+PERCENTILES = (50, 90, 99)
+BENCHMARK_PROMPT = "Write a short paragraph about a lighthouse keeper."
+SUMMARY_PROMPT = {"text": "Summarize the following chapter in a few sentences.", "max_tokens": 500,
+                  "temperature": 0.7}
+CHUNK_PROMPT = "Extract the key facts from this section of a document."
+
+
+def count_tokens(text: str) -> Optional[int]:
+    try:
+        return tokenizer.count_tokens(text, tokenizer.DEFAULT_ENCODING)
+    except Exception:  # the encoding may be unavailable offline
+        return None
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of one suite; latencies and ttfts are in seconds."""
+    name: str
+    wall_time: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    ttfts: List[float] = field(default_factory=list)
+    completion_tokens: int = 0
+    failures: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.failures
+
+    def record(self, latency: float, response: str = "", ttft: Optional[float] = None):
+        self.latencies.append(latency)
+        if ttft is not None:
+            self.ttfts.append(ttft)
+        self.completion_tokens += count_tokens(response) or 0
+
+    def fail(self, error):
+        self.failures += 1
+        label = error if isinstance(error, str) else type(error).__name__
+        self.errors[label] = self.errors.get(label, 0) + 1
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        wall = max(self.wall_time, 1e-9)
+        row: Dict[str, Optional[float]] = {
+            "requests": self.requests,
+            "failures": self.failures,
+            "wall_time": self.wall_time,
+            "requests_per_second": len(self.latencies) / wall,
+            "tokens_per_second": self.completion_tokens / wall,
+        }
+        for pct in PERCENTILES:
+            row[f"latency_p{pct}"] = percentile(self.latencies, pct)
+            row[f"ttft_p{pct}"] = percentile(self.ttfts, pct)
+        return row
+
+
+def format_report(results: List[BenchmarkResult]) -> str:
+    """Plain-text table of the suite summaries."""
+    columns = [("suite", "{}"), ("requests", "{}"), ("failures", "{}"), ("wall_time", "{:.2f}"),
+               ("requests_per_second", "{:.2f}"), ("tokens_per_second", "{:.1f}")]
+    columns += [(f"latency_p{pct}", "{:.3f}") for pct in PERCENTILES]
+    columns += [(f"ttft_p{pct}", "{:.3f}") for pct in PERCENTILES]
+    headers = [name.replace("_per_second", "/s").replace("_", " ") for name, _fmt in columns]
+    rows = []
+    for result in results:
+        summary = dict(result.summary(), suite=result.name)
+        rows.append([fmt.format(summary[name]) if summary[name] is not None else "-"
+                     for name, fmt in columns])
+    widths = [max(len(h), *(len(r[i]) for r in rows)) if rows else len(h) for i, h in enumerate(headers)]
+    lines = ["  ".join(h.rjust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(row, widths)) for row in rows]
+    for result in results:
+        for error, count in sorted(result.errors.items()):
+            lines.append(f"{result.name}: {count} x {error}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def benchmark_provider(endpoint: Optional[str] = None, provider_name: Optional[str] = None):
+    """
+    Make provider_name (or an in-memory "Custom" provider pointing at endpoint)
+    the active LLM for the duration of the block, with the response cache and
+    prompt recording off (a replay of llm_prompts.jsonl must not append to it,
+    and benchmark traffic is not real traffic). Nothing is written to settings.json.
+    """
+    settings = WWSettingsManager.settings
+    general = settings.setdefault("general", {})
+    saved_active = settings.get("active_llm_config")
+    saved_general = {key: general.get(key) for key in BENCHMARK_DISABLED_SETTINGS}
+    name = provider_name or MOCK_PROVIDER_NAME
+    if provider_name is None:
+        settings.setdefault("llm_configs", {})[MOCK_PROVIDER_NAME] = {
+            "provider": "Custom",
+            "endpoint": endpoint,
+            "model": MOCK_MODEL,
+            "api_key": "not-needed",
+            "timeout": 60,
+            "max_tokens": 2000,
+        }
+    settings["active_llm_config"] = name
+    for key in BENCHMARK_DISABLED_SETTINGS:
+        general[key] = False
+    try:
+        yield name
+    finally:
+        settings["active_llm_config"] = saved_active
+        for key, value in saved_general.items():
+            if value is None:
+                general.pop(key, None)
+            else:
+                general[key] = value
+        if provider_name is None:
+            settings.get("llm_configs", {}).pop(MOCK_PROVIDER_NAME, None)
+            WWApiAggregator.aggregator._provider_cache.pop(MOCK_PROVIDER_NAME, None)
+
+
+def _wait_for(app: QCoreApplication, done: Callable[[], bool], timeout: float):
+    """Run the Qt event loop until done() is true, so queued signals are delivered."""
+    deadline = time.monotonic() + timeout
+    while not done():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Benchmark step timed out")
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+
+
+def bench_send(provider_name: str, prompts: List[str], concurrency: int) -> BenchmarkResult:
+    result = BenchmarkResult("send")
+    lock = threading.Lock()
+
+    def run(prompt: str):
+        started = time.monotonic()
+        try:
+            response = WWApiAggregator.send_prompt_to_llm(prompt, overrides={"provider": provider_name})
+        except Exception as e:
+            with lock:
+                result.fail(e)
+            return
+        with lock:
+            result.record(time.monotonic() - started, response)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, prompts))
+    result.wall_time = time.monotonic() - started
+    return result
+
+
+def bench_stream(provider_name: str, prompts: List[str], concurrency: int) -> BenchmarkResult:
+    result = BenchmarkResult("stream")
+    lock = threading.Lock()
+
+    def run(prompt: str):
+        started = time.monotonic()
+        ttft = None
+        chunks = []
+        try:
+            for chunk in WWApiAggregator.stream_prompt_to_llm(prompt, overrides={"provider": provider_name}):
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                chunks.append(chunk)
+        except Exception as e:
+            with lock:
+                result.fail(e)
+            return
+        with lock:
+            result.record(time.monotonic() - started, "".join(chunks), ttft)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, prompts))
+    result.wall_time = time.monotonic() - started
+    return result
+
+
+def bench_worker(app: QCoreApplication, provider_name: str, prompts: List[str],
+                 timeout: float) -> BenchmarkResult:
+    """LLMWorker as the editors use it: one stream at a time, chunks received on the main thread."""
+    from settings.llm_worker import LLMWorker
+
+    result = BenchmarkResult("worker")
+    started = time.monotonic()
+    for prompt in prompts:
+        chunks = []
+        first_chunk_at = []
+        request_started = time.monotonic()
+
+        def on_data(text, chunks=chunks, first_chunk_at=first_chunk_at):
+            if not first_chunk_at:
+                first_chunk_at.append(time.monotonic())
+            chunks.append(text)
+
+        worker = LLMWorker(prompt, {"provider": provider_name})
+        worker.data_received.connect(on_data)
+        worker.start()
+        _wait_for(app, worker.isFinished, timeout)
+        latency = time.monotonic() - request_started
+        if chunks and chunks[-1].startswith("Error:"):
+            result.fail(chunks[-1][:80])
+        else:
+            ttft = first_chunk_at[0] - request_started if first_chunk_at else None
+            result.record(latency, "".join(chunks), ttft)
+        worker.deleteLater()
+    result.wall_time = time.monotonic() - started
+    return result
+
+
+def _benchmark_document(paragraphs: int) -> str:
+    words = "The keeper climbed the stairs at dusk and lit the lamp before the storm arrived".split()
+    sections = []
+    for i in range(paragraphs):
+        if i % 5 == 0:
+            sections.append(f"## Section {i // 5 + 1}")
+        sections.append(" ".join(words[(i + j) % len(words)] for j in range(60)) + ".")
+    return "\n\n".join(sections)
+
+
+def bench_chunks(app: QCoreApplication, chunk_count: int, concurrency: int, chunk_tokens: int,
+                 timeout: float) -> BenchmarkResult:
+    """
+    The PDF pipeline: a synthetic document is split with chunk_markdown and
+    sent through ChunkDispatcher. Latency is the time from dispatch start to
+    the in-order delivery of each chunk.
+    """
+    from workshop.chunker import chunk_markdown
+    from workshop.chunk_dispatcher import ChunkDispatcher
+
+    result = BenchmarkResult("chunks")
+    chunks = []
+    paragraphs = chunk_count
+    while len(chunks) < chunk_count:
+        chunks = chunk_markdown(_benchmark_document(paragraphs), chunk_tokens)
+        paragraphs *= 2
+    jobs = [(CHUNK_PROMPT, chunk.text) for chunk in chunks[:chunk_count]]
+
+    started = time.monotonic()
+
+    def on_result(idx, response, error):
+        if error:
+            result.fail(error[:80])
+        else:
+            result.record(time.monotonic() - started, response)
+
+    dispatcher = ChunkDispatcher(jobs, max_concurrency=concurrency,
+                                 count_tokens=lambda text: count_tokens(text) or len(text.split()))
+    dispatcher.result_ready.connect(on_result)
+    dispatcher.start()
+    _wait_for(app, dispatcher.isFinished, timeout)
+    result.wall_time = time.monotonic() - started
+    dispatcher.deleteLater()
+    return result
+
+
+def bench_summary(app: QCoreApplication, provider_name: str, contents: List[str],
+                  timeout: float) -> BenchmarkResult:
+    """Summary generation through SummaryService with the project window's prompt format."""
+    from project_window.summary_service import SummaryService
+
+    result = BenchmarkResult("summary")
+    service = SummaryService()
+    prompt = dict(SUMMARY_PROMPT, provider=provider_name)
+    started = time.monotonic()
+    for content in contents:
+        chunks = []
+        first_chunk_at = []
+        request_started = time.monotonic()
+
+        def on_summary(text, chunks=chunks, first_chunk_at=first_chunk_at):
+            if not first_chunk_at:
+                first_chunk_at.append(time.monotonic())
+            chunks.append(text)
+
+        service.summary_generated.connect(on_summary)
+        service.generate_summary(prompt, content, {})
+        # cleanup_worker() drops the worker once its finished signal was handled
+        _wait_for(app, lambda: service.worker is None, timeout)
+        service.summary_generated.disconnect(on_summary)
+        latency = time.monotonic() - request_started
+        if chunks and chunks[-1].startswith("Error:"):
+            result.fail(chunks[-1][:80])
+        else:
+            ttft = first_chunk_at[0] - request_started if first_chunk_at else None
+            result.record(latency, "".join(chunks), ttft)
+    result.wall_time = time.monotonic() - started
+    return result
+
+
+def run_benchmarks(provider_name: str, suites=SUITES, requests: int = 20, concurrency: int = 4,
+                   chunk_tokens: int = 300, timeout: float = 120.0) -> List[BenchmarkResult]:
+    """Run the selected suites against provider_name and return their results."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    prompts = [f"{BENCHMARK_PROMPT} (#{i + 1})" for i in range(requests)]
+    results = []
+    for suite in suites:
+        if suite == "send":
+            results.append(bench_send(provider_name, prompts, concurrency))
+        elif suite == "stream":
+            results.append(bench_stream(provider_name, prompts, concurrency))
+        elif suite == "worker":
+            results.append(bench_worker(app, provider_name, prompts, timeout))
+        elif suite == "chunks":
+            results.append(bench_chunks(app, requests, concurrency, chunk_tokens, timeout))
+        elif suite == "summary":
+            contents = [_benchmark_document(6 + i % 4) for i in range(requests)]
+            results.append(bench_summary(app, provider_name, contents, timeout))
+        else:
+            raise ValueError(f"Unknown benchmark suite: {suite}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LLM generation path")
+    parser.add_argument("--provider", help="configured provider to benchmark instead of the mock server")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"comma separated suites ({', '.join(SUITES)})")
+    parser.add_argument("--requests", type=int, default=20, help="requests (or chunks) per suite")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-tokens", type=int, default=300, help="chunk size of the chunks suite")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per worker/pipeline step")
+    mock_group = parser.add_argument_group("mock server")
+    add_mock_arguments(mock_group)
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    server = None
+    if not args.provider:
+        server = MockLLMServer(config_from_args(args)).start()
+        print(f"Mock LLM server on {server.url}")
+    try:
+        with benchmark_provider(server.url if server else None, args.provider) as provider_name:
+            results = run_benchmarks(provider_name, suites, args.requests, args.concurrency,
+                                     args.chunk_tokens, args.timeout)
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
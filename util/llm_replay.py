@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+llm_replay.py
+
+Replays recorded prompt payloads against a configured provider or the local
+mock server (util.mock_llm_server) and reports the latency distribution,
+token throughput and failures, to compare providers and to regression-test
+changes to the aggregator with real workloads.
+
+Payloads are read from a JSONL file, one request per line. The prompt is
+taken from "final_prompt" (the format written to llm_prompts.jsonl when the
+"Record LLM Prompts for Replay" preference is on), "prompt" or "body", so any
+JSONL log of text requests can serve as a workload. Optional fields:
+conversation_history, overrides and kind ("invoke" or "stream").
+
+Requests are started at most --rate per second with at most --concurrency in
+flight. The recorded provider, model and endpoint are replaced by the target
+provider; max_tokens, temperature and timeout are kept.
+
+Run:
+    python -m util.llm_replay llm_prompts.jsonl --provider "My LMStudio" --concurrency 4 --rate 2
+    python -m util.llm_replay llm_prompts.jsonl --mock --latency 0.5 --error-rate 0.05
+"""
+
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from settings.llm_api_aggregator import WWApiAggregator
+from settings.llm_metrics import PROMPTS_FILE
+from settings.settings_manager import WWSettingsManager
+from util.llm_benchmark import BenchmarkResult, benchmark_provider, format_report
+from util.mock_llm_server import MockLLMServer, add_mock_arguments, config_from_args
+
+REPLAY_KINDS = ("invoke", "stream")
+KEPT_OVERRIDES = ("max_tokens", "temperature", "timeout")
+
+
+def load_payloads(path: str, limit: int = 0) -> List[Dict[str, Any]]:
+    """Read replayable requests from a JSONL file; lines without a prompt are skipped."""
+    payloads = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            prompt = record.get("final_prompt") or record.get("prompt") or record.get("body")
+            if not isinstance(prompt, str) or not prompt.strip():
+                continue
+            payloads.append({
+                "final_prompt": prompt,
+                "conversation_history": record.get("conversation_history") or None,
+                "overrides": {k: v for k, v in (record.get("overrides") or {}).items() if k in KEPT_OVERRIDES},
+                "kind": record.get("kind") if record.get("kind") in REPLAY_KINDS else "invoke"
+            })
+            if limit and len(payloads) >= limit:
+                break
+    return payloads
+
+
+class Replayer:
+    """Replays payloads at a paced rate and collects one BenchmarkResult per request kind."""
+
+    def __init__(self, provider_name: str, concurrency: int = 4, rate: float = 0.0,
+                 kind: Optional[str] = None):
+        self.provider_name = provider_name
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.kind = kind  # None replays every payload as recorded
+        self.results = {k: BenchmarkResult(f"replay-{k}") for k in REPLAY_KINDS}
+        self._lock = threading.Lock()
+
+    def _replay_one(self, payload: Dict[str, Any]):
+        kind = self.kind or payload["kind"]
+        result = self.results[kind]
+        overrides = dict(payload["overrides"], provider=self.provider_name)
+        started = time.monotonic()
+        ttft = None
+        try:
+            if kind == "stream":
+                chunks = []
+                for chunk in WWApiAggregator.stream_prompt_to_llm(
+                        payload["final_prompt"], overrides, payload["conversation_history"]):
+                    if ttft is None:
+                        ttft = time.monotonic() - started
+                    chunks.append(chunk)
+                response = "".join(c for c in chunks if isinstance(c, str))
+            else:
+                response = WWApiAggregator.send_prompt_to_llm(
+                    payload["final_prompt"], overrides, payload["conversation_history"])
+        except Exception as e:
+            with self._lock:
+                result.fail(e)
+            return
+        with self._lock:
+            result.record(time.monotonic() - started, response, ttft)
+
+    def run(self, payloads: List[Dict[str, Any]]) -> List[BenchmarkResult]:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = []
+            for i, payload in enumerate(payloads):
+                if self.rate > 0:
+                    # Open-loop pacing: request i starts at i / rate, independent of responses
+                    delay = started + i / self.rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append(pool.submit(self._replay_one, payload))
+            for future in futures:
+                future.result()
+        wall_time = time.monotonic() - started
+        results = [r for r in self.results.values() if r.requests]
+        for result in results:
+            result.wall_time = wall_time
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded LLM prompts and report timings")
+    parser.add_argument("file", nargs="?", default=PROMPTS_FILE, help="JSONL file of prompt payloads")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--provider", help="configured provider to replay against (default: the active one)")
+    target.add_argument("--mock", action="store_true", help="replay against a local mock server")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at most")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests started per second (0: unpaced)")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N payloads")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the workload N times")
+    parser.add_argument("--kind", choices=REPLAY_KINDS, help="replay every payload as invoke or stream")
+    parser.add_argument("--json", dest="json_path", help="also write the summaries to this JSON file")
+    mock_group = parser.add_argument_group("mock server (with --mock)")
+    add_mock_arguments(mock_group)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.file, args.limit) * max(1, args.repeat)
+    if not payloads:
+        parser.error(f"No replayable prompts in {args.file}")
+
+    server = None
+    if args.mock:
+        server = MockLLMServer(config_from_args(args)).start()
+        print(f"Mock LLM server on {server.url}")
+    try:
+        provider_name = None if args.mock else (args.provider or WWSettingsManager.get_active_llm_name())
+        with benchmark_provider(server.url if server else None, provider_name) as name:
+            print(f"Replaying {len(payloads)} requests against {name}")
+            results = Replayer(name, args.concurrency, args.rate, args.kind).run(payloads)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({r.name: dict(r.summary(), errors=r.errors) for r in results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
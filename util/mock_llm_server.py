@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+mock_llm_server.py
+
+A local, OpenAI-compatible stand-in for an LLM provider, used to measure the
+generation path without a live provider. It serves:
+- GET  /v1/models               a single mock model
+- POST /v1/chat/completions     plain and streamed (SSE) completions
+
+Latency before the first token, the token rate, the response length and the
+share of failing requests (with their HTTP status) are configurable, so
+retries, circuit breaking and streaming can be exercised reproducibly.
+Point a "Custom" or "LMStudio" provider at http://127.0.0.1:<port>/v1.
+
+Run standalone:
+    python -m util.mock_llm_server --port 8765 --latency 0.3 --tokens-per-second 50
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+MOCK_MODEL = "mock-model"
+MOCK_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit",
+              "sed", "do", "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore",
+              "magna", "aliqua")
+
+
+@dataclass
+class MockLLMConfig:
+    latency: float = 0.2              # seconds before the first token
+    tokens_per_second: float = 100.0  # generation speed; 0 means instant
+    response_tokens: int = 64         # tokens (words) per completion
+    error_rate: float = 0.0           # share of requests answered with error_status
+    error_status: int = 429
+    seed: Optional[int] = None
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real provider behind the pooled client
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    @property
+    def config(self) -> MockLLMConfig:
+        return self.server.config
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: str):
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):X}\r\n".encode("ascii") + encoded + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": MOCK_MODEL, "object": "model", "created": 0, "owned_by": "mock"}
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+            return
+
+        self.server.count_request()
+        if self.server.should_fail():
+            self._send_json(self.config.error_status, {"error": {
+                "message": f"Injected error ({self.config.error_status})", "type": "mock_error"}})
+            return
+
+        time.sleep(self.config.latency)
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+        n_tokens = min(self.config.response_tokens, max_tokens) if max_tokens else self.config.response_tokens
+        tokens = [MOCK_WORDS[i % len(MOCK_WORDS)] + " " for i in range(n_tokens)]
+        delay = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        model = request.get("model") or MOCK_MODEL
+        completion_id = f"chatcmpl-mock-{self.server.request_count}"
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i and delay:
+                        time.sleep(delay)
+                    delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                    self._write_chunk(self._sse(completion_id, model, delta, None))
+                self._write_chunk(self._sse(completion_id, model, {}, "stop"))
+                self._write_chunk("data: [DONE]\n\n")
+                self._write_chunk("")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # The client stopped reading (interrupted stream)
+            return
+
+        time.sleep(delay * n_tokens)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                      "total_tokens": prompt_tokens + n_tokens}
+        })
+
+    @staticmethod
+    def _sse(completion_id: str, model: str, delta: dict, finish_reason: Optional[str]) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded mock server; start() serves on a background thread."""
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockLLMHandler)
+        self.config = config or MockLLMConfig()
+        self.request_count = 0
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as a provider endpoint."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.config.error_rate
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def add_mock_arguments(parser):
+    """Add the mock server options to an argparse parser or group (shared with the benchmark tools)."""
+    defaults = MockLLMConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency,
+                        help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="generation speed (0 for instant responses)")
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens,
+                        help="tokens per completion")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="share of requests that fail (0..1)")
+    parser.add_argument("--error-status", type=int, default=defaults.error_status,
+                        help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the error injection")
+
+
+def config_from_args(args) -> MockLLMConfig:
+    return MockLLMConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                         response_tokens=args.response_tokens, error_rate=args.error_rate,
+                         error_status=args.error_status, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    add_mock_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = MockLLMServer(config_from_args(args), args.host, args.port)
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
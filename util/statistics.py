@@ -14,6 +14,7 @@ about a writing project, including:
 import os
 import json
 import re
+import hashlib
 import datetime
 from collections import defaultdict, Counter
 import statistics as stats
@@ -28,6 +29,15 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtChart import QChart, QChartView, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis, QLineSeries
 
 from settings.theme_manager import ThemeManager
+from settings.autosave_manager import (
+    REVISION_FILE, build_scene_identifier, content_hash, get_manifest, read_scene_file, write_text_atomic
+)
+from project_window.tree_manager import read_structure_file
+from compendium.mention_scanner import MentionScanner
+from util.html_text import scene_file_text
+
+STATISTICS_CACHE_FILE = "statistics_cache.json"
+STATISTICS_CACHE_VERSION = 3
 
 # Import text analysis functionality
 # from text_analysis import nlp, comprehensive_analysis
@@ -52,7 +62,6 @@ class ProjectStatistics:
         
         # Initialize all attributes to prevent AttributeError
         self.compendium_data = {}
-        self.scene_contents = {}
         self.scene_metadata = {}
         self.word_counts = {}
         self.analysis_results = {}
@@ -60,23 +69,23 @@ class ProjectStatistics:
         self.location_mentions = defaultdict(list)
         self.custom_mentions = defaultdict(list)
         self.word_count_history = []
+        self._cache = None  # per-scene results from the sidecar file
         
     def load_data(self):
         """
         Load all project data needed for statistics analysis.
+
+        Only the latest revision of each scene is read: scenes come from the
+        project structure (by UUID), their files from the autosave manifest.
+        Results per scene are cached in a sidecar file keyed by content hash,
+        so only scenes that changed since the last run are analyzed again.
         
         Returns:
             bool: True if data was loaded successfully, False otherwise
         """
-        # Debug output
         print(f"Loading project data from: {self.project_path}")
-        print(f"Current working directory: {os.getcwd()}")
-        
-        try:
-            files_in_dir = os.listdir(self.project_path)
-            print(f"Files in project directory: {files_in_dir}")
-        except Exception as e:
-            print(f"ERROR: Cannot list files in '{self.project_path}': {str(e)}")
+        if not os.path.isdir(self.project_path):
+            print(f"ERROR: Project directory not found: '{self.project_path}'")
             return False
         
         # Load compendium data
@@ -86,7 +95,6 @@ class ProjectStatistics:
                 with open(compendium_path, 'r', encoding='utf-8') as f:
                     self.compendium_data = json.load(f)
                     print(f"Successfully loaded compendium from {compendium_path}")
-                    print(f"Compendium data type: {type(self.compendium_data)}")
                     
                     # If it's a list, convert to a simple dictionary format to make processing easier
                     if isinstance(self.compendium_data, list):
@@ -102,85 +110,181 @@ class ProjectStatistics:
             print(f"Compendium file not found at {compendium_path}")
             self.compendium_data = {}
         
-        # Updated: Look for HTML files instead of TXT files
-        scene_files = [f for f in os.listdir(self.project_path) if f.endswith('.html')]
-        print(f"Found {len(scene_files)} potential scene files")
+        terms = self._mention_terms(self._compendium_categories())
+        mention_key = hashlib.sha256(json.dumps(sorted(terms), ensure_ascii=False).encode("utf-8")).hexdigest()
+        scanner = MentionScanner(terms)
         
-        for scene_file in scene_files:
-            try:
-                file_path = os.path.join(self.project_path, scene_file)
-                
-                # Try to extract metadata from the filename
+        scenes = self._resolve_scenes()
+        print(f"Found {len(scenes)} scenes")
+        
+        cache = self._load_cache()
+        self.scene_metadata = {}
+        self.word_counts = {}
+        self.analysis_results = {}
+        self.word_count_history = []
+        to_analyze = {}  # scene id -> text of the scenes whose content changed
+        for metadata in scenes:
+            scene_id = metadata['id']
+            entry = cache.get(scene_id)
+            # An empty analysis failed (e.g. no spaCy model) and is retried
+            needs_analysis = not entry or entry.get('hash') != metadata['hash'] or not entry.get('analysis')
+            if needs_analysis or entry.get('mention_key') != mention_key:
                 try:
-                    metadata = self._parse_scene_filename(scene_file)
+                    content = self._read_scene_text(metadata['path'])
                 except Exception as e:
-                    print(f"Could not parse filename for {scene_file}, using defaults: {str(e)}")
-                    metadata = {
-                        'id': scene_file.replace('.html', ''),
-                        'project': self.project_name,
-                        'act': 'Unknown',
-                        'chapter': 'Unknown',
-                        'scene': 'Unknown',
-                        'timestamp': os.path.getmtime(file_path),
-                        'filename': scene_file
+                    print(f"Error processing scene file {metadata['filename']}: {e}")
+                    continue
+                if needs_analysis:
+                    entry = {
+                        'hash': metadata['hash'],
+                        'word_count': len(content.split()),
+                        'analysis': {}
                     }
-                
-                # Read file content and extract text from HTML using BeautifulSoup
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(html_content, 'html.parser')
-                content = soup.get_text()
-                print(f"Successfully extracted {len(content)} characters from {scene_file}")
-                
-                # Store content and metadata
-                self.scene_contents[metadata['id']] = content
-                self.scene_metadata[metadata['id']] = metadata
-                
-                # Calculate basic word count
-                self.word_counts[metadata['id']] = len(content.split())
-                
-                # Add to history based on timestamp (if string, parse, otherwise use as is)
-                if isinstance(metadata['timestamp'], str):
-                    try:
-                        timestamp = datetime.datetime.strptime(metadata['timestamp'], '%Y%m%d%H%M%S')
-                    except ValueError:
-                        try:
-                            timestamp = datetime.datetime.fromtimestamp(float(metadata['timestamp']))
-                        except ValueError:
-                            timestamp = datetime.datetime.now()
-                else:
-                    timestamp = datetime.datetime.fromtimestamp(metadata['timestamp'])
-                
-                self.word_count_history.append({
-                    'date': timestamp.strftime('%Y-%m-%d'),
-                    'time': timestamp.strftime('%H:%M:%S'),
-                    'scene_id': metadata['id'],
-                    'act': metadata['act'],
-                    'chapter': metadata['chapter'],
-                    'scene': metadata['scene'],
-                    'word_count': len(content.split())
-                })
-                
-            except Exception as e:
-                print(f"Error processing scene file {scene_file}: {e}")
+                    to_analyze[scene_id] = content
+                entry['mentions'] = self._find_mentions(content, scanner)
+                entry['mention_key'] = mention_key
+                cache[scene_id] = entry
+            
+            self.scene_metadata[scene_id] = metadata
+            self.word_counts[scene_id] = entry['word_count']
+            
+            try:
+                timestamp = datetime.datetime.strptime(metadata['timestamp'], '%Y%m%d%H%M%S')
+            except (TypeError, ValueError):
+                timestamp = datetime.datetime.fromtimestamp(os.path.getmtime(metadata['path']))
+            self.word_count_history.append({
+                'date': timestamp.strftime('%Y-%m-%d'),
+                'time': timestamp.strftime('%H:%M:%S'),
+                'scene_id': scene_id,
+                'act': metadata['act'],
+                'chapter': metadata['chapter'],
+                'scene': metadata['scene'],
+                'word_count': entry['word_count']
+            })
+        
+        # Changed scenes are analyzed together, so their parsing is batched
+        for scene_id, analysis in self._analyze_scenes(to_analyze).items():
+            cache[scene_id]['analysis'] = analysis
+        for scene_id in self.scene_metadata:
+            self.analysis_results[scene_id] = cache[scene_id]['analysis']
         
-        print(f"Successfully loaded {len(self.scene_contents)} scenes")
+        # Scenes that no longer exist are dropped from the cache
+        self._save_cache({scene_id: cache[scene_id] for scene_id in self.scene_metadata})
+        print(f"Loaded {len(self.scene_metadata)} scenes ({len(to_analyze)} analyzed, the rest cached)")
         
         # Sort word count history by timestamp
         self.word_count_history.sort(key=lambda x: datetime.datetime.strptime(f"{x['date']} {x['time']}", '%Y-%m-%d %H:%M:%S'))
         
-        if self.scene_contents:
+        if not self.scene_metadata:
+            print("No scene data was loaded!")
+            return False
+        self._collect_mentions(cache)
+        return True
+    
+    def _resolve_scenes(self):
+        """
+        Find the current revision of every scene: scenes (and their order) come
+        from the project structure, files from its latest_file or the
+        autosave manifest. Without a structure file, every scene indexed in
+        the manifest is used.
+        
+        Returns:
+            list: Scene metadata dicts (id is the scene UUID) with 'path' and 'hash'
+        """
+        manifest = get_manifest(self.project_path)
+        structure_path = os.path.join(self.project_path, f"{self.project_name}_structure.json")
+        if not os.path.exists(structure_path):
+            candidates = [f for f in os.listdir(self.project_path) if f.endswith("_structure.json")]
+            structure_path = os.path.join(self.project_path, candidates[0]) if candidates else None
+        structure = None
+        if structure_path:
             try:
-                self._process_scene_data()
-                return True
+                structure = read_structure_file(structure_path)
             except Exception as e:
-                print(f"Error processing scene data: {e}")
-                return False
+                print(f"Error loading project structure {structure_path}: {e}")
+        
+        scenes = []
+        if structure is not None:
+            for act in structure.get("acts", []):
+                for chapter in act.get("chapters", []):
+                    for scene in chapter.get("scenes", []):
+                        if not isinstance(scene, dict):
+                            continue
+                        hierarchy = [act.get("name", ""), chapter.get("name", ""), scene.get("name", "")]
+                        key = scene.get("uuid") or manifest.key_of_identifier(
+                            build_scene_identifier(self.project_name, hierarchy))
+                        path = self._scene_path(manifest, key, scene.get("latest_file"))
+                        if path:
+                            scenes.append(self._scene_metadata(manifest, key, path, hierarchy))
         else:
-            print("No scene data was loaded!")
-            return False
-   
+            for key in list(manifest.scenes):
+                path = manifest.latest_path(key)
+                if path:
+                    parsed = self._parse_scene_filename(os.path.basename(path))
+                    scenes.append(self._scene_metadata(manifest, key, path,
+                                                       [parsed['act'], parsed['chapter'], parsed['scene']]))
+        return scenes
+    
+    def _scene_path(self, manifest, key, latest_file):
+        """Path of the newest revision of a scene, or None if it was never saved."""
+        if latest_file:
+            path = os.path.join(self.project_path, os.path.basename(latest_file))
+            if os.path.exists(path):
+                rev = manifest.latest(key) if key else None
+                # latest_file may lag behind a save made by another window
+                if not rev or rev['file'] == os.path.basename(path):
+                    return path
+        return manifest.latest_path(key) if key else None
+    
+    def _scene_metadata(self, manifest, key, path, hierarchy):
+        filename = os.path.basename(path)
+        match = REVISION_FILE.match(filename)
+        rev = manifest.latest(key)
+        digest = rev['hash'] if rev and rev['file'] == filename else None
+        if not digest:
+            digest = content_hash(read_scene_file(path))
+        return {
+            'id': key,
+            'project': self.project_name,
+            'act': hierarchy[0],
+            'chapter': hierarchy[1],
+            'scene': hierarchy[2],
+            'timestamp': match.group('stamp') if match else None,
+            'filename': filename,
+            'path': path,
+            'hash': digest
+        }
+    
+    def _read_scene_text(self, path):
+        """Plain text of a scene file (cached by path and mtime)."""
+        return scene_file_text(path)
+    
+    def _cache_path(self):
+        return os.path.join(self.project_path, STATISTICS_CACHE_FILE)
+    
+    def _load_cache(self):
+        """Cached per-scene results: scene id -> {hash, word_count, analysis, mentions, mention_key}."""
+        if self._cache is None:
+            self._cache = {}
+            try:
+                with open(self._cache_path(), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == STATISTICS_CACHE_VERSION:
+                    self._cache = data.get('scenes', {})
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error loading statistics cache: {e}")
+        return self._cache
+    
+    def _save_cache(self, scenes):
+        self._cache = scenes
+        try:
+            write_text_atomic(self._cache_path(), json.dumps(
+                {'version': STATISTICS_CACHE_VERSION, 'scenes': scenes}, ensure_ascii=False))
+        except Exception as e:
+            print(f"Error saving statistics cache: {e}")
+    
     def _parse_scene_filename(self, filename):
         """
         Parse a scene filename to extract metadata.
@@ -226,21 +330,13 @@ class ProjectStatistics:
             'filename': filename
         }
     
-    def _process_scene_data(self):
+    def _compendium_categories(self):
         """
-        Process all scene data to generate statistics.
-        This includes text analysis, character/location mentions, etc.
+        Split the compendium into characters, locations and other categories.
+        
+        Returns:
+            tuple: (characters, locations, custom_categories) dicts
         """
-        # Reset collections
-        self.character_mentions = defaultdict(list)
-        self.location_mentions = defaultdict(list)
-        self.custom_mentions = defaultdict(list)
-        self.analysis_results = {}
-
-        # Lazy import to avoid circular import issues:
-        from .text_analysis import comprehensive_analysis
-
-        # Extract categories from compendium if available
         characters = {}
         locations = {}
         custom_categories = {}
@@ -266,57 +362,88 @@ class ProjectStatistics:
                     print(f"Warning: Unexpected compendium data type: {type(self.compendium_data)}")
             except Exception as e:
                 print(f"Error processing compendium data: {e}")
-
-        # Process each scene
-        for scene_id, content in self.scene_contents.items():
-            # Run text analysis
-            try:
-                self.analysis_results[scene_id] = comprehensive_analysis(content)
-            except Exception as e:
-                print(f"Error analyzing scene {scene_id}: {e}")
-                self.analysis_results[scene_id] = {}
-
-            # Find character mentions
-            if characters:
-                try:
-                    for char_name, char_data in characters.items():
-                        if char_name.lower() in content.lower():
-                            mention_count = content.lower().count(char_name.lower())
-                            self.character_mentions[char_name].append({
-                                'scene_id': scene_id,
-                                'count': mention_count
-                            })
-                except Exception as e:
-                    print(f"Error processing character mentions: {e}")
-
-            # Find location mentions
-            if locations:
-                try:
-                    for loc_name, loc_data in locations.items():
-                        if loc_name.lower() in content.lower():
-                            mention_count = content.lower().count(loc_name.lower())
-                            self.location_mentions[loc_name].append({
-                                'scene_id': scene_id,
-                                'count': mention_count
-                            })
-                except Exception as e:
-                    print(f"Error processing location mentions: {e}")
-
-            # Find custom category mentions
-            try:
-                for category_name, entries in custom_categories.items():
-                    if isinstance(entries, dict):  # Make sure entries is a dict
-                        for entry_name, entry_data in entries.items():
-                            if entry_name.lower() in content.lower():
-                                mention_count = content.lower().count(entry_name.lower())
-                                self.custom_mentions[category_name].append({
-                                    'entry': entry_name,
-                                    'scene_id': scene_id,
-                                    'count': mention_count
-                                })
-            except Exception as e:
-                print(f"Error processing custom category mentions: {e}")
-
+        return characters, locations, custom_categories
+    
+    @staticmethod
+    def _mention_terms(categories):
+        """
+        The names to look for in scenes, as (name, key) pairs with key
+        ('characters', name), ('locations', name) or ('custom', category, entry);
+        an entry stored as a dict may list more names under "aliases".
+        """
+        characters, locations, custom_categories = categories
+        groups = [(('characters',), characters), (('locations',), locations)]
+        groups += [(('custom', category_name), entries) for category_name, entries in custom_categories.items()
+                   if isinstance(entries, dict)]
+        terms = []
+        for prefix, entries in groups:
+            for entry_name, entry in entries.items():
+                key = prefix + (entry_name,)
+                terms.append((entry_name, key))
+                aliases = entry.get('aliases', []) if isinstance(entry, dict) else []
+                terms.extend((alias, key) for alias in aliases if isinstance(alias, str))
+        return terms
+    
+    def _analyze_scenes(self, contents):
+        """
+        Run the text analysis of several scenes. Each scene is parsed once,
+        in batches with nlp.pipe (text_analysis.analyze_many); the
+        results are made JSON-safe for the cache.
+        
+        Args:
+            contents (dict): scene id -> text
+        
+        Returns:
+            dict: scene id -> analysis ({} if it failed)
+        """
+        results = {scene_id: {} for scene_id in contents}
+        if not contents:
+            return results
+        try:
+            # Lazy import to avoid circular import issues:
+            from .text_analysis import analyze_many
+            for scene_id, analysis in zip(contents, analyze_many(list(contents.values()))):
+                # spaCy objects (e.g. each sentence's doc) are not needed for statistics
+                results[scene_id] = json.loads(json.dumps(analysis, default=lambda value: None))
+        except Exception as e:
+            print(f"Error analyzing scenes: {e}")
+        return results
+    
+    def _find_mentions(self, content, scanner):
+        """
+        Count the compendium entries mentioned in a scene (whole words, in one
+        pass over the text for all entries).
+        
+        Returns:
+            dict: {'characters': {name: count}, 'locations': {name: count},
+                   'custom': {category: {entry: count}}}
+        """
+        mentions = {'characters': {}, 'locations': {}, 'custom': {}}
+        for key, count in scanner.count(content).items():
+            if key[0] == 'custom':
+                mentions['custom'].setdefault(key[1], {})[key[2]] = count
+            else:
+                mentions[key[0]][key[1]] = count
+        return mentions
+    
+    def _collect_mentions(self, cache):
+        """Gather the per-scene mention counts into the per-entry lists used by the reports."""
+        self.character_mentions = defaultdict(list)
+        self.location_mentions = defaultdict(list)
+        self.custom_mentions = defaultdict(list)
+        for scene_id in self.scene_metadata:
+            mentions = cache[scene_id].get('mentions', {})
+            for char_name, count in mentions.get('characters', {}).items():
+                self.character_mentions[char_name].append({'scene_id': scene_id, 'count': count})
+            for loc_name, count in mentions.get('locations', {}).items():
+                self.location_mentions[loc_name].append({'scene_id': scene_id, 'count': count})
+            for category_name, entries in mentions.get('custom', {}).items():
+                for entry_name, count in entries.items():
+                    self.custom_mentions[category_name].append({
+                        'entry': entry_name,
+                        'scene_id': scene_id,
+                        'count': count
+                    })
     
     def get_word_count_stats(self):
         """
@@ -1136,7 +1263,7 @@ class StatisticsDialog(QDialog):
         total_words = word_stats['total']
         
         # Get scene count
-        scene_count = len(self.statistics.scene_contents)
+        scene_count = len(self.statistics.scene_metadata)
         
         # Calculate reading time (assuming 250 words per minute)
         reading_minutes = total_words / 250
@@ -1485,7 +1612,7 @@ class StatisticsDialog(QDialog):
                 </div>
                 <div class="stat-box">
                     <div class="stat-label">Total Scenes</div>
-                    <div class="stat-value">{len(self.statistics.scene_contents)}</div>
+                    <div class="stat-value">{len(self.statistics.scene_metadata)}</div>
                 </div>
                 <div class="stat-box">
                     <div class="stat-label">Reading Time</div>
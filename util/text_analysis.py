@@ -106,9 +106,23 @@ def initialize():
         return True
     return False
 
+_analysis = None
+
+def get_analysis():
+    """Returns the shared English analysis instance (the spaCy model is loaded once)."""
+    global _analysis
+    if _analysis is None:
+        analysis = EnglishTextAnalysis()
+        if not analysis.initialize():
+            raise RuntimeError("English spaCy model not loaded.")
+        _analysis = analysis
+    return _analysis
+
 def comprehensive_analysis(text, target_grade=8):
     """Performs a comprehensive analysis of the given text in English."""
-    analysis = EnglishTextAnalysis()
-    if not analysis.initialize():
-        raise RuntimeError("English spaCy model not loaded.")
-    return analysis.comprehensive_analysis(text, target_grade)
\ No newline at end of file
+    return get_analysis().comprehensive_analysis(text, target_grade)
+
+def analyze_many(texts, target_grade=8, n_process=1, batch_size=None):
+    """Analyzes many English texts in batches (see BaseTextAnalysis.analyze_many); yields one result per text."""
+    kwargs = {"batch_size": batch_size} if batch_size else {}
+    return get_analysis().analyze_many(texts, target_grade, n_process, **kwargs)
\ No newline at end of file
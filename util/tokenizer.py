@@ -0,0 +1,141 @@
+"""
+Shared tokenizer service.
+
+Encoders are created once per process, token counts are memoized in an LRU
+keyed by a hash of the text, and batches are counted with tiktoken's
+threaded encode_batch. Call sites pass an encoding name, or use
+encoding_for_provider() to pick the encoding of the configured model.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import tiktoken
+
+from settings.settings_manager import WWSettingsManager
+
+DEFAULT_ENCODING = "cl100k_base"
+# Number of (encoding, text hash) -> token count entries kept in memory
+COUNT_CACHE_SIZE = 8192
+# Threads used by tiktoken's encode_batch
+BATCH_THREADS = 8
+
+_encoders: Dict[str, "tiktoken.Encoding"] = {}
+_encoders_lock = threading.Lock()
+
+_counts: "OrderedDict[tuple, int]" = OrderedDict()
+_counts_lock = threading.Lock()
+
+_provider_encodings: Dict[tuple, str] = {}
+
+
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> "tiktoken.Encoding":
+    """Return the process-wide encoder for an encoding name."""
+    encoder = _encoders.get(encoding_name)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.get(encoding_name)
+            if encoder is None:
+                encoder = _encoders[encoding_name] = tiktoken.get_encoding(encoding_name)
+    return encoder
+
+
+def encoding_for_model(model: str) -> str:
+    """Encoding name tiktoken uses for a model; cl100k_base for unknown models."""
+    try:
+        return tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def encoding_for_provider(provider_name: Optional[str] = None) -> str:
+    """
+    Encoding name for a configured LLM (the active one by default).
+    Non-OpenAI models have no public tiktoken encoding, so counts for them
+    are an approximation based on cl100k_base.
+    """
+    provider_name = provider_name or WWSettingsManager.get_active_llm_name()
+    config = WWSettingsManager.get_llm_config(provider_name) or {}
+    key = (provider_name, config.get("model", ""))
+    name = _provider_encodings.get(key)
+    if name is None:
+        name = _provider_encodings[key] = encoding_for_model(key[1]) if key[1] else DEFAULT_ENCODING
+    return name
+
+
+def _cache_key(text: str, encoding_name: str) -> tuple:
+    return encoding_name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _remember(key: tuple, count: int):
+    with _counts_lock:
+        _counts[key] = count
+        _counts.move_to_end(key)
+        while len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+
+
+def _cached(key: tuple) -> Optional[int]:
+    with _counts_lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+        return count
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Return the number of tokens in text (memoized)."""
+    if not text:
+        return 0
+    key = _cache_key(text, encoding_name)
+    count = _cached(key)
+    if count is None:
+        count = len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+        _remember(key, count)
+    return count
+
+
+def count_tokens_batch(texts: Sequence[str], encoding_name: str = DEFAULT_ENCODING,
+                       num_threads: int = BATCH_THREADS) -> List[int]:
+    """Return the token count of every text; uncached texts are encoded in one threaded batch."""
+    counts: List[Optional[int]] = [None] * len(texts)
+    missing: List[int] = []
+    keys = []
+    for i, text in enumerate(texts):
+        if not text:
+            counts[i] = 0
+            keys.append(None)
+            continue
+        key = _cache_key(text, encoding_name)
+        keys.append(key)
+        counts[i] = _cached(key)
+        if counts[i] is None:
+            missing.append(i)
+    if missing:
+        encoded = get_encoding(encoding_name).encode_batch(
+            [texts[i] for i in missing], num_threads=num_threads, disallowed_special=()
+        )
+        for i, tokens in zip(missing, encoded):
+            counts[i] = len(tokens)
+            _remember(keys[i], counts[i])
+    return counts
+
+
+def encode(text: str, encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    return get_encoding(encoding_name).encode(text, disallowed_special=())
+
+
+def decode(tokens: List[int], encoding_name: str = DEFAULT_ENCODING) -> str:
+    return get_encoding(encoding_name).decode(tokens)
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING,
+                    keep_end: bool = False) -> str:
+    """Cut text to at most max_tokens tokens, keeping the start (or the end)."""
+    tokens = encode(text, encoding_name)
+    if len(tokens) <= max_tokens:
+        return text
+    max_tokens = max(0, int(max_tokens))
+    kept = tokens[len(tokens) - max_tokens:] if keep_end else tokens[:max_tokens]
+    return decode(kept, encoding_name)
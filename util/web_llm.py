@@ -1,13 +1,13 @@
 import sys
 import platform
 import math
-import tiktoken
 import os
 import json
 import datetime
 import logging
 logging.getLogger("boilerpy3").setLevel(logging.ERROR)
 logging.getLogger("qt.fonts").setLevel(logging.ERROR)
+from util import tokenizer
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtCore import QUrl, Qt, QThread, pyqtSignal, QDir
 from PyQt5.QtWidgets import (
@@ -155,7 +155,7 @@ class MainWindow(QWidget):
         self.extractor = extractors.ArticleExtractor()
         
         try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
+            self.encoding = tokenizer.get_encoding("cl100k_base")
         except Exception as e:
             print(f"Failed to initialize tokenizer: {e}")
             self.encoding = None
@@ -615,8 +615,7 @@ class MainWindow(QWidget):
         if not text or not self.encoding:
             return 0
         try:
-            tokens = self.encoding.encode(text)
-            return len(tokens)
+            return tokenizer.count_tokens(text, self.encoding.name)
         except Exception as e:
             print(f"Error counting tokens: {e}")
             return 0
@@ -704,7 +703,7 @@ class MainWindow(QWidget):
         if not text or not self.encoding:
             return text
         try:
-            tokens = self.encoding.encode(text)
+            tokens = tokenizer.encode(text, self.encoding.name)
             if len(tokens) <= max_tokens:
                 return text
             truncated_tokens = tokens[:max_tokens-10]
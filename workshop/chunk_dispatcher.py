@@ -0,0 +1,190 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from settings.llm_api_aggregator import WWApiAggregator
+from settings.async_llm import WWAsyncLoop, run_async
+from settings.settings_manager import WWSettingsManager
+from util import tokenizer
+
+logger = logging.getLogger('PdfRagApp')
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class TokenBudget:
+    """
+    Sliding one-minute token budget shared by every request to one provider.
+    A limit of 0 disables throttling.
+    """
+
+    def __init__(self, tokens_per_minute: int = 0):
+        self.tokens_per_minute = tokens_per_minute
+        self.window: deque = deque()  # (timestamp, tokens)
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self.window and now - self.window[0][0] >= 60.0:
+            self.used -= self.window.popleft()[1]
+
+    def _try_take(self, tokens: int) -> float:
+        """Take tokens if they fit (returns 0) or return the seconds to wait."""
+        # A single request larger than the budget is let through on an empty window
+        tokens = min(tokens, self.tokens_per_minute)
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            if self.used + tokens <= self.tokens_per_minute:
+                self.window.append((now, tokens))
+                self.used += tokens
+                return 0.0
+            return max(0.05, 60.0 - (now - self.window[0][0]) if self.window else 0.1)
+
+    def acquire(self, tokens: int, cancelled: threading.Event) -> bool:
+        """Block until `tokens` fit into the current minute; False if cancelled."""
+        if self.tokens_per_minute <= 0:
+            return True
+        while not cancelled.is_set():
+            wait_for = self._try_take(tokens)
+            if not wait_for:
+                return True
+            cancelled.wait(wait_for)
+        return False
+
+    async def aacquire(self, tokens: int, cancelled: threading.Event) -> bool:
+        """Async acquire: waits on the event loop instead of blocking a thread."""
+        if self.tokens_per_minute <= 0:
+            return True
+        while not cancelled.is_set():
+            wait_for = self._try_take(tokens)
+            if not wait_for:
+                return True
+            # Wake up regularly to notice cancellation
+            await asyncio.sleep(min(wait_for, 0.5))
+        return False
+
+
+_budgets: Dict[str, TokenBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_token_budget(provider_name: str) -> TokenBudget:
+    """
+    Return the process-wide budget of a configured provider. The limit comes
+    from the optional "tokens_per_minute" key of the provider's LLM config.
+    """
+    config = WWSettingsManager.get_llm_config(provider_name) or {}
+    limit = int(config.get("tokens_per_minute", 0) or 0)
+    with _budgets_lock:
+        budget = _budgets.get(provider_name)
+        if budget is None:
+            budget = _budgets[provider_name] = TokenBudget(limit)
+        else:
+            budget.tokens_per_minute = limit
+        return budget
+
+
+class ChunkDispatcher(QThread):
+    """
+    Sends a list of (prompt, chunk) jobs to the active LLM with at most
+    `max_concurrency` requests in flight and a per-provider token-per-minute
+    budget. Retries, backoff and circuit breaking are applied by the
+    aggregator's middleware (settings.llm_middleware).
+
+    The requests run as coroutines on the shared LLM event loop; this thread
+    only waits for the batch, so concurrency does not cost a thread per chunk.
+    Results are emitted through result_ready strictly in chunk order, so the
+    receiver sees the same sequence a serial loop would produce.
+    """
+    result_ready = pyqtSignal(int, str, str)  # chunk_idx, response, error
+    progress = pyqtSignal(int, int, int, float, float)  # done, total, in_flight, chunks/min, tokens/s
+    cancelled = pyqtSignal()
+
+    def __init__(self, jobs: List[Tuple[str, str]], max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 count_tokens=None, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.max_concurrency = max(1, max_concurrency)
+        self.provider_name = WWSettingsManager.get_active_llm_name()
+        if count_tokens is None:
+            encoding_name = tokenizer.encoding_for_provider(self.provider_name)
+            count_tokens = lambda text: tokenizer.count_tokens(text, encoding_name)
+        self.count_tokens = count_tokens
+        self.budget = get_token_budget(self.provider_name)
+        self._cancel = threading.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight = 0
+        self._tokens_done = 0
+
+    def cancel(self):
+        """Stop dispatching: queued chunks are dropped and running requests are cancelled."""
+        self._cancel.set()
+        if WWAsyncLoop.loop is not None:
+            WWAsyncLoop.loop.call_soon_threadsafe(self._cancel_tasks)
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    async def _send(self, idx: int) -> Tuple[str, str]:
+        prompt, chunk_text = self.jobs[idx]
+        full_input = f"{prompt}\n\n{chunk_text}"
+        tokens = self.count_tokens(full_input)
+        if not await self.budget.aacquire(tokens, self._cancel):
+            return "", "Cancelled"
+        self._in_flight += 1
+        try:
+            response = await WWApiAggregator.asend_prompt(full_input)
+            self._tokens_done += tokens + self.count_tokens(response or "")
+            return response, ""
+        except Exception as e:
+            logger.error(f"Chunk {idx + 1} failed: {e}")
+            return "", f"Error: {str(e)}"
+        finally:
+            self._in_flight -= 1
+
+    async def _dispatch(self):
+        total = len(self.jobs)
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[int, Tuple[str, str]] = {}
+        next_to_emit = 0
+
+        async def run_one(idx: int):
+            async with semaphore:
+                if self._cancel.is_set():
+                    return idx, ("", "Cancelled")
+                return idx, await self._send(idx)
+
+        self._tasks = [asyncio.ensure_future(run_one(i)) for i in range(total)]
+        for next_done in asyncio.as_completed(self._tasks):
+            try:
+                idx, result = await next_done
+            except asyncio.CancelledError:
+                continue
+            results[idx] = result
+            # Deliver in order: only the contiguous prefix of finished chunks
+            while next_to_emit in results:
+                response, error = results.pop(next_to_emit)
+                if not self._cancel.is_set():
+                    self.result_ready.emit(next_to_emit, response, error)
+                next_to_emit += 1
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.progress.emit(next_to_emit, total, self._in_flight,
+                               next_to_emit * 60.0 / elapsed, self._tokens_done / elapsed)
+
+    def run(self):
+        try:
+            run_async(self._dispatch()).result()
+        except Exception as e:
+            logger.error(f"Chunk dispatch failed: {e}")
+        if self._cancel.is_set():
+            self.cancelled.emit()
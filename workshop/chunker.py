@@ -0,0 +1,154 @@
+"""
+Linear-time, token-aware chunking of converted PDF markdown.
+
+The text is cut into contiguous units (paragraphs; sentences or fixed token
+windows for paragraphs that alone exceed the budget), every unit is counted
+once, and units are packed greedily into chunks. Chunks are slices of the
+original text, so each one carries exact character offsets and, given the
+page start offsets of the conversion, the PDF pages it came from.
+"""
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from util import tokenizer
+
+# Paragraphs are separated by two or more newlines (same as PdfProcessor)
+PARAGRAPH_BREAK_REGEX = re.compile(r'\n{2,}')
+# Sentences end with punctuation followed by whitespace
+SENTENCE_BREAK_REGEX = re.compile(r'(?<=[\.\!\?])\s+')
+# Markdown headings, code fences and tables start a new chunk when possible
+STRUCTURE_REGEX = re.compile(r'^(#{1,6}\s+|```|\|)')
+
+
+@dataclass
+class Chunk:
+    text: str
+    start_char: int  # offset of the first character in the source text
+    end_char: int    # offset one past the last character
+    token_count: int
+    start_page: Optional[int] = None  # page numbers as given in page_numbers
+    end_page: Optional[int] = None
+
+    def page_label(self) -> str:
+        """Human readable page range, 1-based."""
+        if self.start_page is None:
+            return ""
+        if self.start_page == self.end_page:
+            return f"page {self.start_page + 1}"
+        return f"pages {self.start_page + 1}-{self.end_page + 1}"
+
+
+# A unit is (start_char, end_char, token_count, starts_structure)
+Unit = Tuple[int, int, int, bool]
+
+
+def _spans(text: str, start: int, end: int, regex) -> List[Tuple[int, int]]:
+    """Split text[start:end] after each regex match; spans stay contiguous."""
+    spans = []
+    pos = start
+    for match in regex.finditer(text, start, end):
+        if match.end() > pos and match.start() > pos:
+            spans.append((pos, match.end()))
+            pos = match.end()
+    if pos < end:
+        spans.append((pos, end))
+    return spans
+
+
+def _token_windows(text: str, start: int, end: int, max_tokens: int,
+                   encoding_name: str) -> List[Unit]:
+    """Cut an oversized span every max_tokens tokens, on token boundaries."""
+    encoding = tokenizer.get_encoding(encoding_name)
+    tokens = tokenizer.encode(text[start:end], encoding_name)
+    _, offsets = encoding.decode_with_offsets(tokens)
+    units = []
+    for i in range(0, len(tokens), max_tokens):
+        j = min(i + max_tokens, len(tokens))
+        unit_start = start + offsets[i]
+        unit_end = start + offsets[j] if j < len(tokens) else end
+        if unit_end > unit_start:
+            units.append((unit_start, unit_end, j - i, False))
+    return units
+
+
+def _units(text: str, max_tokens: int, encoding_name: str) -> List[Unit]:
+    paragraphs = _spans(text, 0, len(text), PARAGRAPH_BREAK_REGEX)
+    counts = tokenizer.count_tokens_batch([text[s:e] for s, e in paragraphs], encoding_name)
+    units: List[Unit] = []
+    for (start, end), count in zip(paragraphs, counts):
+        structural = bool(STRUCTURE_REGEX.match(text, start))
+        if count <= max_tokens:
+            units.append((start, end, count, structural))
+            continue
+        sentences = _spans(text, start, end, SENTENCE_BREAK_REGEX)
+        sentence_counts = tokenizer.count_tokens_batch([text[s:e] for s, e in sentences], encoding_name)
+        for (s_start, s_end), s_count in zip(sentences, sentence_counts):
+            if s_count <= max_tokens:
+                units.append((s_start, s_end, s_count, structural and s_start == start))
+            else:
+                units.extend(_token_windows(text, s_start, s_end, max_tokens, encoding_name))
+    return units
+
+
+def chunk_markdown(text: str, max_tokens: int, overlap_tokens: int = 0,
+                   page_starts: Optional[Sequence[int]] = None,
+                   page_numbers: Optional[Sequence[int]] = None,
+                   encoding_name: str = tokenizer.DEFAULT_ENCODING) -> List[Chunk]:
+    """
+    Split text into chunks of at most max_tokens tokens (approximately: unit
+    counts are summed, so joins can shift the total by a token or two).
+
+    Chunks end on paragraph boundaries where possible, then on sentence
+    boundaries, and only cut inside a sentence that alone exceeds the budget.
+    Headings, code fences and tables start a new chunk once the current one is
+    half full. With overlap_tokens > 0 each chunk repeats up to that many
+    tokens of whole units from the end of the previous one.
+
+    page_starts holds the character offset at which each converted page begins
+    and page_numbers the matching page numbers (0-based), used to fill
+    Chunk.start_page/end_page.
+    """
+    if not text.strip():
+        return []
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    units = _units(text, max_tokens, encoding_name)
+
+    # [first_unit, last_unit] index ranges of each chunk
+    ranges: List[Tuple[int, int, int]] = []
+    first, tokens = 0, 0
+    for i, (_, _, count, structural) in enumerate(units):
+        overflow = tokens + count > max_tokens
+        heading_break = structural and tokens >= max_tokens // 2
+        if i > first and (overflow or heading_break):
+            ranges.append((first, i - 1, tokens))
+            # Step back over whole units to build the overlap
+            new_first, carried = i, 0
+            while (overlap_tokens and new_first - 1 > first
+                   and carried + units[new_first - 1][2] <= overlap_tokens
+                   and carried + units[new_first - 1][2] + count <= max_tokens):
+                new_first -= 1
+                carried += units[new_first][2]
+            first, tokens = new_first, carried
+        tokens += count
+    ranges.append((first, len(units) - 1, tokens))
+
+    chunks = []
+    for first, last, tokens in ranges:
+        start, end = units[first][0], units[last][1]
+        # Trim surrounding whitespace but keep the offsets exact
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            continue
+        chunk = Chunk(text[start:end], start, end, tokens)
+        if page_starts:
+            numbers = page_numbers if page_numbers is not None else range(len(page_starts))
+            chunk.start_page = numbers[max(0, bisect_right(page_starts, start) - 1)]
+            chunk.end_page = numbers[max(0, bisect_right(page_starts, end - 1) - 1)]
+        chunks.append(chunk)
+    return chunks
@@ -1,21 +1,20 @@
 import math
-import tiktoken
 from settings.llm_api_aggregator import WWApiAggregator
+from util import tokenizer
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 
 # Define the model name and get its encoding. Adjust the model name as needed.
 MODEL_NAME = "gpt-3.5-turbo"
-encoding = tiktoken.encoding_for_model(MODEL_NAME)
+ENCODING_NAME = tokenizer.encoding_for_model(MODEL_NAME)
 
 def estimate_tokens(text):
     """Estimate tokens using tiktoken for better accuracy."""
-    return len(encoding.encode(text))
+    return tokenizer.count_tokens(text, ENCODING_NAME)
 
 def estimate_conversation_tokens(conversation_history):
-    total = 0
-    for message in conversation_history:
-        total += estimate_tokens(message.get("content", ""))
-    return total
+    # Counts are memoized, so re-estimating after each pruning step is cheap
+    contents = [message.get("content", "") for message in conversation_history]
+    return sum(tokenizer.count_tokens_batch(contents, ENCODING_NAME))
 
 def should_preserve(text):
     """
@@ -1,51 +1,306 @@
 # embedding_manager.py
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
 import faiss
 import numpy as np
-import tiktoken
-# For demonstration, we use a dummy embedding function.
-# In practice, you would replace this with a call to an embedding model/API.
+from settings.settings_manager import WWSettingsManager
+
+DEFAULT_SENTENCE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HASHING_DIM = 384
+EMBEDDINGS_DIRNAME = "embeddings"
+INDEX_FILENAME = "index.faiss"
+META_FILENAME = "index_meta.json"
+
+TOKEN_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingBackend:
+    """Turns texts into L2-normalized float32 vectors of a fixed dimension."""
+
+    name = "base"
+    dim = 0
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Local CPU sentence-embedding model (requires sentence-transformers)."""
+
+    def __init__(self, model_name: str = DEFAULT_SENTENCE_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic hashing vectorizer over word unigrams and bigrams.
+    Needs no model download, so it is the fallback and the backend for tests.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, (1.0 if (value >> 63) else -1.0)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = TOKEN_REGEX.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                col, sign = self._bucket(feature)
+                vectors[row, col] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+_backends: Dict[str, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """
+    Return a shared embedding backend.
+
+    name: "auto" (sentence model if installed, else hashing), "sentence" or "hashing".
+    Defaults to the general.embedding_backend setting.
+    """
+    name = name or WWSettingsManager.get_setting("general", "embedding_backend", "auto")
+    with _backends_lock:
+        if name in _backends:
+            return _backends[name]
+        backend = None
+        if name in ("auto", "sentence"):
+            try:
+                backend = SentenceTransformerBackend()
+            except Exception as e:
+                if name == "sentence":
+                    raise
+                logging.warning(f"Sentence embedding model unavailable, using hashing backend: {e}")
+        if backend is None:
+            backend = HashingBackend()
+        _backends[name] = backend
+        return backend
+
+
 def get_embedding(text):
-    # Convert text to a fixed-size vector.
-    # Here we use a simple example by encoding tokens and normalizing.
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    token_ids = encoding.encode(text)
-    vector = np.array(token_ids, dtype=np.float32)
-    # Pad or truncate to fixed size, e.g., 128 dimensions.
-    desired_dim = 128
-    if vector.shape[0] < desired_dim:
-        vector = np.pad(vector, (0, desired_dim - vector.shape[0]), 'constant')
-    else:
-        vector = vector[:desired_dim]
-    return vector
+    """Return the embedding vector of a single text."""
+    return get_embedding_backend().encode([text])[0]
+
 
 class EmbeddingIndex:
-    def __init__(self, dim=128):
-        self.dim = dim
-        self.index = faiss.IndexFlatL2(dim)
-        self.texts = []  # To keep a mapping of index to text
+    """
+    Normalized inner-product (cosine) vector store backed by FAISS.
+
+    With a project name the index lives in Projects/<project>/embeddings and is
+    memory-mapped on load, so nothing has to be re-embedded between launches.
+    Every vector carries an int64 id and a metadata dict holding at least "text".
+    """
+
+    def __init__(self, project_name: Optional[str] = None, backend: Optional[EmbeddingBackend] = None,
+                 index_dir: Optional[str] = None):
+        self.backend = backend or get_embedding_backend()
+        self.dim = self.backend.dim
+        if index_dir is None and project_name:
+            index_dir = WWSettingsManager.get_project_path(project_name, EMBEDDINGS_DIRNAME)
+        self.index_dir = index_dir
+        self.lock = threading.RLock()
+        self.metadata: Dict[int, Dict[str, Any]] = {}
+        self.extra: Dict[str, Any] = {}  # free-form bookkeeping for indexers
+        self.next_id = 0
+        self._read_only = False
+        self.index = self._new_index()
+        if self.index_dir:
+            self.load()
+
+    def _new_index(self):
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    @property
+    def texts(self) -> List[str]:
+        """Texts in insertion order (kept for backward compatibility)."""
+        with self.lock:
+            return [self.metadata[i]["text"] for i in sorted(self.metadata)]
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _paths(self) -> Tuple[str, str]:
+        return (os.path.join(self.index_dir, INDEX_FILENAME),
+                os.path.join(self.index_dir, META_FILENAME))
+
+    def load(self) -> bool:
+        """Load the persisted index; discard it if it was built by another backend."""
+        index_path, meta_path = self._paths()
+        if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("backend") != self.backend.name or meta.get("dim") != self.dim:
+                logging.info(f"Embedding index in {self.index_dir} built with another backend; starting fresh")
+                return False
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                read_only = True
+            except RuntimeError:
+                index = faiss.read_index(index_path)
+                read_only = False
+        except Exception as e:
+            logging.error(f"Error loading embedding index from {self.index_dir}: {e}")
+            return False
+        with self.lock:
+            self.index = index
+            self._read_only = read_only
+            self.metadata = {int(k): v for k, v in meta.get("entries", {}).items()}
+            self.extra = meta.get("extra", {})
+            self.next_id = meta.get("next_id", max(self.metadata, default=-1) + 1)
+        return True
 
-    def add_text(self, text):
-        vector = get_embedding(text)
-        vector = np.expand_dims(vector, axis=0)  # FAISS expects 2D array
-        self.index.add(vector)
-        self.texts.append(text)
+    def _make_writable(self):
+        """Swap a memory-mapped index for an in-memory copy before mutating it."""
+        if self._read_only:
+            self.index = faiss.read_index(self._paths()[0])
+            self._read_only = False
+
+    def save(self) -> bool:
+        """Write the index and its metadata atomically."""
+        if not self.index_dir:
+            return False
+        index_path, meta_path = self._paths()
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with self.lock:
+                if self._read_only:
+                    return True  # nothing changed since it was mapped
+                faiss.write_index(self.index, index_path + ".tmp")
+                meta = {
+                    "backend": self.backend.name,
+                    "dim": self.dim,
+                    "next_id": self.next_id,
+                    "entries": {str(k): v for k, v in self.metadata.items()},
+                    "extra": self.extra
+                }
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(index_path + ".tmp", index_path)
+            os.replace(meta_path + ".tmp", meta_path)
+            return True
+        except Exception as e:
+            logging.error(f"Error saving embedding index to {self.index_dir}: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def add_text(self, text, metadata: Optional[Dict[str, Any]] = None) -> int:
+        return self.add_texts([text], [metadata] if metadata else None)[0]
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                  batch_size: int = 64) -> List[int]:
+        """Embed texts in batches and add them; returns the assigned ids."""
+        if not texts:
+            return []
+        vectors = self.backend.encode(list(texts), batch_size=batch_size)
+        with self.lock:
+            self._make_writable()
+            ids = np.arange(self.next_id, self.next_id + len(texts), dtype=np.int64)
+            self.index.add_with_ids(vectors, ids)
+            self.next_id += len(texts)
+            for i, text in enumerate(texts):
+                entry = dict(metadatas[i]) if metadatas else {}
+                entry["text"] = text
+                self.metadata[int(ids[i])] = entry
+        return ids.tolist()
+
+    def remove_ids(self, ids: List[int]) -> int:
+        """Remove vectors by id; returns how many were removed."""
+        ids = [i for i in ids if i in self.metadata]
+        if not ids:
+            return 0
+        with self.lock:
+            self._make_writable()
+            self.index.remove_ids(np.array(ids, dtype=np.int64))
+            for i in ids:
+                self.metadata.pop(i, None)
+        return len(ids)
+
+    def clear(self):
+        with self.lock:
+            self.index = self._new_index()
+            self._read_only = False
+            self.metadata = {}
+            self.extra = {}
+            self.next_id = 0
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+    def search(self, text, k=3, min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to k (cosine score, metadata) pairs, best first."""
+        with self.lock:
+            if self.index.ntotal == 0:
+                return []
+            vector = self.backend.encode([text])
+            scores, indices = self.index.search(vector, min(k, self.index.ntotal))
+            results = []
+            for score, idx in zip(scores[0], indices[0]):
+                # Skip indices that are -1 (indicating no result)
+                if idx == -1 or score < min_score:
+                    continue
+                entry = self.metadata.get(int(idx))
+                if entry is not None:
+                    results.append((float(score), entry))
+            return results
 
     def query(self, text, k=3):
-        vector = get_embedding(text)
-        vector = np.expand_dims(vector, axis=0)
-        distances, indices = self.index.search(vector, k)
-        results = []
-        for idx in indices[0]:
-            # Skip indices that are -1 (indicating no result)
-            if idx == -1:
-                continue
-            if idx < len(self.texts):
-                results.append(self.texts[idx])
-        return results
+        """Return the texts of the k most similar entries."""
+        return [entry["text"] for score, entry in self.search(text, k, min_score=1e-6)]
+
+
+_project_indexes: Dict[str, EmbeddingIndex] = {}
+_project_indexes_lock = threading.Lock()
+
+
+def get_project_index(project_name: str) -> EmbeddingIndex:
+    """Return the shared, persisted embedding index of a project."""
+    key = WWSettingsManager.sanitize(project_name)
+    with _project_indexes_lock:
+        if key not in _project_indexes:
+            _project_indexes[key] = EmbeddingIndex(project_name)
+        return _project_indexes[key]
+
 
 # Example usage:
 if __name__ == "__main__":
-    ei = EmbeddingIndex()
+    ei = EmbeddingIndex(backend=HashingBackend())
     ei.add_text("This is the first conversation chunk.")
     ei.add_text("Another important scene with key details.")
     ei.add_text("A random off-topic discussion.")
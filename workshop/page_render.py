@@ -0,0 +1,115 @@
+"""
+Page rendering and JPEG encoding for the vision batch processor.
+
+Everything here runs inside worker processes, so the module stays free of Qt
+and LLM imports and every job is a plain, picklable dict:
+
+    {"type": "pdf_page", "pdf_path": str, "page_num": int,
+     "max_width": int, "max_height": int, "quality": int}
+    {"type": "image", "path": str, "max_width": ..., "max_height": ..., "quality": ...}
+"""
+import io
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Upper bound of the render resolution (the previous fixed value)
+MAX_RENDER_DPI = 300
+# Rendering below this is not worth it even for huge pages
+MIN_RENDER_DPI = 36
+
+# PDF documents opened by this worker process: path -> (file identity, document)
+_open_docs: Dict[str, Tuple[Any, Any]] = {}
+
+
+def open_document(pdf_path: str, identity: Any = None):
+    """
+    Return the open document of a PDF, reopened when the file at the path was
+    replaced. identity tells the files apart (e.g. their hash); by default the
+    size and mtime of the file are used.
+    """
+    if identity is None:
+        stat = os.stat(pdf_path)
+        identity = (stat.st_size, stat.st_mtime_ns)
+    cached = _open_docs.get(pdf_path)
+    if cached is not None:
+        if cached[0] == identity:
+            return cached[1]
+        del _open_docs[pdf_path]
+        cached[1].close()
+    doc = fitz.open(pdf_path)
+    _open_docs[pdf_path] = (identity, doc)
+    return doc
+
+
+def target_dpi(page_width_pt: float, page_height_pt: float, max_width: int, max_height: int) -> float:
+    """DPI at which a page of the given size (in points) just fits the pixel box."""
+    scale = min(max_width / page_width_pt, max_height / page_height_pt)
+    return max(MIN_RENDER_DPI, min(MAX_RENDER_DPI, 72.0 * scale))
+
+
+def fit_within(pil_img: Image.Image, max_width: int, max_height: int) -> Image.Image:
+    """Scale an image down (never up) to fit the box, keeping its aspect ratio."""
+    width, height = pil_img.size
+    scale_ratio = min(max_width / width, max_height / height)
+    if scale_ratio < 1.0:
+        new_size = (max(1, int(width * scale_ratio)), max(1, int(height * scale_ratio)))
+        pil_img = pil_img.resize(new_size, Image.LANCZOS)
+    return pil_img
+
+
+def render_job(job: Dict[str, Any]) -> bytes:
+    """Render or load one item and return it as JPEG bytes."""
+    max_width, max_height = job["max_width"], job["max_height"]
+    if job["type"] == "pdf_page":
+        page = open_document(job["pdf_path"])[job["page_num"]]
+        rect = page.rect
+        # Render at the resolution that fits the box instead of 300 DPI + downscale
+        pix = page.get_pixmap(dpi=int(target_dpi(rect.width, rect.height, max_width, max_height)))
+        pil_img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    else:
+        pil_img = Image.open(job["path"])
+        if pil_img.mode != "RGB":
+            pil_img = pil_img.convert("RGB")
+    # Rounding of the DPI can leave the render a few pixels too large
+    pil_img = fit_within(pil_img, max_width, max_height)
+    buf = io.BytesIO()
+    pil_img.save(buf, format="JPEG", quality=job["quality"])
+    return buf.getvalue()
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared render pool (also used for page conversion), started on
+    first use and kept for the session so worker start-up is paid once. Workers are spawned rather than
+    forked because the parent is a multi-threaded Qt process.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            max_workers = max(1, min(8, (os.cpu_count() or 2) - 1))
+            _render_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(shutdown_render_pool)
+        return _render_pool
+
+
+def shutdown_render_pool():
+    """Stop the render workers; queued jobs are dropped."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
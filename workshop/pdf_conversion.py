@@ -0,0 +1,151 @@
+"""
+Page-by-page PDF -> markdown conversion with an on-disk cache.
+
+Pages are converted independently in the shared worker process pool and
+each result is stored under <cache_dir>/<file hash>/<converter version>/<page>.md,
+so reopening a PDF or widening its page range only converts pages that were
+never seen before. Converting pages one at a time means heading levels are
+detected per page rather than across the whole range.
+"""
+import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pymupdf4llm
+
+from workshop.page_render import get_render_pool, open_document
+
+logger = logging.getLogger('PdfRagApp')
+
+# Bump when the way pages are converted changes; old cache entries are ignored
+CONVERSION_FORMAT = 1
+CONVERTER_VERSION = f"pymupdf4llm-{getattr(pymupdf4llm, '__version__', 'unknown')}-v{CONVERSION_FORMAT}"
+
+# (path, size, mtime) -> sha256, so unchanged files are hashed once per session
+_file_hashes: Dict[Tuple[str, int, float], str] = {}
+_file_hashes_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """Return the sha256 of a file's bytes (memoized by path, size and mtime)."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    with _file_hashes_lock:
+        cached = _file_hashes.get(key)
+    if cached:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    with _file_hashes_lock:
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+def convert_page(pdf_path: str, page_num: int, doc_hash: Optional[str] = None) -> str:
+    """
+    Worker process: convert one page (0-based) to markdown. doc_hash (the
+    file hash the result is cached under) makes sure a document replaced at
+    the same path is reopened.
+    """
+    doc = open_document(pdf_path, doc_hash)
+    return pymupdf4llm.to_markdown(doc, pages=[page_num], show_progress=False)
+
+
+class PageCache:
+    """Per-page markdown files keyed by (file hash, converter version, page)."""
+
+    def __init__(self, cache_dir: str, doc_hash: str, version: str = CONVERTER_VERSION):
+        self.directory = os.path.join(cache_dir, doc_hash, version)
+
+    def _path(self, page_num: int) -> str:
+        return os.path.join(self.directory, f"{page_num}.md")
+
+    def get(self, page_num: int) -> Optional[str]:
+        try:
+            with open(self._path(page_num), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, page_num: int, markdown: str) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(page_num)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(markdown)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.error(f"Error caching converted page {page_num}: {e}")
+
+
+def convert_pages(pdf_path: str, pages: List[int], cache_dir: Optional[str] = None,
+                  on_page: Optional[Callable[[int, str, int, int], None]] = None
+                  ) -> Tuple[str, List[int], Optional[str]]:
+    """
+    Convert pages (0-based) to markdown, reusing cached pages.
+
+    on_page(page_num, markdown, done, total) is called for every page in page
+    order as soon as it and all pages before it are available. Returns
+    (markdown, page_starts, error) where page_starts[i] is the character offset
+    at which pages[i] begins in the joined markdown.
+    """
+    cache = None
+    doc_hash = None
+    if cache_dir:
+        try:
+            doc_hash = file_hash(pdf_path)
+            cache = PageCache(cache_dir, doc_hash)
+        except OSError as e:
+            logger.error(f"Error hashing PDF for the page cache: {e}")
+    results: Dict[int, str] = {}
+    missing = []
+    for page_num in pages:
+        cached = cache.get(page_num) if cache else None
+        if cached is None:
+            missing.append(page_num)
+        else:
+            results[page_num] = cached
+
+    total = len(pages)
+    next_to_report = 0
+
+    def report_ready():
+        nonlocal next_to_report
+        while next_to_report < total and pages[next_to_report] in results:
+            page_num = pages[next_to_report]
+            next_to_report += 1
+            if on_page:
+                on_page(page_num, results[page_num], next_to_report, total)
+
+    report_ready()
+    if missing:
+        futures = {}
+        try:
+            pool = get_render_pool()
+            futures = {pool.submit(convert_page, pdf_path, page_num, doc_hash): page_num for page_num in missing}
+            for future in as_completed(futures):
+                page_num = futures[future]
+                results[page_num] = future.result()
+                if cache:
+                    cache.put(page_num, results[page_num])
+                report_ready()
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            logger.error(f"Error converting PDF: {e}")
+            return "", [], f"Error converting PDF: {e}"
+
+    parts, page_starts, offset = [], [], 0
+    for page_num in pages:
+        page_starts.append(offset)
+        parts.append(results[page_num])
+        offset += len(results[page_num])
+    markdown_text = "".join(parts)
+    if not markdown_text.strip():
+        return "", [], "No extractable text in PDF."
+    return markdown_text, page_starts, None
@@ -0,0 +1,237 @@
+import os
+import re
+import queue
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from settings.autosave_manager import add_save_listener, remove_save_listener, sanitize
+from util.html_text import html_to_text, scene_file_text
+from .embedding_manager import get_project_index
+
+# Approximate chunk size (in words) of the passages stored per scene
+CHUNK_WORDS = 200
+# Seconds of inactivity before pending index changes are flushed to disk
+SAVE_DELAY = 2.0
+
+
+def chunk_scene(text: str, chunk_words: int = CHUNK_WORDS) -> List[str]:
+    """Group a scene's paragraphs into passages of roughly chunk_words words."""
+    chunks, current, count = [], [], 0
+    for para in (p.strip() for p in re.split(r"\n\s*\n|\n", text)):
+        if not para:
+            continue
+        words = len(para.split())
+        if current and count + words > chunk_words:
+            chunks.append("\n".join(current))
+            current, count = [], 0
+        current.append(para)
+        count += words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def iter_scenes(structure: Dict[str, Any]):
+    """Yield (hierarchy, scene node) for every scene of a project structure."""
+    for act in structure.get("acts", []):
+        for chapter in act.get("chapters", []):
+            for scene in chapter.get("scenes", []):
+                yield [act.get("name", ""), chapter.get("name", ""), scene.get("name", "")], scene
+
+
+class ProjectIndexer(QThread):
+    """
+    Keeps a project's embedding index in step with its manuscript.
+
+    Scene saves reported by the autosave manager are queued and handled on this
+    thread: a scene is re-chunked and re-embedded only when its content hash
+    changed, and its vectors are replaced (or deleted) by scene UUID. The
+    per-scene bookkeeping lives in the index's "scenes" extra section:
+    {uuid: {"hash", "ids", "file", "mtime", "hierarchy"}}.
+    """
+    scene_indexed = pyqtSignal(str)  # scene uuid
+
+    def __init__(self, project_name: str, parent=None):
+        super().__init__(parent)
+        self.project_name = project_name
+        self.index = None  # loaded on this thread: it may load (or download) the embedding model
+        self.jobs = queue.Queue()
+        self._running = True
+        add_save_listener(self.on_scene_saved)
+
+    # ------------------------------------------------------------------
+    # Producers (called on any thread)
+    # ------------------------------------------------------------------
+    def on_scene_saved(self, project_name, hierarchy, uuid, filepath, content):
+        """Autosave listener: queue the saved scene for re-indexing."""
+        if sanitize(project_name) != sanitize(self.project_name) or not uuid:
+            return
+        self.jobs.put(("scene", (uuid, filepath, content, list(hierarchy))))
+
+    def sync_structure(self, structure: Dict[str, Any], *args):
+        """
+        Reconcile the index with the project structure: index scenes whose
+        latest file changed and drop scenes that no longer exist.
+        Extra positional args are accepted so it can be connected to
+        ProjectModel.structureChanged directly.
+        """
+        scenes = [
+            (node.get("uuid"), node.get("latest_file"), hierarchy)
+            for hierarchy, node in iter_scenes(structure)
+            if node.get("uuid")
+        ]
+        self.jobs.put(("sync", scenes))
+
+    def stop(self):
+        """Flush pending work and stop the thread."""
+        remove_save_listener(self.on_scene_saved)
+        self._running = False
+        self.jobs.put(("stop", None))
+        self.wait()
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def run(self):
+        try:
+            self.index = get_project_index(self.project_name)
+        except Exception as e:
+            logging.error(f"Project indexer could not open the index: {e}", exc_info=True)
+            while self.jobs.get()[0] != "stop":
+                pass  # drop the jobs until stopped
+            return
+        dirty = False
+        while True:
+            try:
+                kind, payload = self.jobs.get(timeout=SAVE_DELAY if dirty else None)
+            except queue.Empty:
+                self.index.save()
+                dirty = False
+                continue
+            try:
+                if kind == "stop":
+                    break
+                if kind == "scene":
+                    dirty |= self._index_scene(*payload)
+                elif kind == "sync":
+                    dirty |= self._sync(payload)
+            except Exception as e:
+                logging.error(f"Project indexer error ({kind}): {e}", exc_info=True)
+        if dirty:
+            self.index.save()
+
+    def _records(self) -> Dict[str, Dict[str, Any]]:
+        return self.index.extra.setdefault("scenes", {})
+
+    def _set_hierarchy(self, record: Dict[str, Any], hierarchy: List[str]):
+        """Follow a rename or move without re-embedding the scene."""
+        record["hierarchy"] = hierarchy
+        with self.index.lock:
+            for chunk_id in record.get("ids", []):
+                entry = self.index.metadata.get(chunk_id)
+                if entry is not None:
+                    entry["hierarchy"] = hierarchy
+
+    def _index_scene(self, uuid: str, filepath: Optional[str], content: Optional[str],
+                     hierarchy: Optional[List[str]]) -> bool:
+        if content is None:
+            try:
+                text = scene_file_text(filepath)
+            except OSError as e:
+                logging.warning(f"Project indexer could not read {filepath}: {e}")
+                return False
+        else:
+            text = html_to_text(content)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        records = self._records()
+        record = records.get(uuid)
+        mtime = os.path.getmtime(filepath) if filepath and os.path.exists(filepath) else None
+        if record and record.get("hash") == digest:
+            # Content unchanged; just remember the newest file so syncs stay cheap
+            record.update({"file": filepath, "mtime": mtime})
+            if hierarchy:
+                self._set_hierarchy(record, hierarchy)
+            return True
+        hierarchy = hierarchy or (record or {}).get("hierarchy", [])
+        with self.index.lock:
+            if record:
+                self.index.remove_ids(record.get("ids", []))
+            chunks = chunk_scene(text)
+            metadatas = [
+                {"scene_uuid": uuid, "chunk": i, "hierarchy": hierarchy}
+                for i in range(len(chunks))
+            ]
+            ids = self.index.add_texts(chunks, metadatas)
+            records[uuid] = {"hash": digest, "ids": ids, "file": filepath,
+                             "mtime": mtime, "hierarchy": hierarchy}
+        self.scene_indexed.emit(uuid)
+        return True
+
+    def _sync(self, scenes: List[Tuple[str, Optional[str], List[str]]]) -> bool:
+        changed = False
+        records = self._records()
+        live = set()
+        for uuid, filepath, hierarchy in scenes:
+            if not self._running:
+                return changed
+            live.add(uuid)
+            record = records.get(uuid)
+            if not filepath or not os.path.exists(filepath):
+                continue
+            if record and record.get("file") == filepath and record.get("mtime") == os.path.getmtime(filepath):
+                if record.get("hierarchy") != hierarchy:
+                    self._set_hierarchy(record, hierarchy)
+                    changed = True
+                continue
+            changed |= self._index_scene(uuid, filepath, None, hierarchy)
+        for uuid in [u for u in records if u not in live]:
+            with self.index.lock:
+                self.index.remove_ids(records[uuid].get("ids", []))
+                del records[uuid]
+            changed = True
+        return changed
+
+
+def retrieve_scene_context(project_name: str, query: str, k: int = 5,
+                           exclude_uuid: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Return the k manuscript passages most similar to the query as dicts with
+    "text", "scene_uuid", "hierarchy" and "score", for use in prompts.
+    """
+    results = []
+    index = get_project_index(project_name)
+    for score, entry in index.search(query, k + 4 if exclude_uuid else k, min_score=1e-6):
+        if exclude_uuid and entry.get("scene_uuid") == exclude_uuid:
+            continue
+        results.append(dict(entry, score=score))
+        if len(results) >= k:
+            break
+    return results
+
+
+class ContextRetriever(QThread):
+    """
+    Runs retrieve_scene_context on its own thread (the first search of a
+    project loads the embedding model and index, and every search encodes the
+    query) and reports the passages through a signal. Retrieval only adds
+    context, so a failure is logged and reported as no passages.
+    """
+    retrieved = pyqtSignal(list)  # hits, as returned by retrieve_scene_context
+
+    def __init__(self, project_name: str, query: str, k: int = 5,
+                 exclude_uuid: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.project_name = project_name
+        self.query = query
+        self.k = k
+        self.exclude_uuid = exclude_uuid
+
+    def run(self):
+        try:
+            hits = retrieve_scene_context(self.project_name, self.query, self.k, self.exclude_uuid)
+        except Exception as e:
+            logging.error(f"Context retrieval error: {e}", exc_info=True)
+            hits = []
+        self.retrieved.emit(hits)
@@ -1,18 +1,16 @@
 import sys
 import os
-import io
 import logging
 import json
 import re
-import math
 import base64
-import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Any, List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 from difflib import SequenceMatcher
-from PIL import Image
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -22,8 +20,6 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.messages.base import BaseMessage
 
 import fitz  # PyMuPDF
-import pymupdf4llm
-import tiktoken
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import QThread, pyqtSignal, Qt, QPoint
 from PyQt5.QtGui import QTextOption, QKeySequence, QPixmap, QCursor, QTextDocument, QTextCursor, QImage
@@ -36,6 +32,12 @@ from PyQt5.QtWidgets import (QTabWidget, QWidget, QVBoxLayout, QGroupBox, QHBoxL
                             QSizePolicy, QStackedWidget)
 from settings.llm_api_aggregator import WWApiAggregator
 from util.find_dialog import FindDialog
+from util import tokenizer
+from workshop.retrieval_index import BM25Index
+from workshop.chunker import Chunk, chunk_markdown
+from workshop.pdf_conversion import convert_pages
+from workshop.chunk_dispatcher import ChunkDispatcher, DEFAULT_MAX_CONCURRENCY
+from workshop.page_render import get_render_pool, render_job, shutdown_render_pool
 
 # Setup logging
 logging.basicConfig(
@@ -53,23 +55,28 @@ class AppSettings:
     last_from_page_manual: int = 0
     last_to_page_manual: int = 0
     last_chunk_size: int = 20000
+    chunk_overlap_tokens: int = 0
     default_prompt: str = ""
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENCY
     
 class VisionMessage(HumanMessage):
     """Custom Message class for vision-based LLMs"""
     def __init__(self, content: Union[str, List[Dict[str, Any]]]):
         super().__init__(content=content)
 
-# Utility class for token counting
+# Utility class for token counting (thin wrapper over the shared tokenizer)
 class TokenCounter:
     @staticmethod
     def count_tokens(text: str, encoding_name: str = 'cl100k_base') -> int:
-        encoder = tiktoken.get_encoding(encoding_name)
-        return len(encoder.encode(text))
+        return tokenizer.count_tokens(text, encoding_name)
+
+    @staticmethod
+    def count_tokens_batch(texts: List[str], encoding_name: str = 'cl100k_base') -> List[int]:
+        return tokenizer.count_tokens_batch(texts, encoding_name)
 
     @staticmethod
     def get_encoder(encoding_name: str = 'cl100k_base'):
-        return tiktoken.get_encoding(encoding_name)
+        return tokenizer.get_encoding(encoding_name)
 
 # PDF processing utilities
 class PdfProcessor:
@@ -93,17 +100,6 @@ class PdfProcessor:
             logger.error(f"Error loading PDF: {e}")
             return 0, f"Error loading PDF: {e}"
 
-    @staticmethod
-    def convert_to_markdown(pdf_path: str, pages: List[int]) -> Tuple[str, Optional[str]]:
-        try:
-            markdown_text = pymupdf4llm.to_markdown(pdf_path, pages=pages)
-            if not markdown_text.strip():
-                return "", "No extractable text in PDF."
-            return markdown_text, None
-        except Exception as e:
-            logger.error(f"Error converting PDF: {e}")
-            return "", f"Error converting PDF: {e}"
-
     @staticmethod
     def preprocess(text: str) -> str:
         # Remove hyphenation at line breaks (e.g., "ex-\nample" -> "example")
@@ -160,83 +156,20 @@ class PdfProcessor:
         return sentences
 
     @staticmethod
-    def chunk_text_intelligently(text: str, max_tokens: int) -> List[str]:
-        encoder = TokenCounter.get_encoder()
-        text = PdfProcessor.preprocess(text)
-
-        # If entire text fits in one chunk, return it as-is
-        total_tokens = TokenCounter.count_tokens(text)
-        if total_tokens <= max_tokens:
-            return [text]
-
-        desired_chunks = math.ceil(total_tokens / max_tokens)
-        paragraphs = PdfProcessor.split_paragraphs(text)
-        chunks: List[str] = []
-        current = ''
-        current_tokens = 0
-
-        def flush_current():
-            nonlocal current, current_tokens
-            if current:
-                chunks.append(current)
-                current = ''
-                current_tokens = 0
-
-        for para in paragraphs:
-            if PdfProcessor.is_structural(para):
-                flush_current()
-                chunks.append(para)
-                continue
-
-            para_tokens = TokenCounter.count_tokens(para)
-            # Try to add paragraph to current chunk
-            if current_tokens + para_tokens <= max_tokens:
-                if current:
-                    current += '\n\n' + para
-                    current_tokens += para_tokens + 2
-                else:
-                    current = para
-                    current_tokens = para_tokens
-            else:
-                # Paragraph too big or would overflow current chunk
-                flush_current()
-                if para_tokens <= max_tokens:
-                    current = para
-                    current_tokens = para_tokens
-                else:
-                    for sent in PdfProcessor.split_sentences(para):
-                        sent_tokens = TokenCounter.count_tokens(sent)
-                        if sent_tokens > max_tokens:
-                            chunks.append(sent)
-                        elif current_tokens + sent_tokens <= max_tokens:
-                            if current:
-                                current += ' ' + sent
-                                current_tokens += sent_tokens + 1
-                            else:
-                                current = sent
-                                current_tokens = sent_tokens
-                        else:
-                            flush_current()
-                            current = sent
-                            current_tokens = sent_tokens
-        flush_current()
-
-        # Merge small chunks to minimize count up to desired_chunks
-        i = 0
-        while len(chunks) > desired_chunks and i < len(chunks) - 1:
-            tokens_i = TokenCounter.count_tokens(chunks[i])
-            tokens_j = TokenCounter.count_tokens(chunks[i+1])
-            if tokens_i + tokens_j <= max_tokens:
-                # merge
-                chunks[i] = chunks[i] + '\n\n' + chunks[i+1]
-                del chunks[i+1]
-                # restart from previous index
-                i = max(i-1, 0)
-            else:
-                i += 1
-
+    def chunk_text_with_offsets(text: str, max_tokens: int, overlap_tokens: int = 0,
+                                page_starts: Optional[List[int]] = None,
+                                page_numbers: Optional[List[int]] = None) -> List[Chunk]:
+        """Token-aware chunks carrying character offsets and source pages."""
+        chunks = chunk_markdown(text, max_tokens, overlap_tokens, page_starts, page_numbers)
+        for chunk in chunks:
+            # Dehyphenate per chunk so offsets still refer to the original text
+            chunk.text = PdfProcessor.preprocess(chunk.text)
         return chunks
 
+    @staticmethod
+    def chunk_text_intelligently(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+        return [c.text for c in PdfProcessor.chunk_text_with_offsets(text, max_tokens, overlap_tokens)]
+
 # Enhanced PDF processing for QA
 class EnhancedPdfProcessor:
     @staticmethod
@@ -245,12 +178,19 @@ class EnhancedPdfProcessor:
         question: str,
         min_semantic: float = 0.2,
         top_k: int = 5,
-        window: int = 1
+        window: int = 1,
+        index: Optional[BM25Index] = None
     ) -> List[Dict]:
         """
         Perform semantic similarity search with keyword-based boost.
         Returns up to top_k paragraphs plus surrounding context.
+        When a prebuilt index is given, BM25 relevance replaces the
+        per-paragraph SequenceMatcher scan.
         """
+        if index is not None:
+            return index.search(question, mode="boost", min_score=min_semantic,
+                                top_k=top_k, window=window)
+
         # clean and split
         query_clean = question.lower().strip()
         words = [w.strip('.,?!') for w in query_clean.split() if w]
@@ -291,12 +231,18 @@ class EnhancedPdfProcessor:
         question: str,
         min_similarity: float = 0.2,
         top_k: int = 5,
-        window: int = 1
+        window: int = 1,
+        index: Optional[BM25Index] = None
     ) -> List[Dict]:
         """
         Perform pure semantic similarity search.
         Returns up to top_k paragraphs plus surrounding context.
+        When a prebuilt index is given, normalized BM25 relevance is used.
         """
+        if index is not None:
+            return index.search(question, mode="bm25", min_score=min_similarity,
+                                top_k=top_k, window=window)
+
         query_clean = question.lower().strip()
         paragraphs = [p.strip() for p in re.split(r'\n\s*\n', full_text) if p.strip()]
         results = []
@@ -327,12 +273,17 @@ class EnhancedPdfProcessor:
         full_text: str,
         question: str,
         top_k: int = 5,
-        window: int = 1
+        window: int = 1,
+        index: Optional[BM25Index] = None
     ) -> List[Dict]:
         """
         Perform exact keyword search. Treats every word in the question as keyword.
         Returns up to top_k paragraphs plus surrounding context.
+        When a prebuilt index is given, hits are read from its posting lists.
         """
+        if index is not None:
+            return index.search(question, mode="keyword", top_k=top_k, window=window)
+
         query_clean = question.lower().strip()
         words = [w.strip('.,?!') for w in query_clean.split() if w]
         paragraphs = [p.strip() for p in re.split(r'\n\s*\n', full_text) if p.strip()]
@@ -380,7 +331,6 @@ class SimpleQaSystem:
             return "No relevant information found in the document."
 
         # Build context string up to the token limit
-        encoder = TokenCounter.get_encoder()
         context_str = ""
         total_tokens = 0
 
@@ -527,54 +477,56 @@ class LlmClient:
 # Worker for PDF processing
 class PdfProcessingWorker(QThread):
     finished = pyqtSignal(str, list, str)
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int)  # pages converted so far
+    page_converted = pyqtSignal(int, str)  # page number (0-based), markdown; in page order
     
-    def __init__(self, pdf_path: str, pages: List[int], max_tokens: int = None):
+    def __init__(self, pdf_path: str, pages: List[int], max_tokens: int = None,
+                 index_dir: Optional[str] = None, overlap_tokens: int = 0,
+                 cache_dir: Optional[str] = None):
         super().__init__()
         self.pdf_path = pdf_path
         self.pages = pages
         self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.index_dir = index_dir
+        self.cache_dir = cache_dir
+        self.index: Optional[BM25Index] = None
+        self.chunk_spans: List[Chunk] = []  # chunks with char offsets and pages
     
     def run(self):
         # Process PDF in a separate thread
-        markdown, error = PdfProcessor.convert_to_markdown(self.pdf_path, self.pages)
+        markdown, page_starts, error = convert_pages(
+            self.pdf_path, self.pages, self.cache_dir, on_page=self.on_page
+        )
         if error:
             self.finished.emit("", [], error)
             return
         if self.max_tokens:
-            chunks = PdfProcessor.chunk_text_intelligently(markdown, self.max_tokens)
+            self.chunk_spans = PdfProcessor.chunk_text_with_offsets(
+                markdown, self.max_tokens, self.overlap_tokens, page_starts, self.pages
+            )
+            chunks = [c.text for c in self.chunk_spans]
         else:
             chunks = []
+        if self.index_dir:
+            # Build (or reload) the retrieval index while we are off the GUI thread
+            self.index = BM25Index.load_or_build(markdown, self.index_dir)
         self.finished.emit(markdown, chunks, "")
 
-# Worker for LLM processing
-class LlmWorker(QThread):
-    result_ready = pyqtSignal(int, str, str)
-    
-    def __init__(self, chunk_idx: int, prompt: str, chunk_text: str):
-        super().__init__()
-        self.chunk_idx = chunk_idx
-        self.prompt = prompt
-        self.chunk_text = chunk_text
-    
-    def run(self):
-        # Send chunk to LLM in a separate thread
-        full_input = f"{self.prompt}\n\n{self.chunk_text}"
-        try:
-            response = WWApiAggregator.send_prompt_to_llm(full_input)
-            self.result_ready.emit(self.chunk_idx, response, "")
-        except Exception as e:
-            self.result_ready.emit(self.chunk_idx, "", f"Error: {str(e)}")
-            
+    def on_page(self, page_num: int, markdown: str, done: int, total: int):
+        self.page_converted.emit(page_num, markdown)
+        self.progress.emit(done)
+
 class QaWorker(QThread):
     finished = pyqtSignal(str, list)  # result_text, relevant_sections
     error = pyqtSignal(str)
 
     def __init__(self, markdown_text, question, mode,
                  min_sim, top_k, context_mode,
-                 custom_instr, snippet_length):
+                 custom_instr, snippet_length, index=None):
         super().__init__()
         self.markdown_text   = markdown_text
+        self.index           = index
         self.question        = question
         self.mode            = mode
         self.min_sim         = min_sim
@@ -605,13 +557,15 @@ class QaWorker(QThread):
                 window = 0
 
             # Retrieve relevant sections with context window
+            index = self.index if self.index is not None else BM25Index.build(self.markdown_text)
             if "Boost" in self.mode:
                 relevant_sections = EnhancedPdfProcessor.semantic_with_boost(
                     full_text=self.markdown_text,
                     question=self.question,
                     min_semantic=self.min_sim,
                     top_k=self.top_k,
-                    window=window
+                    window=window,
+                    index=index
                 )
             elif "Semantic" in self.mode:
                 relevant_sections = EnhancedPdfProcessor.semantic_only(
@@ -619,14 +573,16 @@ class QaWorker(QThread):
                     question=self.question,
                     min_similarity=self.min_sim,
                     top_k=self.top_k,
-                    window=window
+                    window=window,
+                    index=index
                 )
             else:
                 relevant_sections = EnhancedPdfProcessor.keyword_only(
                     full_text=self.markdown_text,
                     question=self.question,
                     top_k=self.top_k,
-                    window=window
+                    window=window,
+                    index=index
                 )
 
             # Prepare context for the LLM
@@ -668,96 +624,93 @@ class QaWorker(QThread):
             self.error.emit(f"Error: {str(e)}")
 
 class ProcessingThread(QThread):
+    """
+    Vision batch processor. Pages are rendered and JPEG-encoded in the shared
+    render process pool while a bounded thread pool sends finished images to
+    the LLM, so CPU work overlaps network latency. Results are emitted in task
+    order.
+    """
     progress_updated = pyqtSignal(int, str)
     task_completed = pyqtSignal(int, str)
     all_completed = pyqtSignal()
     
-    def __init__(self, parent, tasks):
+    def __init__(self, parent, tasks, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
         super().__init__(parent)
         self.parent = parent
         self.tasks = tasks
-        
+        self.max_concurrency = max(1, max_concurrency)
+        # Image settings are read once on the GUI thread
+        self.max_width = parent.sb_max_width.value()
+        self.max_height = parent.sb_max_height.value()
+        self.quality = parent.sb_quality.value()
+
+    def render_job(self, item) -> Dict[str, Any]:
+        """Picklable description of an item for the render pool."""
+        job = {'type': item['type'], 'max_width': self.max_width,
+               'max_height': self.max_height, 'quality': self.quality}
+        if item['type'] == 'pdf_page':
+            job.update(pdf_path=item['pdf_path'], page_num=item['page_num'])
+        else:
+            job['path'] = item['path']
+        return job
+
+    def _describe(self, task, render_future) -> str:
+        """LLM thread: wait for the rendered image, then send it (the aggregator retries)."""
+        if self.parent.processing_cancelled:
+            return "Cancelled"
+        try:
+            img_bytes = render_future.result()
+        except BrokenProcessPool:
+            # The pool died (e.g. a worker crashed); render in this thread instead
+            shutdown_render_pool()
+            img_bytes = render_job(self.render_job(task['item']))
+        response, err = LlmClient.send_prompt_with_image(task['prompt'], img_bytes)
+        return f"Error: {err}" if err else response
+
     def run(self):
         total_tasks = len(self.tasks)
-        
-        for i, task in enumerate(self.tasks):
-            # Check if processing was cancelled
-            if self.parent.processing_cancelled:
-                self.progress_updated.emit(100, "Cancelled")
-                break
-            
-            # Update progress
-            progress = int((i / total_tasks) * 100)
-            self.progress_updated.emit(progress, f"Processing {i+1}/{total_tasks}: {task['item']['name']}")
-            
-            try:
-                # Get the image data
-                idx = task['index']
-                item = task['item']
-                prompt = task['prompt']
-                
-                # Process the image
-                img_bytes = self.prepare_image(item)
-                
-                # Send to LLM
-                response, err = LlmClient.send_prompt_with_image(prompt, img_bytes)
-                
-                if err:
-                    response = f"Error: {err}"
-                
-                # Emit result
-                self.task_completed.emit(idx, response)
-                
-            except Exception as e:
-                # Handle any exceptions
-                self.task_completed.emit(task['index'], f"Error: {str(e)}")
-            
-            # Small delay to prevent UI freezing and allow for cancellation
-            time.sleep(0.1)
+        render_pool = get_render_pool()
+        # Renders run ahead of the requests by one pool's worth of images
+        window = self.max_concurrency * 2
+        pending = {}  # task position -> future of the LLM response
+        next_to_submit = 0
+        next_to_emit = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as llm_pool:
+            while next_to_emit < total_tasks:
+                if self.parent.processing_cancelled:
+                    for future in pending.values():
+                        future.cancel()
+                    self.progress_updated.emit(100, "Cancelled")
+                    break
+                while next_to_submit < total_tasks and next_to_submit - next_to_emit < window:
+                    task = self.tasks[next_to_submit]
+                    render_future = render_pool.submit(render_job, self.render_job(task['item']))
+                    pending[next_to_submit] = llm_pool.submit(self._describe, task, render_future)
+                    next_to_submit += 1
+
+                task = self.tasks[next_to_emit]
+                progress = int((next_to_emit / total_tasks) * 100)
+                self.progress_updated.emit(
+                    progress, f"Processing {next_to_emit + 1}/{total_tasks}: {task['item']['name']}"
+                )
+                future = pending[next_to_emit]
+                try:
+                    # Short timeout so cancellation is noticed promptly
+                    response = future.result(timeout=0.2)
+                except FuturesTimeoutError:
+                    continue
+                except Exception as e:
+                    response = f"Error: {str(e)}"
+                del pending[next_to_emit]
+                if not self.parent.processing_cancelled:
+                    self.task_completed.emit(task['index'], response)
+                next_to_emit += 1
         
         # Signal completion
         if not self.parent.processing_cancelled:
             self.progress_updated.emit(100, "Completed")
         self.all_completed.emit()
-    
-    def prepare_image(self, item):
-        # Get custom resolution settings from parent
-        max_width = self.parent.sb_max_width.value()
-        max_height = self.parent.sb_max_height.value()
-        quality = self.parent.sb_quality.value()
-        
-        pil_img = None
-        
-        if item['type'] == 'pdf_page':
-            # Render the PDF page
-            page = item['doc'][item['page_num']]
-            pix = page.get_pixmap(dpi=300)
-            pil_img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-            
-        elif item['type'] == 'image':
-            # Load the image file
-            pil_img = Image.open(item['path'])
-            
-            # Convert to RGB if needed
-            if pil_img.mode != 'RGB':
-                pil_img = pil_img.convert('RGB')
-        
-        # Resize to maintain aspect ratio within max dimensions
-        original_width, original_height = pil_img.size
-        width_ratio = max_width / original_width
-        height_ratio = max_height / original_height
-        scale_ratio = min(width_ratio, height_ratio)
-        
-        # Only scale down, not up
-        if scale_ratio < 1.0:
-            new_width = int(original_width * scale_ratio)
-            new_height = int(original_height * scale_ratio)
-            pil_img = pil_img.resize((new_width, new_height), Image.LANCZOS)
-        
-        # Compress to JPEG
-        buf = io.BytesIO()
-        pil_img.save(buf, format="JPEG", quality=quality)
-        return buf.getvalue()
 
 # Settings manager
 class SettingsManager:
@@ -776,7 +729,9 @@ class SettingsManager:
                         last_from_page_manual=data.get('last_from_page_manual', 0),
                         last_to_page_manual=data.get('last_to_page_manual', 0),
                         last_chunk_size=data.get('last_chunk_size', 20000),
-                        default_prompt=data.get('default_prompt', "")
+                        chunk_overlap_tokens=data.get('chunk_overlap_tokens', 0),
+                        default_prompt=data.get('default_prompt', ""),
+                        max_concurrent_requests=data.get('max_concurrent_requests', DEFAULT_MAX_CONCURRENCY)
                     )
         except Exception as e:
             logger.error(f"Error loading settings: {str(e)}")
@@ -793,7 +748,9 @@ class SettingsManager:
                     'last_from_page_manual': settings.last_from_page_manual,
                     'last_to_page_manual': settings.last_to_page_manual,
                     'last_chunk_size': settings.last_chunk_size,
-                    'default_prompt': settings.default_prompt
+                    'chunk_overlap_tokens': settings.chunk_overlap_tokens,
+                    'default_prompt': settings.default_prompt,
+                    'max_concurrent_requests': settings.max_concurrent_requests
                 }, f)
         except Exception as e:
             logger.error(f"Error saving settings: {str(e)}")
@@ -1053,6 +1010,10 @@ class PdfRagApp(QtWidgets.QWidget):
         self.history_dir = os.path.join(self.base_dir, "rag_history")
         os.makedirs(self.history_dir, exist_ok=True)
         self.history_file = os.path.join(self.history_dir, "rag_search_history.json")
+        # Persisted BM25 indexes of converted documents, keyed by content hash
+        self.index_dir = os.path.join(self.base_dir, "rag_index")
+        # Per-page markdown of converted PDFs
+        self.page_cache_dir = os.path.join(self.base_dir, "pdf_page_cache")
 
         # Load persisted search history
         self.load_history()
@@ -1323,6 +1284,21 @@ class PdfRagApp(QtWidgets.QWidget):
         self.manual_chunk_spin.setRange(1, 1000000)
         self.manual_chunk_spin.setValue(20000)
         settings_layout.addWidget(self.manual_chunk_spin, 1, 1)
+        settings_layout.addWidget(QLabel("Overlap tokens:"), 1, 2)
+        self.manual_overlap_spin = QSpinBox()
+        self.manual_overlap_spin.setRange(0, 100000)
+        self.manual_overlap_spin.setValue(0)
+        self.manual_overlap_spin.setToolTip("Tokens repeated from the end of the previous chunk (at most half a chunk)")
+        settings_layout.addWidget(self.manual_overlap_spin, 1, 3)
+        settings_layout.addWidget(QLabel("Parallel requests:"), 2, 0)
+        self.manual_concurrency_spin = QSpinBox()
+        self.manual_concurrency_spin.setRange(1, 32)
+        self.manual_concurrency_spin.setValue(DEFAULT_MAX_CONCURRENCY)
+        self.manual_concurrency_spin.setToolTip(
+            "Maximum number of chunks sent to the LLM at the same time.\n"
+            "A per-provider limit can be set with \"tokens_per_minute\" in the LLM settings."
+        )
+        settings_layout.addWidget(self.manual_concurrency_spin, 2, 1)
         settings_group.setLayout(settings_layout)
         upper_layout.addWidget(settings_group)
 
@@ -1376,6 +1352,12 @@ class PdfRagApp(QtWidgets.QWidget):
         self.manual_progress_bar.setVisible(False)
         lower_layout.addWidget(self.manual_progress_bar)
 
+        # throughput readout while chunks are being sent
+        self.manual_throughput_label = QLabel("")
+        self.manual_throughput_label.setStyleSheet("color: #888888; font-style: italic;")
+        self.manual_throughput_label.setVisible(False)
+        lower_layout.addWidget(self.manual_throughput_label)
+
         # prompts container
         self.manual_prompts_container = QWidget()
         self.manual_prompts_layout = QVBoxLayout(self.manual_prompts_container)
@@ -1391,6 +1373,12 @@ class PdfRagApp(QtWidgets.QWidget):
         self.manual_send_btn.setEnabled(False)
         lower_layout.addWidget(self.manual_send_btn)
 
+        # cancel button (visible while chunks are being sent)
+        self.manual_cancel_btn = QPushButton("Cancel")
+        self.manual_cancel_btn.clicked.connect(self.cancel_manual_llm)
+        self.manual_cancel_btn.setVisible(False)
+        lower_layout.addWidget(self.manual_cancel_btn)
+
         # save results button (hidden until LLM results arrive)
         self.manual_export_btn = QPushButton("Save Results")
         self.manual_export_btn.clicked.connect(self.export_manual_results)
@@ -1403,7 +1391,8 @@ class PdfRagApp(QtWidgets.QWidget):
         # initialize variables
         self.manual_markdown_text = ''
         self.manual_chunks = []
-        self.manual_llm_workers = []
+        self.manual_chunk_spans = []
+        self.manual_dispatcher = None
         self.chunk_prompt_inputs = []  # Store references to individual prompt inputs
 
     def init_qa_tab(self):
@@ -1595,6 +1584,7 @@ class PdfRagApp(QtWidgets.QWidget):
         
         # Initialize variables
         self.qa_markdown_text = ''
+        self.qa_index = None
         self.qa_document_processed = False
         self.qa_document_path = ''
         
@@ -1793,6 +1783,7 @@ class PdfRagApp(QtWidgets.QWidget):
         
         # Save only necessary settings (not the page range)
         self.settings.last_chunk_size = self.manual_chunk_spin.value()
+        self.settings.chunk_overlap_tokens = self.manual_overlap_spin.value()
         self.settings.default_prompt = self.manual_default_prompt_edit.toPlainText()
         SettingsManager.save_settings(self.settings)
         
@@ -1804,12 +1795,25 @@ class PdfRagApp(QtWidgets.QWidget):
         pages = list(range(pdf_from_page, pdf_to_page + 1))
         
         self.manual_progress_bar.setVisible(True)
-        self.manual_progress_bar.setRange(0, 0)
+        self.manual_progress_bar.setRange(0, len(pages))
+        self.manual_progress_bar.setValue(0)
         self.manual_process_btn.setEnabled(False)
+        self.manual_markdown_editor.clear()
         
-        self.manual_worker = PdfProcessingWorker(pdf_path, pages, self.manual_chunk_spin.value())
+        self.manual_worker = PdfProcessingWorker(pdf_path, pages, self.manual_chunk_spin.value(),
+                                                 overlap_tokens=self.manual_overlap_spin.value(),
+                                                 cache_dir=self.page_cache_dir)
+        self.manual_worker.progress.connect(self.manual_progress_bar.setValue)
+        self.manual_worker.page_converted.connect(self.on_manual_page_converted)
         self.manual_worker.finished.connect(self.on_manual_pdf_processing_finished)
         self.manual_worker.start()
+
+    def on_manual_page_converted(self, page_num: int, markdown: str):
+        # Stream pages into the markdown view while the rest are converted
+        cursor = self.manual_markdown_editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(markdown)
+        self.manual_token_label.setText(f"Converted page {page_num + 1}...")
     
     def process_qa_pdf(self):
         # Process entire PDF for QA tab
@@ -1832,10 +1836,13 @@ class PdfRagApp(QtWidgets.QWidget):
         self.qa_search_btn.setEnabled(False)
         
         self.qa_progress_bar.setVisible(True)
-        self.qa_progress_bar.setRange(0, 0)
+        self.qa_progress_bar.setRange(0, len(pages))
+        self.qa_progress_bar.setValue(0)
         self.qa_process_btn.setEnabled(False)
         
-        self.qa_worker = PdfProcessingWorker(pdf_path, pages)
+        self.qa_worker = PdfProcessingWorker(pdf_path, pages, index_dir=self.index_dir,
+                                             cache_dir=self.page_cache_dir)
+        self.qa_worker.progress.connect(self.qa_progress_bar.setValue)
         self.qa_worker.finished.connect(self.on_qa_pdf_processing_finished)
         self.qa_worker.start()
 
@@ -1852,6 +1859,7 @@ class PdfRagApp(QtWidgets.QWidget):
 
         self.manual_markdown_text = markdown
         self.manual_chunks = chunks
+        self.manual_chunk_spans = self.manual_worker.chunk_spans
         self.manual_markdown_editor.setPlainText(markdown)
 
         total_tokens = TokenCounter.count_tokens(markdown)
@@ -1880,6 +1888,7 @@ class PdfRagApp(QtWidgets.QWidget):
         
         # Code executed only when processing is successful
         self.qa_markdown_text = markdown
+        self.qa_index = self.qa_worker.index
         self.status_bar.showMessage("PDF processed for Smart QA", 5000)
         
         self.qa_search_btn.setEnabled(True)
@@ -1898,7 +1907,10 @@ class PdfRagApp(QtWidgets.QWidget):
 
         # Add each chunk as its own group with a selectable preview
         for idx, chunk in enumerate(self.manual_chunks):
-            chunk_group = QGroupBox(f"Chunk {idx+1}")
+            title = f"Chunk {idx+1}"
+            if idx < len(self.manual_chunk_spans) and self.manual_chunk_spans[idx].page_label():
+                title += f" ({self.manual_chunk_spans[idx].page_label()})"
+            chunk_group = QGroupBox(title)
             chunk_layout = QVBoxLayout(chunk_group)
 
             # Show up to 500 characters in the preview (or the full chunk if shorter)
@@ -1953,22 +1965,25 @@ class PdfRagApp(QtWidgets.QWidget):
             QMessageBox.warning(self, "Error", "No data to send. Process PDF first.")
             return
 
-        # Reset previous workers
-        for w in self.manual_llm_workers:
-            if w.isRunning():
-                w.quit()
-                w.wait()
+        # Stop a previous run that is still in progress
+        if self.manual_dispatcher and self.manual_dispatcher.isRunning():
+            self.manual_dispatcher.cancel()
+            self.manual_dispatcher.wait()
         
-        # Initialize new workers
-        self.manual_llm_workers = []
+        # Initialize new run
         self.all_llm_responses = []
         self.manual_progress_bar.setRange(0, len(self.manual_chunks))
         self.manual_progress_bar.setValue(0)
         self.manual_progress_bar.setVisible(True)
         self.manual_send_btn.setEnabled(False)
         self.manual_export_btn.setVisible(False)
+        self.manual_cancel_btn.setVisible(True)
+        self.manual_cancel_btn.setEnabled(True)
+        self.manual_throughput_label.setText("Starting...")
+        self.manual_throughput_label.setVisible(True)
 
-        # Create and connect workers for each chunk
+        # Build one job per chunk
+        jobs = []
         for idx, chunk in enumerate(self.manual_chunks):
             # Determine which prompt to use
             if self.individual_prompts_checkbox.isChecked() and idx < len(self.chunk_prompt_inputs):
@@ -1977,13 +1992,45 @@ class PdfRagApp(QtWidgets.QWidget):
             else:
                 # Use default prompt
                 prompt = self.manual_default_prompt_edit.toPlainText().strip()
-                
-            worker = LlmWorker(idx, prompt, chunk)
-            worker.result_ready.connect(self.on_manual_llm_result)
-            worker.started.connect(self.set_busy_cursor)
-            worker.finished.connect(self.restore_cursor)
-            self.manual_llm_workers.append(worker)
-            worker.start()
+            jobs.append((prompt, chunk))
+
+        # Dispatch with bounded concurrency; results arrive in chunk order
+        self.settings.max_concurrent_requests = self.manual_concurrency_spin.value()
+        self.manual_dispatcher = ChunkDispatcher(
+            jobs,
+            max_concurrency=self.manual_concurrency_spin.value()
+        )
+        self.manual_dispatcher.result_ready.connect(self.on_manual_llm_result)
+        self.manual_dispatcher.progress.connect(self.on_manual_llm_progress)
+        self.manual_dispatcher.started.connect(self.set_busy_cursor)
+        self.manual_dispatcher.finished.connect(self.restore_cursor)
+        self.manual_dispatcher.finished.connect(self.on_manual_llm_finished)
+        self.manual_dispatcher.start()
+
+    def cancel_manual_llm(self):
+        if self.manual_dispatcher and self.manual_dispatcher.isRunning():
+            self.manual_dispatcher.cancel()
+            self.manual_cancel_btn.setEnabled(False)
+            self.manual_throughput_label.setText("Cancelling... waiting for requests in flight")
+
+    def on_manual_llm_progress(self, done, total, in_flight, chunks_per_min, tokens_per_sec):
+        self.manual_throughput_label.setText(
+            f"{done}/{total} chunks | {in_flight} in flight | "
+            f"{chunks_per_min:.1f} chunks/min | {tokens_per_sec:.0f} tokens/s"
+        )
+
+    def on_manual_llm_finished(self):
+        # Runs after completion and after cancellation
+        self.manual_cancel_btn.setVisible(False)
+        self.manual_send_btn.setEnabled(True)
+        if self.manual_dispatcher and self.manual_dispatcher.is_cancelled():
+            self.manual_progress_bar.setVisible(False)
+            self.manual_throughput_label.setText(
+                f"Cancelled after {len(self.all_llm_responses)}/{len(self.manual_chunks)} chunks"
+            )
+            self.manual_export_btn.setVisible(bool(self.all_llm_responses))
+        else:
+            self.manual_throughput_label.setVisible(False)
 
     def on_manual_llm_result(self, idx, response, error):
         # Update GUI with response
@@ -2125,7 +2172,8 @@ class PdfRagApp(QtWidgets.QWidget):
             top_k,
             context_mode,
             custom_instr,
-            self.SNIPPET_LENGTH
+            self.SNIPPET_LENGTH,
+            index=self.qa_index
         )
         self.qa_worker.finished.connect(self.on_qa_success)
         self.qa_worker.error.connect(self.on_qa_error)
@@ -2157,6 +2205,8 @@ class PdfRagApp(QtWidgets.QWidget):
             self.qa_pdf_path_edit.setText(self.settings.last_pdf_path_qa)
             self.load_qa_pdf_info()
         self.manual_chunk_spin.setValue(self.settings.last_chunk_size)
+        self.manual_overlap_spin.setValue(self.settings.chunk_overlap_tokens)
+        self.manual_concurrency_spin.setValue(self.settings.max_concurrent_requests)
         self.manual_default_prompt_edit.setPlainText(self.settings.default_prompt)
         
     def open_find_dialog(self):
@@ -2172,8 +2222,13 @@ class PdfRagApp(QtWidgets.QWidget):
         self.settings.last_pdf_path_manual = self.manual_pdf_path_edit.text()
         self.settings.last_pdf_path_qa = self.qa_pdf_path_edit.text()
         self.settings.last_chunk_size = self.manual_chunk_spin.value()
+        self.settings.chunk_overlap_tokens = self.manual_overlap_spin.value()
         self.settings.default_prompt = self.manual_default_prompt_edit.toPlainText()
+        self.settings.max_concurrent_requests = self.manual_concurrency_spin.value()
         SettingsManager.save_settings(self.settings)
+        if self.manual_dispatcher and self.manual_dispatcher.isRunning():
+            self.manual_dispatcher.cancel()
+            self.manual_dispatcher.wait()
         event.accept()
         
 
@@ -2232,6 +2287,12 @@ class PdfRagApp(QtWidgets.QWidget):
         self.cb_show_preview.setChecked(True)
         self.cb_show_preview.stateChanged.connect(self.toggle_preview_panel)
         settings_layout.addWidget(self.cb_show_preview, 3, 1)
+        settings_layout.addWidget(QLabel("Parallel Requests:"), 4, 0)
+        self.sb_parallel = QtWidgets.QSpinBox()
+        self.sb_parallel.setRange(1, 16)
+        self.sb_parallel.setValue(DEFAULT_MAX_CONCURRENCY)
+        self.sb_parallel.setToolTip("Number of images sent to the LLM at the same time")
+        settings_layout.addWidget(self.sb_parallel, 4, 1)
         left_layout.addWidget(settings_group)
 
         # Check all/none buttons and controls
@@ -2648,7 +2709,7 @@ class PdfRagApp(QtWidgets.QWidget):
         self.processing_cancelled = False
 
         # Create and start the processing thread
-        self.processing_thread = ProcessingThread(self, tasks)
+        self.processing_thread = ProcessingThread(self, tasks, self.sb_parallel.value())
         self.processing_thread.progress_updated.connect(self.update_progress)
         self.processing_thread.task_completed.connect(self.on_task_completed)
         self.processing_thread.all_completed.connect(self.on_all_tasks_completed)
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import math
+import hashlib
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('PdfRagApp')
+
+# Bump whenever the on-disk layout or the tokenizer changes
+INDEX_VERSION = 1
+# Paragraphs are separated by blank lines, same as the original QA search
+PARAGRAPH_SPLIT_REGEX = re.compile(r'\n\s*\n')
+# Word tokens (unicode aware), compared lowercase
+TOKEN_REGEX = re.compile(r'\w+', re.UNICODE)
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split markdown into non-empty, stripped paragraphs."""
+    return [p.strip() for p in PARAGRAPH_SPLIT_REGEX.split(text) if p.strip()]
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the lowercase word tokens of a text."""
+    return TOKEN_REGEX.findall(text.lower())
+
+
+def content_hash(text: str) -> str:
+    """Return a stable hash of the document text used as the index key."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class BM25Index:
+    """
+    Tokenized inverted index over the paragraphs of a converted document,
+    scored with Okapi BM25.
+
+    The index is built once per document and persisted as JSON keyed by the
+    content hash, so reopening the same PDF only costs a file read.
+    """
+
+    def __init__(self, paragraphs: List[str], postings: Dict[str, Tuple[List[int], List[int]]],
+                 doc_lengths: List[int], doc_hash: str, k1: float = 1.5, b: float = 0.75):
+        self.paragraphs = paragraphs
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.doc_hash = doc_hash
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    # ------------------------------------------------------------------
+    # Construction and persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, full_text: str, doc_hash: Optional[str] = None) -> "BM25Index":
+        """Build the index from the full markdown of a document."""
+        paragraphs = split_paragraphs(full_text)
+        # term -> ([paragraph ids], [term frequencies]), kept as parallel lists
+        # so the JSON form loads without per-entry conversion
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        doc_lengths: List[int] = []
+        for pid, para in enumerate(paragraphs):
+            tokens = tokenize(para)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = ([], [])
+                entry[0].append(pid)
+                entry[1].append(tf)
+        return cls(paragraphs, postings, doc_lengths, doc_hash or content_hash(full_text))
+
+    @staticmethod
+    def index_path(cache_dir: str, doc_hash: str) -> str:
+        """Return the index file path for a document hash."""
+        return os.path.join(cache_dir, f"{doc_hash}.bm25.json")
+
+    def save(self, path: str) -> None:
+        """Write the index atomically to the given path."""
+        data = {
+            "version": INDEX_VERSION,
+            "hash": self.doc_hash,
+            "k1": self.k1,
+            "b": self.b,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, full_text: str, doc_hash: str) -> Optional["BM25Index"]:
+        """
+        Load a persisted index. Paragraph texts are re-derived from the document,
+        so the file only has to store the postings. Returns None if the file is
+        missing, stale or unreadable.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("hash") != doc_hash:
+            return None
+        paragraphs = split_paragraphs(full_text)
+        doc_lengths = data.get("doc_lengths", [])
+        if len(paragraphs) != len(doc_lengths):
+            return None
+        return cls(paragraphs, data.get("postings", {}), doc_lengths, doc_hash,
+                   k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+
+    @classmethod
+    def load_or_build(cls, full_text: str, cache_dir: Optional[str] = None) -> "BM25Index":
+        """Return the persisted index for this text, building and saving it if needed."""
+        doc_hash = content_hash(full_text)
+        if not cache_dir:
+            return cls.build(full_text, doc_hash)
+        path = cls.index_path(cache_dir, doc_hash)
+        index = cls.load(path, full_text, doc_hash) if os.path.exists(path) else None
+        if index is not None:
+            return index
+        index = cls.build(full_text, doc_hash)
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.error(f"Error saving retrieval index: {e}")
+        return index
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.paragraphs)
+
+    def score(self, query_terms: List[str]) -> Tuple[Dict[int, float], Dict[int, int]]:
+        """
+        Score all paragraphs containing at least one query term.
+        Returns ({paragraph_id: bm25}, {paragraph_id: keyword_hits}), where
+        keyword_hits counts the query words found in the paragraph.
+        """
+        n_docs = len(self.paragraphs)
+        scores: Dict[int, float] = {}
+        hits: Dict[int, int] = {}
+        if not n_docs:
+            return scores, hits
+        avg_length = self.avg_length or 1.0
+        for term, qtf in Counter(query_terms).items():
+            entry = self.postings.get(term)
+            if not entry:
+                continue
+            pids, tfs = entry
+            idf = math.log(1 + (n_docs - len(pids) + 0.5) / (len(pids) + 0.5))
+            for pid, tf in zip(pids, tfs):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[pid] / avg_length)
+                scores[pid] = scores.get(pid, 0.0) + qtf * idf * tf * (self.k1 + 1) / (tf + norm)
+                hits[pid] = hits.get(pid, 0) + qtf
+        return scores, hits
+
+    def context(self, paragraph_id: int, window: int) -> str:
+        """Return the paragraph joined with `window` neighbours on either side."""
+        start = max(0, paragraph_id - window)
+        end = min(len(self.paragraphs) - 1, paragraph_id + window)
+        return "\n\n".join(self.paragraphs[start:end + 1])
+
+    def search(self, question: str, mode: str = "boost", min_score: float = 0.0,
+               top_k: int = 5, window: int = 1) -> List[Dict]:
+        """
+        Retrieve up to top_k paragraphs with surrounding context.
+
+        mode:
+            "boost"   - 0.7 * normalized BM25 + 0.3 * keyword hit ratio
+            "bm25"    - normalized BM25 only
+            "keyword" - ranked by keyword hits, score is the hit ratio
+        min_score is applied to the 0..1 score of the "boost" and "bm25" modes.
+        """
+        words = tokenize(question)
+        if not words:
+            return []
+        scores, hits = self.score(words)
+        if not scores:
+            return []
+        max_bm25 = max(scores.values()) or 1.0
+
+        results = []
+        for pid, bm25 in scores.items():
+            kw_hits = hits.get(pid, 0)
+            hit_ratio = kw_hits / len(words)
+            if mode == "keyword":
+                results.append({
+                    "paragraph_id": pid,
+                    "text": self.paragraphs[pid],
+                    "match_type": "keyword",
+                    "score": round(hit_ratio, 2),
+                    "keyword_hits": kw_hits,
+                    "_rank": (kw_hits, bm25)
+                })
+                continue
+            if mode == "bm25":
+                score = bm25 / max_bm25
+                hit = {"match_type": "semantic"}
+            else:
+                score = 0.7 * (bm25 / max_bm25) + 0.3 * hit_ratio
+                hit = {"match_type": "semantic+boost", "keyword_hits": kw_hits}
+            if score < min_score:
+                continue
+            hit.update({
+                "paragraph_id": pid,
+                "text": self.paragraphs[pid],
+                "score": round(score, 2),
+                "_rank": (score,)
+            })
+            results.append(hit)
+
+        results.sort(key=lambda x: x["_rank"], reverse=True)
+        results = results[:top_k]
+        for hit in results:
+            del hit["_rank"]
+            hit["context"] = self.context(hit["paragraph_id"], window)
+        return results
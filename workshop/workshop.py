@@ -18,13 +18,11 @@ from PyQt5.QtGui import QCursor, QPixmap, QFont, QKeySequence, QTextCursor
 from PyQt5.QtWidgets import QShortcut
 from muse.prompt_panel import PromptPanel
 from muse.prompt_preview_dialog import PromptPreviewDialog
-from settings.settings_manager import WWSettingsManager
 from settings.theme_manager import ThemeManager
-from settings.llm_api_aggregator import WWApiAggregator
 from settings.llm_worker import LLMWorker
 from settings.autosave_manager import load_latest_autosave
 from .conversation_history_manager import estimate_conversation_tokens, summarize_conversation
-from .embedding_manager import EmbeddingIndex
+from .project_indexer import ContextRetriever
 from compendium.context_panel import ContextPanel
 from .rag_pdf import PdfRagApp
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
@@ -44,6 +42,8 @@ class WorkshopWindow(QDialog):
         self.is_streaming = False  # Track streaming state
         self.worker = None  # LLMWorker instance
         self.pre_stream_cursor_pos = None  # Store cursor position before streaming
+        self.retrievers = []  # ContextRetriever threads still running
+        self.retrieval_id = 0  # Only the newest retrieval's result is used
 
         # Conversation management
         self.conversation_history = []
@@ -51,9 +51,6 @@ class WorkshopWindow(QDialog):
         self.current_conversation = "Chat 1"
         self.conversations[self.current_conversation] = []
 
-        # Initialize the embedding index for context retrieval
-        self.embedding_index = EmbeddingIndex()
-
         self.current_mode = "Normal"
         
         # Audio recording variables
@@ -231,7 +228,7 @@ class WorkshopWindow(QDialog):
         self.inner_splitter.addWidget(left_container)
 
         # Context Panel
-        self.context_panel = ContextPanel(self.structure, self.project_name, parent=self)
+        self.context_panel = ContextPanel(self.structure, self.project_name, parent=self, mention_option=True)
         self.inner_splitter.addWidget(self.context_panel)
         self.inner_splitter.setSizes([500, 300])
 
@@ -291,26 +288,58 @@ class WorkshopWindow(QDialog):
 
     def closeEvent(self, event):
         self.stop_llm()
+        for retriever in list(self.retrievers):
+            retriever.wait()
         self.save_conversations()
         self.write_settings()
         event.accept()
 
-    def construct_message(self):
-        """Construct the full conversation payload sent to the LLM using ChatPromptTemplate."""
-        user_message = self.chat_input.toPlainText().strip()
+    def retrieve_context(self, user_message, callback):
+        """
+        Search the indexed manuscript for the message on a ContextRetriever
+        thread and call callback(hits) on the GUI thread, unless another
+        retrieval was started (or the request stopped) in the meantime.
+        """
+        self.retrieval_id += 1
+        retrieval_id = self.retrieval_id
+        retriever = ContextRetriever(self.project_name, user_message, k=3)
+        self.retrievers.append(retriever)
+
+        def on_retrieved(hits):
+            if retrieval_id == self.retrieval_id:
+                callback(hits)
+
+        def on_finished():
+            self.retrievers.remove(retriever)
+            retriever.deleteLater()
+
+        retriever.retrieved.connect(on_retrieved)
+        retriever.finished.connect(on_finished)
+        retriever.start()
+
+    def construct_message(self, retrieved_hits=None, user_message=None):
+        """
+        Construct the full conversation payload sent to the LLM using ChatPromptTemplate.
+        retrieved_hits are manuscript passages from retrieve_context.
+        """
+        if user_message is None:
+            user_message = self.chat_input.toPlainText().strip()
         if not user_message:
             return []
 
         # Build augmented message with context
         augmented_message = user_message
-        context_text = self.context_panel.get_selected_context_text()
+        context_text = self.context_panel.get_selected_context_text(referenced_text=user_message)
         if context_text:
             augmented_message += "\n\nContext:\n" + context_text
 
-        # Retrieve FAISS context
-        retrieved_context = self.embedding_index.query(user_message)
+        # FAISS context from the indexed manuscript
+        retrieved_context = [
+            (" / ".join(hit.get("hierarchy", [])) + ":\n" if hit.get("hierarchy") else "") + hit["text"]
+            for hit in retrieved_hits or []
+        ]
         if retrieved_context:
-            augmented_message += "\n[Retrieved Context]:\n" + "\n".join(retrieved_context)
+            augmented_message += "\n[Retrieved Context]:\n" + "\n\n".join(retrieved_context)
 
         # Construct conversation payload using ChatPromptTemplate
         conversation_payload = list(self.conversation_history)
@@ -350,10 +379,16 @@ class WorkshopWindow(QDialog):
 
     def preview_prompt(self):
         """Preview the full conversation payload sent to the LLM."""
-        conversation_payload = self.construct_message()
-        if not conversation_payload:
+        user_message = self.chat_input.toPlainText().strip()
+        if not user_message:
             QMessageBox.warning(self, _("Empty Message"), _("Please enter a chat message."))
             return
+        self.retrieve_context(user_message, lambda hits: self.show_prompt_preview(hits, user_message))
+
+    def show_prompt_preview(self, retrieved_hits, user_message):
+        conversation_payload = self.construct_message(retrieved_hits, user_message)
+        if not conversation_payload:
+            return
 
         dialog = PromptPreviewDialog(
             controller=self.controller, 
@@ -446,8 +481,15 @@ class WorkshopWindow(QDialog):
         # Get overrides from PromptPanel
         overrides = self.prompt_panel.get_overrides()
 
+        # The request continues in start_streaming once the manuscript context is retrieved
+        self.retrieve_context(user_message, lambda hits: self.start_streaming(hits, user_message, overrides))
+
+    def start_streaming(self, retrieved_hits, user_message, overrides):
+        """Second half of send_message: build the payload and stream the response."""
+        if not self.is_streaming:
+            return  # stopped while the context was retrieved
         try:
-            conversation_payload = self.construct_message()
+            conversation_payload = self.construct_message(retrieved_hits, user_message)
             if not conversation_payload:
                 return
 
@@ -517,7 +559,7 @@ class WorkshopWindow(QDialog):
 
     def on_streaming_finished(self):
         """Handle completion of streaming."""
-        logging.debug(f"Streaming finished, worker: {id(self.worker) if self.worker else None}, interrupt_flag: {WWApiAggregator.interrupt_flag.is_set()}")
+        logging.debug(f"Streaming finished, worker: {id(self.worker) if self.worker else None}")
         # Append final newline for formatting
         cursor = self.chat_log.textCursor()
         cursor.movePosition(QTextCursor.End)
@@ -553,8 +595,6 @@ class WorkshopWindow(QDialog):
             if self.worker and self.worker.isRunning():
                 logging.debug("Calling worker.stop()")
                 self.worker.stop()
-                logging.debug("Calling WWApiAggregator.interrupt()")
-                WWApiAggregator.interrupt()  # Signal the aggregator to interrupt streaming
             logging.debug("Calling cleanup_worker")
             self.cleanup_worker()
         except Exception as e:
@@ -636,12 +676,8 @@ class WorkshopWindow(QDialog):
                     logging.debug(f"Signal disconnection error for worker {worker_id}: {e}")
                 logging.debug(f"Scheduling worker {worker_id} for deletion")
                 self.worker.deleteLater()  # Schedule deletion
-                # Reset the LLM instance in the provider
-                provider_name = self.prompt_panel.get_overrides().get("provider") or WWSettingsManager.get_active_llm_name()
-                provider = WWApiAggregator.aggregator.get_provider(provider_name)
-                if provider:
-                    logging.debug(f"Resetting LLM instance for provider {provider_name}")
-                    provider.reset_llm_instance()
+                # The provider keeps its LLM instance (keyed by overrides) so the
+                # next message reuses the open connection
                 logging.debug(f"Worker {worker_id} cleaned up")
                 self.worker = None  # Clear reference
         except Exception as e: